@@ -14,8 +14,9 @@ class ServerScene(pgz.Scene):
     def on_enter(self, previous_scene):
         super().on_enter(previous_scene=previous_scene)
 
-        tmx = pgz.maps.default
-        map = pgz.ScrollMap((1280, 720), tmx, ["Islands"])
+        # The server never renders the map, so the tile images are not loaded
+        tmx = pgz.headless_maps.default
+        map = pgz.HeadlessScrollMap(tmx, ["Islands"])
 
         # Build and start game server
         self.server = pgz.MultiplayerSceneServer(map, GameScene)
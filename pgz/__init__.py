@@ -1,7 +1,8 @@
 from .actor import Actor  # noqa
-from .application import Application, FPSCalc  # noqa
+from .application import Application  # noqa
 from .clock import Clock, global_clock  # noqa
 from .keyboard import Keyboard  # noqa
+from .loaders import headless_maps  # noqa
 from .loaders import images  # noqa
 from .loaders import maps  # noqa
 from .loaders import sounds  # noqa
@@ -16,4 +17,15 @@ from .screen import Screen  # noqa
 from .utils.collision_detector import CollisionDetector  # noqa
 from .utils.event_dispatcher import EventDispatcher  # noqa
 from .utils.fps_calc import FPSCalc  # noqa
-from .utils.scroll_map import ScrollMap  # noqa
+from .utils.frame_stats import FrameStats, FrameStatsSummary  # noqa
+from .utils.map_cache import MapCache  # noqa
+from .utils.mask_cache import MaskCache  # noqa
+from .utils.scroll_map import BaseScrollMap, HeadlessScrollMap, ScrollMap  # noqa
+from .utils.spatial_hash import SpatialHash  # noqa
+from .utils.static_layer import StaticLayer  # noqa
+from .utils.streaming_map import StreamingScrollMap  # noqa
+from .utils.surface_cache import SurfaceCache, surface_cache  # noqa
+from .utils.sweep import SweepHit  # noqa
+from .utils.texture_atlas import TextureAtlas  # noqa
+from .utils.tile_grid import RayHit, TileGrid  # noqa
+from .utils.tracer import Tracer, global_tracer  # noqa
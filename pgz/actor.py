@@ -4,7 +4,7 @@ More inforamation can be found [here](https://pygame-zero.readthedocs.io/en/stab
 """
 
 import json
-from typing import Any, Callable, Dict, Optional, cast
+from typing import Any, Callable, Dict, List, Optional, Tuple, cast
 from uuid import uuid4
 
 import pgzero
@@ -12,6 +12,7 @@ import pgzero.actor
 import pygame
 
 from .screen import Screen
+from .utils.surface_cache import surface_cache
 
 
 class BaseActor(pgzero.actor.Actor):
@@ -35,12 +36,30 @@ class BaseActor(pgzero.actor.Actor):
         return self._uuid
 
     @property
-    def rect(self) -> Optional[pygame.rect.Rect]:
+    def angle(self) -> float:
+        return self._angle
+
+    @angle.setter
+    def angle(self, angle: float) -> None:
+        # Same as `pgzero.actor.Actor.angle`, but the rotated image is taken from the shared surface cache
+        self._angle = angle
+        # Keyed by the surface too, the same image name might be loaded again into a different surface.
+        # The key keeps the surface alive, so a new surface can not reuse the key while it is cached
+        self._surf = surface_cache.transform((self._image_name, self._orig_surf), self._orig_surf, angle)
+        p: Tuple[float, float] = (self.x, self.y)
+        self.width, self.height = self._surf.get_size()
+        w, h = self._orig_surf.get_size()
+        ax, ay = self._untransformed_anchor
+        self._anchor = pgzero.actor.transform_anchor(ax, ay, w, h, surface_cache.quantize(angle))
+        self.pos = p
+
+    @property
+    def rect(self) -> pygame.rect.Rect:
         return cast(pygame.rect.Rect, self._rect)
 
     @property
     def sprite(self) -> pygame.surface.Surface:
-        return cast(pygame.surface.Surface, self._surf)
+        return self._surf
 
     @property
     def sprite_delegate(self) -> "SpriteDelegate":
@@ -63,7 +82,7 @@ class SpriteDelegate(pygame.sprite.Sprite):
         return self._actor
 
     @property
-    def rect(self) -> Optional[pygame.rect.Rect]:  # type: ignore
+    def rect(self) -> pygame.rect.Rect:  # type: ignore
         return self._actor.rect
 
     @property
@@ -83,19 +102,46 @@ class Actor(BaseActor):
 
         self.scene_uuid: str = ""
         self._incremental_changes: Dict[str, Any] = {}
+        # Callbacks notified about changes of the tracked attributes (position, size, angle, image)
+        self._change_listeners: List[Callable[[Actor], None]] = []
 
         self.keyboard = None
         self.accumulate_changes = True
         # self._on_prop_change: Optional[Callable[[UUID, str, Any], None]] = None
 
     def __setattr__(self, attr: str, value: Any) -> None:
-        if attr in self.__class__.ATTRIBUTES_TO_TRACK and hasattr(self, "accumulate_changes") and self.accumulate_changes:
+        tracked = attr in self.__class__.ATTRIBUTES_TO_TRACK and hasattr(self, "accumulate_changes")
+        if tracked and self.accumulate_changes:
             if getattr(self, attr) != value:
                 self._incremental_changes[attr] = value
                 # self._on_prop_change(self.uuid, attr, value)
 
         super().__setattr__(attr, value)
 
+        if tracked:
+            for listener in self._change_listeners:
+                listener(self)
+
+    def add_change_listener(self, listener: Callable[["Actor"], None]) -> None:
+        """Subscribe to changes of the actor position, size, angle or image.
+
+        Subscribing the same listener twice has no effect.
+
+        Args:
+            listener (Callable[[Actor], None]): callback receiving the changed actor
+        """
+        if listener not in self._change_listeners:
+            self._change_listeners.append(listener)
+
+    def remove_change_listener(self, listener: Callable[["Actor"], None]) -> None:
+        """Unsubscribe from the actor changes.
+
+        Args:
+            listener (Callable[[Actor], None]): callback was passed to `add_change_listener`
+        """
+        if listener in self._change_listeners:
+            self._change_listeners.remove(listener)
+
     def get_incremental_changes(self) -> Dict[str, Any]:
         incremental_changes = self._incremental_changes
         self._incremental_changes = {}
@@ -1,9 +1,12 @@
 import asyncio
+import os
 import sys
-from typing import Optional, Tuple
+import time
+from typing import List, Optional, Tuple
 
 import pygame
 from asgiref.sync import sync_to_async
+from pgzero import ptext
 
 #
 from pgz.scene import Scene
@@ -11,7 +14,10 @@ from pgz.scene import Scene
 from .clock import Clock, global_clock
 from .keyboard import Keyboard
 from .screen import Screen
-from .utils.fps_calc import FPSCalc
+from .utils.asset_preloader import AssetPreloader
+from .utils.frame_stats import FrameStats
+from .utils.render_scale import AdaptiveRenderScale
+from .utils.tracer import global_tracer
 
 
 class Application:
@@ -23,7 +29,19 @@ class Application:
     Also makes scene management seamless together with the `Scene` class.
     """
 
-    def __init__(self, title: Optional[str], resolution: Optional[Tuple[int, int]], update_rate: Optional[int] = None):
+    def __init__(
+        self,
+        title: Optional[str],
+        resolution: Optional[Tuple[int, int]],
+        update_rate: Optional[int] = None,
+        fixed_update_rate: Optional[int] = None,
+        headless: bool = False,
+        headless_render_every: int = 0,
+        dirty_rects: bool = False,
+        render_scale: float = 1.0,
+        adaptive_render_scale: bool = False,
+        min_render_scale: float = 0.5,
+    ):
         """
         Create an instance of the pgz.Application
 
@@ -31,6 +49,17 @@ class Application:
             title (Optional[str]): title to display in the window's title bar
             resolution (Optional[Tuple[int, int]]): resolution of the game window
             update_rate (Optional[int], optional): how many times per second to update. Defaults to None.
+            fixed_update_rate (Optional[int], optional): how many simulation steps per second to run in the fixed-timestep mode.
+                The fixed-timestep mode is disabled if None. Defaults to None.
+            headless (bool, optional): run without a display as fast as possible. The time is advanced virtually by a constant step. Defaults to False.
+            headless_render_every (int, optional): in the headless mode draw the scene only every Nth tick, 0 disables drawing. Defaults to 0.
+            dirty_rects (bool, optional): push only the screen areas reported by `Scene.get_dirty_rects` to the display,
+                and skip the screen clearing if `Scene.needs_clear` returns False. Defaults to False.
+            render_scale (float, optional): scenes are drawn into an off-screen screen of the resolution multiplied by the scale,
+                which is scaled up to the window once per frame. Defaults to 1.0.
+            adaptive_render_scale (bool, optional): lower the render scale down to `min_render_scale` while the frame time is over the budget
+                of the update rate, and raise it back up to `render_scale` once the frame time drops. Defaults to False.
+            min_render_scale (float, optional): lowest render scale of the adaptive mode. Defaults to 0.5.
 
 
         If any parameters are left to `None`, these settings must be
@@ -54,12 +83,49 @@ class Application:
             app.run(main_menu)
         ```
         """
+        self._headless = headless
+        if self._headless:
+            # No window is needed, but the image loaders still require a video mode for the pixel format conversion
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        # Draw the scene every Nth simulated tick in the headless mode
+        self.headless_render_every = headless_render_every
+
         pygame.init()
         self._update_rate = update_rate
+        self._fixed_update_rate = fixed_update_rate
         self._scene = None
 
+        # Simulated time and speed of the headless mode
+        self._simulated_time = 0.0
+        self._ticks_per_second = 0.0
+
+        # Frame times (ticks times in the headless mode) in milliseconds
+        self._frame_stats = FrameStats(size=300)
+
+        # Maximal number of simulation steps per frame in the fixed-timestep mode.
+        # Protects from the "spiral of death" when the simulation cannot keep up with the real time.
+        self.max_fixed_steps = 5
+        # Part of the fixed step accumulated, but not simulated yet. Used for render interpolation.
+        self._render_alpha = 0.0
+
+        # Dirty rects rendering mode
+        self.dirty_rects = dirty_rects
+        # Force the full screen redraw on the next frame, for example after the resolution change
+        self._full_redraw = True
+
+        # Assets loading of the scene will be activated once the loading is done
+        self._preloader: Optional[AssetPreloader] = None
+        self._preloaded_scene: Optional[Scene] = None
+
         self._keyboard = Keyboard()
 
+        # Off-screen screen the scenes are drawn into, None if the scenes draw directly into the window
+        self._render_screen: Optional[Screen] = None
+        self._render_scale = render_scale
+        self._adaptive_render_scale: Optional[AdaptiveRenderScale] = None
+        if adaptive_render_scale:
+            self._adaptive_render_scale = AdaptiveRenderScale(max_scale=render_scale, min_scale=min(min_render_scale, render_scale))
+
         # Trigger property setters
         self.title = title
         self.resolution = resolution
@@ -98,7 +164,93 @@ class Application:
         Args:
             value (Tuple[int, int]): application screen resolution to use
         """
-        self._screen = Screen(pygame.display.set_mode(value))
+        if self._headless:
+            if not pygame.display.get_surface():
+                pygame.display.set_mode((1, 1))
+            self._screen = Screen(pygame.Surface(value))
+        else:
+            self._screen = Screen(pygame.display.set_mode(value))
+        self._update_render_screen()
+
+    @property
+    def render_scale(self) -> float:
+        """Get current render scale
+
+        The scale might be lower than the configured one in the adaptive render scale mode.
+
+        Returns:
+            float: ratio of the render size to the window resolution
+        """
+        if self._adaptive_render_scale:
+            return self._adaptive_render_scale.scale
+        return self._render_scale
+
+    @render_scale.setter
+    def render_scale(self, value: float) -> None:
+        """Change render scale
+
+        In the adaptive render scale mode the value is the highest scale to use.
+
+        Args:
+            value (float): ratio of the render size to the window resolution
+        """
+        self._render_scale = value
+        if self._adaptive_render_scale:
+            self._adaptive_render_scale.max_scale = value
+            self._adaptive_render_scale.min_scale = min(self._adaptive_render_scale.min_scale, value)
+            self._adaptive_render_scale.reset(value)
+        self._update_render_screen()
+
+    @property
+    def render_size(self) -> Tuple[int, int]:
+        """Get size of the screen the scenes supporting the render scale are drawn into
+
+        Returns:
+            Tuple[int, int]: render size, equal to the resolution if the render scale is 1
+        """
+        return (self.render_screen.width, self.render_screen.height)
+
+    @property
+    def render_screen(self) -> Screen:
+        """Get screen the scenes supporting the render scale are drawn into
+
+        Returns:
+            Screen: off-screen screen of the render size, or the window screen if the render scale is 1
+        """
+        return self._render_screen or self._screen
+
+    def _update_render_screen(self) -> None:
+        """Re-create the off-screen screen after the resolution or the render scale change"""
+        scale = self.render_scale
+        width, height = self._screen.width, self._screen.height
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        if size == (width, height):
+            self._render_screen = None
+        elif not self._render_screen or (self._render_screen.width, self._render_screen.height) != size:
+            surface = pygame.Surface(size)
+            # The conversion requires a video mode
+            self._render_screen = Screen(surface.convert() if pygame.display.get_surface() else surface)
+        self._full_redraw = True
+
+    def _scene_screen(self) -> Screen:
+        """Get screen the active scene is drawn into"""
+        if self.active_scene and self.active_scene.supports_render_scale():
+            return self.render_screen
+        return self._screen
+
+    def window_to_render(self, pos: Tuple[int, int]) -> Tuple[int, int]:
+        """Transform a window position (like the mouse position) into the render screen position
+
+        Args:
+            pos (Tuple[int, int]): window position
+
+        Returns:
+            Tuple[int, int]: render screen position
+        """
+        if not self._render_screen:
+            return pos
+        render = self._render_screen
+        return (pos[0] * render.width // self._screen.width, pos[1] * render.height // self._screen.height)
 
     @property
     def update_rate(self) -> int:
@@ -118,6 +270,76 @@ class Application:
         """
         self._update_rate = value
 
+    @property
+    def fixed_update_rate(self) -> Optional[int]:
+        """Get application fixed update rate
+
+        Returns:
+            Optional[int]: simulation steps per second, None if the fixed-timestep mode is disabled
+        """
+        return self._fixed_update_rate
+
+    @fixed_update_rate.setter
+    def fixed_update_rate(self, value: Optional[int]) -> None:
+        """Change application fixed update rate
+
+        Args:
+            value (Optional[int]): simulation steps per second, None disables the fixed-timestep mode
+        """
+        self._fixed_update_rate = value
+
+    @property
+    def render_alpha(self) -> float:
+        """
+        Get render interpolation factor.
+
+        In the fixed-timestep mode the value in range [0, 1) shows how far the rendered frame is between the last two simulation steps.
+        Always 0 if the fixed-timestep mode is disabled.
+
+        Returns:
+            float: render interpolation factor
+        """
+        return self._render_alpha
+
+    @property
+    def headless(self) -> bool:
+        """Check if the application runs in the headless mode
+
+        Returns:
+            bool: True if the application has no display
+        """
+        return self._headless
+
+    @property
+    def simulated_time(self) -> float:
+        """Get the virtual time in seconds simulated in the headless mode
+
+        Returns:
+            float: simulated time
+        """
+        return self._simulated_time
+
+    @property
+    def ticks_per_second(self) -> float:
+        """Get the number of simulated ticks per second of the real time in the headless mode
+
+        Returns:
+            float: simulation speed
+        """
+        return self._ticks_per_second
+
+    @property
+    def frame_stats(self) -> FrameStats:
+        """Get frame time statistics
+
+        The statistics collects frame times in milliseconds.
+        In the headless mode the time of the tick processing is collected.
+
+        Returns:
+            FrameStats: frame time statistics
+        """
+        return self._frame_stats
+
     @property
     def screen(self) -> Screen:
         """Get application screen object
@@ -161,7 +383,18 @@ class Application:
         """
         return self._scene
 
-    def change_scene(self, scene: Optional[Scene]) -> None:
+    @property
+    def preload_progress(self) -> float:
+        """Get loading progress of the assets of the next scene
+
+        Returns:
+            float: loading progress in range [0, 1], 1.0 if nothing is loading
+        """
+        if not self._preloader:
+            return 1.0
+        return self._preloader.progress
+
+    def change_scene(self, scene: Optional[Scene], preload: bool = False) -> None:
         """
         Change the currently active scene.
 
@@ -172,7 +405,17 @@ class Application:
 
         Args:
             scene (Optional[Scene]): the scene to change into
+            preload (bool, optional): load `Scene.assets` of the scene on background threads first.
+                The current scene keeps running, and the scenes are switched once all the assets are loaded. Defaults to False.
         """
+        if preload and scene is not None and scene.assets:
+            self._preloader = AssetPreloader(scene.assets)
+            self._preloaded_scene = scene
+            return
+        # An explicit scene change cancels the pending one
+        self._preloader = None
+        self._preloaded_scene = None
+
         if self.active_scene is not None:
             self.active_scene.on_exit(next_scene=scene)
             self.active_scene._application = None
@@ -180,25 +423,38 @@ class Application:
         if self.active_scene is not None:
             self.active_scene._application = self
             self.active_scene.on_enter(previous_scene=old_scene)
+        self._full_redraw = True
+
+    def _check_preload(self) -> None:
+        """Activate the preloaded scene once its assets are loaded"""
+        if not self._preloader or not self._preloader.done:
+            return
+        preloader, scene = self._preloader, self._preloaded_scene
+        preloader.raise_errors()
+        preloader.finish()
+        self.change_scene(scene)
 
     def _draw(self) -> None:
         if self.active_scene:
-            self.active_scene.draw(self._screen)
+            with global_tracer.span("draw"):
+                self.active_scene.draw(self._scene_screen())
 
     def _update(self, dt: float) -> None:
         if self.active_scene:
-            self.active_scene.update(dt)
+            with global_tracer.span("update"):
+                self.active_scene.update(dt)
 
     def _handle_event(self, event: pygame.event.Event) -> None:
         if self.active_scene:
             self.active_scene.dispatch_event(event)
 
-    def run(self, scene: Optional[Scene] = None) -> None:
+    def run(self, scene: Optional[Scene] = None, max_ticks: Optional[int] = None) -> None:
         """
         Execute the application.
 
         Args:
             scene (Optional[Scene], optional): scene to start the execution from. Defaults to None.
+            max_ticks (Optional[int], optional): stop the headless application after the number of simulated ticks. Defaults to None.
         """
         if scene is None:
             if self.active_scene is None:
@@ -207,14 +463,17 @@ class Application:
             self.change_scene(scene)
 
         try:
-            asyncio.get_event_loop().run_until_complete(self.run_as_coroutine())
+            asyncio.get_event_loop().run_until_complete(self.run_as_coroutine(max_ticks))
         finally:
             asyncio.get_event_loop().close()
 
-    async def run_as_coroutine(self) -> None:
+    async def run_as_coroutine(self, max_ticks: Optional[int] = None) -> None:
         self.running = True
         try:
-            await self._mainloop()
+            if self._headless:
+                await self._headless_mainloop(max_ticks)
+            else:
+                await self._mainloop()
         finally:
             pygame.display.quit()
             pygame.mixer.quit()
@@ -225,44 +484,181 @@ class Application:
         Run the main loop of Pygame Zero.
         """
         clock = pygame.time.Clock()
-        fps_calc = FPSCalc()
+        frame_stats = self._frame_stats
 
         fps = 0.0
-        # self.need_redraw = True
+        # Screen area of the FPS text
+        fps_rect: Optional[pygame.Rect] = None
+        # Time accumulated for the fixed-timestep simulation
+        accumulator = 0.0
         while True:
-            self._screen.clear()
+            full_redraw = self._full_redraw or not self.dirty_rects or not self.active_scene or self.active_scene.needs_clear()
+            self._full_redraw = False
+            if full_redraw:
+                self._scene_screen().clear()
 
             dt = clock.tick(self._update_rate) / 1000
 
             # TODO: Use asyncio.sleep() for frame delay if accurate enough
             await asyncio.sleep(0)
-            event: pygame.event.Event
-            for event in pygame.event.get():
+            with global_tracer.span("events"):
+                if not self._process_events():
+                    return
+            self._check_preload()
+
+            # Twice longer than the frame budget is a hitch
+            frame_stats.hitch_threshold = 2000.0 / self._update_rate if self._update_rate else None
+            frame_stats.push(dt * 1000)
+            global_tracer.counter("frame_time", ms=dt * 1000)
+
+            if self._fixed_update_rate:
+                accumulator = self._fixed_update(self._fixed_update_rate, dt, accumulator)
+                self._draw()
+            else:
+                global_clock.tick(dt)
+                await sync_to_async(self._update)(dt)
+                await sync_to_async(self._draw)()
+
+            dirty_rects: Optional[List[pygame.Rect]] = None
+            if not full_redraw and self.active_scene:
+                dirty_rects = self.active_scene.get_dirty_rects()
+
+            if self._render_screen and self._scene_screen() is self._render_screen:
+                # The whole window is overwritten by the scaled screen
+                with global_tracer.span("render_scale"):
+                    pygame.transform.scale(self._render_screen.surface, self._screen.surface.get_size(), self._screen.surface)
+                dirty_rects = None
+
+            old_fps_rect = fps_rect
+            text_surface, text_pos = ptext.draw(f"FPS: {fps}", pos=(0, 0), surf=self._screen.surface)
+            fps_rect = pygame.Rect(text_pos, text_surface.get_size())
+            if dirty_rects is not None and self.active_scene:
+                # The scene redraws the area under the FPS text on the next frame
+                self.active_scene.add_dirty_rect(fps_rect)
+
+            with global_tracer.span("display.update"):
+                if dirty_rects is None or self._full_redraw:
+                    pygame.display.update()
+                else:
+                    pygame.display.update(dirty_rects + [fps_rect.union(old_fps_rect) if old_fps_rect else fps_rect])
+
+            if self._adaptive_render_scale and self.active_scene and self.active_scene.supports_render_scale():
+                # The frame time of the other scenes does not depend on the render scale
+                self._adapt_render_scale(clock.get_rawtime())
+
+    async def _headless_mainloop(self, max_ticks: Optional[int] = None) -> None:
+        """
+        Run the main loop without a display and frame limit.
 
-                if event.type == pygame.VIDEORESIZE:
-                    self.resolution = (event.w, event.h)
+        Every tick advances the virtual time (including the global clock) by a constant step.
+        """
+        dt = 1.0 / (self._fixed_update_rate or self._update_rate or 60)
 
-                if event.type == pygame.QUIT:
-                    self.change_scene(None)  # Trigger Scene.on_exit()
+        ticks = 0
+        tps_ticks = 0
+        start = tps_start = time.perf_counter()
+        while self.active_scene is not None and (max_ticks is None or ticks < max_ticks):
+            # Let the other coroutines (like a game server) do their job
+            await asyncio.sleep(0)
+            with global_tracer.span("events"):
+                if not self._process_events():
                     return
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_q and event.mod & (pygame.KMOD_CTRL | pygame.KMOD_META):
-                        sys.exit(0)
-                    self.keyboard._press(event.key)
-                elif event.type == pygame.KEYUP:
-                    self.keyboard._release(event.key)
-
-                self._handle_event(event)
+            self._check_preload()
 
+            tick_start = time.perf_counter()
             global_clock.tick(dt)
-            fps_calc.push(1.0 / dt)
-            if fps_calc.counter == 100:
-                fps = fps_calc.aver()
-                print(f"fps {fps}")
+            self._update(dt)
+            self._simulated_time += dt
+            ticks += 1
+
+            if self.headless_render_every and ticks % self.headless_render_every == 0:
+                self._scene_screen().clear()
+                self._draw()
+            self._frame_stats.push((time.perf_counter() - tick_start) * 1000)
+
+            tps_ticks += 1
+            elapsed = time.perf_counter() - tps_start
+            if elapsed >= 1.0:
+                self._ticks_per_second = tps_ticks / elapsed
+                # Available as `ticks_per_second`, not printed to keep the server logs clean
+                global_tracer.counter("ticks_per_second", tps=self._ticks_per_second)
+                tps_ticks = 0
+                tps_start = time.perf_counter()
+
+        elapsed = time.perf_counter() - start
+        if ticks and elapsed > 0:
+            self._ticks_per_second = ticks / elapsed
+
+    def _process_events(self) -> bool:
+        """
+        Dispatch all the pending pygame events to the active scene.
+
+        Returns:
+            bool: False if the application should quit
+        """
+        event: pygame.event.Event
+        for event in pygame.event.get():
+
+            if event.type == pygame.VIDEORESIZE:
+                self.resolution = (event.w, event.h)
+
+            if event.type == pygame.QUIT:
+                self.change_scene(None)  # Trigger Scene.on_exit()
+                return False
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_q and event.mod & (pygame.KMOD_CTRL | pygame.KMOD_META):
+                    sys.exit(0)
+                self.keyboard._press(event.key)
+            elif event.type == pygame.KEYUP:
+                self.keyboard._release(event.key)
+
+            self._handle_event(event)
+        return True
+
+    def _adapt_render_scale(self, frame_time: float) -> None:
+        """
+        Adjust the render scale in the adaptive mode.
+
+        Args:
+            frame_time (float): time of the last frame processing in milliseconds, without the frame limiter delay
+        """
+        adaptive_render_scale = self._adaptive_render_scale
+        if adaptive_render_scale is None:
+            return
+        # Without the update rate the budget of 60 FPS is used
+        budget = 1000.0 / (self._update_rate or 60)
+        scale = adaptive_render_scale.scale
+        if adaptive_render_scale.push(frame_time, budget) != scale:
+            global_tracer.counter("render_scale", scale=adaptive_render_scale.scale)
+            self._update_render_screen()
+
+    def _fixed_update(self, fixed_update_rate: int, dt: float, accumulator: float) -> float:
+        """
+        Run the simulation steps of constant length for the frame time.
 
-            await sync_to_async(self._update)(dt)
-            await sync_to_async(self._draw)()
+        The update is called directly in the main loop, so the simulation is deterministic and does not depend on the rendering rate.
 
-            self._screen.draw.text(f"FPS: {fps}", pos=(0, 0))
+        Args:
+            fixed_update_rate (int): simulation steps per second
+            dt (float): time in seconds since the last frame
+            accumulator (float): simulation time left from the previous frames
 
-            pygame.display.update()
+        Returns:
+            float: simulation time left for the next frames
+        """
+        fixed_dt = 1.0 / fixed_update_rate
+        accumulator += dt
+
+        steps = 0
+        while accumulator >= fixed_dt:
+            if steps == self.max_fixed_steps:
+                # The simulation cannot keep up, drop the rest of the accumulated time
+                accumulator %= fixed_dt
+                break
+            global_clock.tick(fixed_dt)
+            self._update(fixed_dt)
+            accumulator -= fixed_dt
+            steps += 1
+
+        self._render_alpha = accumulator / fixed_dt
+        return accumulator
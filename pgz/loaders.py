@@ -10,6 +10,11 @@ The example of default.tmx file loading is shown below:
 ```
 tmx = pgz.maps.default
 ```
+
+The `headless_maps` loader loads TMX maps without the tile images. Such maps can not be rendered, but can be used by `pgz.HeadlessScrollMap` on servers:
+```
+tmx = pgz.headless_maps.default
+```
 """
 
 
@@ -27,6 +32,12 @@ class MapLoader(ResourceLoader):
         return load_pygame(path)
 
 
+class HeadlessMapLoader(MapLoader):
+    def _load(self, path: str) -> TiledMap:
+        return TiledMap(path)
+
+
 maps = MapLoader("maps")
+headless_maps = HeadlessMapLoader("maps")
 
 set_resource_root = set_root
@@ -9,7 +9,7 @@ import pygame
 import websockets
 from asgiref.sync import async_to_sync
 
-from pgz.utils.fps_calc import FPSCalc
+from pgz.utils.frame_stats import FrameStats
 
 # import jsonrpc_base
 from ..actor import Actor
@@ -17,7 +17,8 @@ from ..scene import Scene
 from ..scenes.map_scene import MapScene
 from ..screen import Screen
 from ..utils.collision_detector import CollisionDetector
-from ..utils.scroll_map import ScrollMap
+from ..utils.scroll_map import BaseScrollMap, ScrollMap
+from ..utils.tracer import global_tracer
 from .screen_rpc import RPCScreenClient, RPCScreenServer
 
 # from pgz.utils.profiler import profile
@@ -104,19 +105,20 @@ class MultiplayerSceneServer:
     ```
     """
 
-    def __init__(self, map: ScrollMap, HeadlessSceneClass: Scene):
+    def __init__(self, map: BaseScrollMap, HeadlessSceneClass: Scene, collision_cell_size: Optional[int] = None):
         """Create MultiplayerSceneServer instance.
 
         Args:
-            map (ScrollMap): a `pgz.ScrollMap` object. Will be shared across all the scenes in the server
+            map (BaseScrollMap): a `pgz.ScrollMap` or `pgz.HeadlessScrollMap` object. Will be shared across all the scenes in the server
             HeadlessSceneClass (Callable): a scene class. HeadlessSceneClass will be used as a scene object factory.
+            collision_cell_size (Optional[int], optional): cell size of the spatial index used by the shared collision detector. Defaults to None.
         """
         super().__init__()
 
         # The map object will be shared between all the headless scenes
         self._map = map
         # The collision detector object will be shared between all the headless scenes
-        self._collision_detector = CollisionDetector()
+        self._collision_detector = CollisionDetector(cell_size=collision_cell_size)
 
         self._latest_actors = {}
 
@@ -132,9 +134,10 @@ class MultiplayerSceneServer:
 
         self._notifications_to_send = asyncio.Queue()
 
-        if PROFILE:
-            self.processing_calc = FPSCalc()
-            self.delivery_calc = FPSCalc()
+        # Statistics in milliseconds: server tick processing, events notifications delivery and processing
+        self.tick_stats = FrameStats()
+        self.delivery_stats = FrameStats()
+        self.processing_stats = FrameStats()
 
     # @profile()
     def update(self, dt: float) -> None:
@@ -143,69 +146,80 @@ class MultiplayerSceneServer:
         Args:
             dt (float): time in microseconds/1000. since the last update
         """
+        if PROFILE:
+            tick_start = datetime.datetime.now()
 
-        try:
-            while True:
-                client = self._clients_to_delete.get_nowait()
-                # First of all remove dead client
-                del self._clients[client.websocket]
-
-                client.scene.on_exit(None)
-                client.scene.remove_actors()
-        except asyncio.QueueEmpty:
-            pass
+        with global_tracer.span("server.clients", category="server"):
+            try:
+                while True:
+                    client = self._clients_to_delete.get_nowait()
+                    # First of all remove dead client
+                    del self._clients[client.websocket]
 
-        try:
-            while True:
-                client = self._clients_to_add.get_nowait()
-                self._clients[client.websocket] = client
-                # Finally call on_enter of the new scene
-                client.scene.on_enter(None)
-        except asyncio.QueueEmpty:
-            pass
+                    client.scene.on_exit(None)
+                    client.scene.remove_actors()
+            except asyncio.QueueEmpty:
+                pass
 
-        # Dispatch all the accumulated events
-        for client in self._clients.values():
             try:
                 while True:
-                    event = client.events.get_nowait()
-                    client.scene.dispatch_event(event)
+                    client = self._clients_to_add.get_nowait()
+                    self._clients[client.websocket] = client
+                    # Finally call on_enter of the new scene
+                    client.scene.on_enter(None)
             except asyncio.QueueEmpty:
                 pass
 
+        # Dispatch all the accumulated events
+        with global_tracer.span("server.events", category="server"):
+            for client in self._clients.values():
+                try:
+                    while True:
+                        event = client.events.get_nowait()
+                        client.scene.dispatch_event(event)
+                except asyncio.QueueEmpty:
+                    pass
+
         # Update all the client scenes
-        self._map.update(dt)
-        for client in self._clients.values():
-            client.scene.update(dt)
+        with global_tracer.span("server.update", category="server"):
+            self._map.update(dt)
+            for client in self._clients.values():
+                client.scene.update(dt)
 
         # Server calls internal redraw
-        for client in self._clients.values():
-            # Update screen
-            client.scene.draw(client.screen)
+        with global_tracer.span("server.draw", category="server"):
+            for client in self._clients.values():
+                # Update screen
+                client.scene.draw(client.screen)
 
         # Get state of all the actors
-        actors_changed, actors_state_notification = self._get_actors_state()
+        with global_tracer.span("server.actors_state", category="server"):
+            actors_changed, actors_state_notification = self._get_actors_state()
 
-        for websocket, client in self._clients.items():
+        with global_tracer.span("server.notifications", category="server"):
+            for websocket, client in self._clients.items():
 
-            # Get changes from the client's screen
-            screen_changed, data = client.screen.get_messages()
-            if not screen_changed and not actors_changed:
-                # Nothing was changed skip notification sending
-                continue
+                # Get changes from the client's screen
+                screen_changed, data = client.screen.get_messages()
+                if not screen_changed and not actors_changed:
+                    # Nothing was changed skip notification sending
+                    continue
 
-            # Create a notification object
-            state_notification = StateNotification(actors=actors_state_notification)
-            if PROFILE:
-                state_notification.time = datetime.datetime.now()
+                # Create a notification object
+                state_notification = StateNotification(actors=actors_state_notification)
+                if PROFILE:
+                    state_notification.time = datetime.datetime.now()
+
+                if screen_changed:
+                    # Attach the screen update to the notification
+                    state_notification.screen = data
 
-            if screen_changed:
-                # Attach the screen update to the notification
-                state_notification.screen = data
+                self._notifications_to_send.put_nowait((websocket, state_notification))
+                # Sent the notification
+                # async_to_sync(websocket.send)(state_notification.json())
 
-            self._notifications_to_send.put_nowait((websocket, state_notification))
-            # Sent the notification
-            # async_to_sync(websocket.send)(state_notification.json())
+        if PROFILE:
+            self.tick_stats.push((datetime.datetime.now() - tick_start).total_seconds() * 1000.0)
 
     # @profile()
     def _get_actors_state(self) -> ActorsStateNotification:
@@ -318,28 +332,27 @@ class MultiplayerSceneServer:
             websocket (websockets.WebSocketClientProtocol): ws client object sent a message
             message (str): message body
         """
-        try:
-            client = self._clients[websocket]
-            events_notification = EventsNotification.parse_raw(message)
+        with global_tracer.span("server.recv", category="network", args={"size": len(message)}):
+            try:
+                client = self._clients[websocket]
+                events_notification = EventsNotification.parse_raw(message)
 
-            if PROFILE:
-                now = datetime.datetime.now()
-                delivery = now - events_notification.time
+                if PROFILE:
+                    now = datetime.datetime.now()
+                    delivery = now - events_notification.time
 
-            for event in events_notification.events:
-                # Accumulate events
-                client.events.put_nowait(pygame.event.Event(event.event_type, **event.attributes))
+                for event in events_notification.events:
+                    # Accumulate events
+                    client.events.put_nowait(pygame.event.Event(event.event_type, **event.attributes))
 
-            if PROFILE:
-                processing = datetime.datetime.now() - now
+                if PROFILE:
+                    processing = datetime.datetime.now() - now
 
-                self.delivery_calc.push(delivery.microseconds / 1000.0)
-                self.processing_calc.push(processing.microseconds / 1000.0)
-                if self.delivery_calc.counter == 100:
-                    print(f"EventsNotification delivery {self.delivery_calc.aver()} processing {self.processing_calc.aver()}")
+                    self.delivery_stats.push(delivery.total_seconds() * 1000.0)
+                    self.processing_stats.push(processing.total_seconds() * 1000.0)
 
-        except Exception as e:
-            print(f"_handle_client_message: {e}")
+            except Exception as e:
+                print(f"_handle_client_message: {e}")
 
     async def _serve_client(self, websocket: websockets.WebSocketClientProtocol, path: str) -> None:
         """Handler funcion for incoming websocket connection.
@@ -363,7 +376,9 @@ class MultiplayerSceneServer:
     async def _send_notifications(self) -> None:
         while True:
             (websocket, notification) = await self._notifications_to_send.get()
-            asyncio.ensure_future(websocket.send(notification.json()))
+            with global_tracer.span("server.send", category="network"):
+                message = notification.json()
+                asyncio.ensure_future(websocket.send(message))
 
     def start_server(self, host: str = "localhost", port: int = 8765) -> None:
         """Start the scene server.
@@ -417,10 +432,11 @@ class RemoteSceneClient(MapScene):
         self._screen_client = RPCScreenClient()
         self._client_data = client_data
 
-        if PROFILE:
-            self.processing_calc = FPSCalc()
-            self.delivery_calc = FPSCalc()
-            self.events_count = FPSCalc()
+        # Statistics in milliseconds: state notifications delivery and processing
+        self.delivery_stats = FrameStats()
+        self.processing_stats = FrameStats()
+        # Statistics of number of events sent in one notification
+        self.events_stats = FrameStats()
 
     def on_exit(self, next_scene: Optional[Scene]) -> None:
         """
@@ -500,12 +516,11 @@ class RemoteSceneClient(MapScene):
 
             if PROFILE:
                 events_notification.time = datetime.datetime.now()
-                self.events_count.push(len(events))
-                if self.events_count.counter == 100:
-                    print(f"Event queue {self.events_count.aver()}")
+                self.events_stats.push(len(events))
 
             # send message
-            await self._websocket.send(events_notification.json())
+            with global_tracer.span("client.send", category="network", args={"events": len(events)}):
+                await self._websocket.send(events_notification.json())
 
     # @profile()
     def handle_event(self, event: pygame.event.Event) -> None:
@@ -582,42 +597,41 @@ class RemoteSceneClient(MapScene):
         """Handle notifications coming form remote scene."""
         message: str
         async for message in self._websocket:  # type: ignore
-            try:
-                # Parse the message
-                state_notification = StateNotification.parse_raw(message)
+            with global_tracer.span("client.recv", category="network", args={"size": len(message)}):
+                try:
+                    # Parse the message
+                    state_notification = StateNotification.parse_raw(message)
 
-                if PROFILE:
-                    now = datetime.datetime.now()
-                    delivery = now - state_notification.time
+                    if PROFILE:
+                        now = datetime.datetime.now()
+                        delivery = now - state_notification.time
 
-                uuid: str
-                added_actor: AddedActor
-                # Add new actors if required
-                for uuid, added_actor in state_notification.actors.added.items():
-                    self._add_actor_on_client(uuid, added_actor.scene_uuid, added_actor.image, added_actor.is_central)
+                    uuid: str
+                    added_actor: AddedActor
+                    # Add new actors if required
+                    for uuid, added_actor in state_notification.actors.added.items():
+                        self._add_actor_on_client(uuid, added_actor.scene_uuid, added_actor.image, added_actor.is_central)
 
-                acrtor_state: Dict[str, Any]
-                # Modify actors if required
-                for uuid, acrtor_state in state_notification.actors.modified.items():
-                    self._modify_actor(uuid, acrtor_state)
+                    acrtor_state: Dict[str, Any]
+                    # Modify actors if required
+                    for uuid, acrtor_state in state_notification.actors.modified.items():
+                        self._modify_actor(uuid, acrtor_state)
 
-                # Delete actors if required
-                for uuid in state_notification.actors.removed:
-                    self._remove_actor_on_client(uuid)
+                    # Delete actors if required
+                    for uuid in state_notification.actors.removed:
+                        self._remove_actor_on_client(uuid)
 
-                # Modify screen object if required
-                if state_notification.screen:
-                    self._modify_screnn(state_notification.screen)
+                    # Modify screen object if required
+                    if state_notification.screen:
+                        self._modify_screnn(state_notification.screen)
 
-                if PROFILE:
-                    processing = datetime.datetime.now() - now
+                    if PROFILE:
+                        processing = datetime.datetime.now() - now
 
-                    self.delivery_calc.push(delivery.microseconds / 1000.0)
-                    self.processing_calc.push(processing.microseconds / 1000.0)
-                    if self.delivery_calc.counter == 100:
-                        print(f"StateNotification delivery {self.delivery_calc.aver()} processing {self.processing_calc.aver()}")
-            except Exception as e:
-                print(f"_handle_messages: {e}")
+                        self.delivery_stats.push(delivery.total_seconds() * 1000.0)
+                        self.processing_stats.push(processing.total_seconds() * 1000.0)
+                except Exception as e:
+                    print(f"_handle_messages: {e}")
 
     def _add_actor_on_client(self, uuid: UUID, scene_uuid: UUID, image: str, central_actor: bool) -> None:
         """Add actor to the scene.
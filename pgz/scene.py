@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Optional, Tuple
 from uuid import uuid4
 
 import pygame
@@ -127,6 +127,10 @@ class Scene(EventDispatcher):
     _resolution: Optional[Tuple[int, int]] = None
     _update_rate: Optional[int] = None
 
+    # Assets loaded before the scene activation with `change_scene(scene, preload=True)`.
+    # Asset names by the kind: "images", "sounds", "maps" or "headless_maps". For example: {"images": ["ship"], "maps": ["default"]}
+    assets: Optional[Mapping[str, Iterable[str]]] = None
+
     def __init__(self, title: Optional[str] = None, resolution=None, update_rate: Optional[int] = None) -> None:
         self._application: Optional["Application"] = None
         if title is not None:
@@ -161,10 +165,30 @@ class Scene(EventDispatcher):
         """
         return self._client_data
 
-    def change_scene(self, new_scene: Optional["Scene"]) -> None:
+    def change_scene(self, new_scene: Optional["Scene"], preload: bool = False) -> None:
+        """
+        Change the active scene of the application.
+
+        Args:
+            new_scene (Optional[Scene]): the scene to change into
+            preload (bool, optional): load `assets` of the new scene on background threads first, and keep running the current scene meanwhile.
+                `preload_progress` can be used to show the loading progress. Defaults to False.
+        """
         if not self._application:
             raise Exception("Application was not configured properly.")
-        self._application.change_scene(new_scene)
+        self._application.change_scene(new_scene, preload)
+
+    @property
+    def preload_progress(self) -> float:
+        """
+        Get loading progress of the assets of the next scene.
+
+        Returns:
+            float: loading progress in range [0, 1], 1.0 if nothing is loading
+        """
+        if not self._application:
+            return 1.0
+        return self._application.preload_progress
 
     @property
     def title(self) -> str:
@@ -212,6 +236,19 @@ class Scene(EventDispatcher):
             return
         self._application.resolution = value
 
+    @property
+    def render_size(self) -> Tuple[int, int]:
+        """Get size of the screen the scene is drawn into
+
+        Differs from the resolution if the application render scale is not 1 and the scene supports the render scale.
+
+        Returns:
+            Tuple[int, int]: render size
+        """
+        if not self._application:
+            raise Exception("Application was not configured properly.")
+        return self._application.render_size
+
     @property
     def update_rate(self) -> int:
         """Get application update rate
@@ -235,6 +272,30 @@ class Scene(EventDispatcher):
             return
         self._application.update_rate = value
 
+    @property
+    def render_alpha(self) -> float:
+        """Get render interpolation factor of the application
+
+        Can be used in `draw` for the interpolation between the two last simulation steps in the fixed-timestep mode.
+
+        Returns:
+            float: render interpolation factor in range [0, 1)
+        """
+        if not self._application:
+            return 0.0
+        return self._application.render_alpha
+
+    @property
+    def dirty_rects_enabled(self) -> bool:
+        """Check if the application runs in the dirty rects rendering mode
+
+        Returns:
+            bool: True if only the dirty rects of the scene are pushed to the display
+        """
+        if not self._application:
+            return False
+        return self._application.dirty_rects
+
     @property
     def clock(self) -> Clock:
         """
@@ -265,6 +326,54 @@ class Scene(EventDispatcher):
             screen (Screen): screen to draw the scene on
         """
 
+    def needs_clear(self) -> bool:
+        """
+        Override this for the dirty rects rendering mode.
+
+        The method is called before `draw`. If True is returned, the screen is cleared and the whole screen is pushed to the display.
+
+        Returns:
+            bool: True if the scene requires the screen clearing. The default implementation always returns True.
+        """
+        return True
+
+    def supports_render_scale(self) -> bool:
+        """
+        Override this to draw the scene at the application render scale.
+
+        If True is returned, the scene is drawn into the off-screen screen of `render_size`, which is scaled up to the window,
+        so the scene should show the same content on a smaller screen. Otherwise the scene is drawn directly on the window.
+        The event positions are in the window coordinates in both cases.
+
+        Returns:
+            bool: True if the scene can be drawn at the render scale. The default implementation always returns False.
+        """
+        return False
+
+    def get_dirty_rects(self) -> Optional[List[pygame.Rect]]:
+        """
+        Override this for the dirty rects rendering mode.
+
+        The method is called after `draw`, if the screen was not cleared.
+
+        Returns:
+            Optional[List[pygame.Rect]]: screen areas changed by the last `draw`, None if the whole screen should be pushed to the display.
+                The default implementation always returns None.
+        """
+        return None
+
+    def add_dirty_rect(self, rect: pygame.Rect) -> None:
+        """
+        Override this for the dirty rects rendering mode.
+
+        Called by the application for the screen areas drawn over the scene, like the FPS text.
+        The scene should erase and redraw the area on the next `draw` and report it in `get_dirty_rects`.
+        The default implementation does nothing.
+
+        Args:
+            rect (pygame.Rect): screen area to redraw
+        """
+
     def update(self, dt: float) -> None:
         """
         Override this with the scene update tick.
@@ -1,9 +1,16 @@
-from typing import Dict, List, Optional
+import math
+from typing import Dict, Iterable, List, Optional, Set, Tuple, cast
 
-from ..actor import Actor, SpriteDelegate
+import pygame
+
+from ..actor import Actor, BaseActor, SpriteDelegate
 from ..scene import Scene
 from ..screen import Screen
 from ..utils.collision_detector import CollisionDetector
+from ..utils.spatial_hash import SpatialHash
+from ..utils.static_layer import StaticLayer
+from ..utils.sweep import SweepHit, Vector
+from ..utils.tracer import global_tracer
 
 
 class ActorScene(Scene):
@@ -11,8 +18,23 @@ class ActorScene(Scene):
     Scene implementation for management of multiple actors.
 
     Actors also can be added to different collision groups, which allows easily identify collision of an actor with a specific actor group.
+
+    In the dirty rects rendering mode (see `pgz.Application`) only the areas of the changed actors are redrawn and pushed to the display.
+    The areas are tracked by the actors position, size, angle and image changes.
+    If the scene draws anything else, the changed areas should be reported with `add_dirty_rect`.
+
+    Only the actors overlapping the screen are drawn. The actors are found with a spatial index, so the culling cost does not depend on
+    the number of the off-screen actors. `drawn_count` and `culled_count` report the numbers of the last draw.
+
+    Actors without an overridden `draw` method are drawn with a single `Surface.blits` call. Actors with a custom `draw` are still drawn
+    by their own method in the same order.
+
+    Actors added with `static=True` are pre-rendered into cached chunk surfaces below the other actors (see `pgz.utils.static_layer.StaticLayer`).
     """
 
+    # Color used for erasing the changed areas in the dirty rects rendering mode
+    BACKGROUND_COLOR = (0, 0, 0)
+
     def __init__(self) -> None:
         """
         Create an ActorScene object
@@ -25,6 +47,33 @@ class ActorScene(Scene):
         # Notifies all the actors that accumulation of incremental changes is required. This one used bu multiplayer.
         self.accumulate_changes = False
 
+        # Screen areas of the actors as they were drawn last time
+        self._drawn_rects: Dict[str, pygame.Rect] = {}
+        # Actors changed since the last draw
+        self._changed_actors: Set[Actor] = set()
+        # Changed areas reported for the next draw
+        self._pending_dirty_rects: List[pygame.Rect] = []
+        # Changed areas of the last draw. None means the whole screen
+        self._dirty_rects: Optional[List[pygame.Rect]] = None
+        # Redraw the whole scene on the next draw
+        self._full_redraw = True
+
+        # Skip drawing of the actors outside of the screen
+        self.culling = True
+        # Spatial index of the actors screen areas
+        self._draw_index: SpatialHash[Actor] = SpatialHash(cell_size=256)
+        # Drawing order of the actors
+        self._draw_order: Dict[str, int] = {}
+        self._next_draw_order = 0
+        # Numbers of the drawn and culled actors of the last draw
+        self.drawn_count = 0
+        self.culled_count = 0
+        # Sort the batched blits by the source image. Might be faster for many sprites sharing a few images,
+        # but the overlapping actors are not drawn in the scene order anymore
+        self.sort_blits = False
+        # Pre-rendered static actors
+        self._static_layer = StaticLayer()
+
     def set_collision_detector(self, collision_detector: CollisionDetector):
         """
         Set external collsinion detector object.
@@ -35,13 +84,19 @@ class ActorScene(Scene):
 
         self._collision_detector = collision_detector
 
-    def add_actor(self, actor: Actor, group_name: str = "") -> None:
+    @property
+    def static_layer(self) -> StaticLayer:
+        """Get layer of the pre-rendered static actors"""
+        return self._static_layer
+
+    def add_actor(self, actor: Actor, group_name: str = "", static: bool = False) -> None:
         """
         Add actor to the scene and add the actor to the collision group.
 
         Args:
             actor (Actor): actor to add
             group_name (str, optional): Collision group name. Defaults to "".
+            static (bool, optional): the actor is rarely changed (decoration, building, etc.) and can be pre-rendered. Defaults to False.
         """
 
         # Notify actor that accumulation of incremental changes is required. This one used bu multiplayer.
@@ -57,6 +112,16 @@ class ActorScene(Scene):
         self._collision_detector.add_actor(actor, group_name)
         # Add deleter callback to the actor. This one is used for actor's suicide
         actor.deleter = self.remove_actor
+        if static:
+            # The chunks of the static layer are re-rendered once the actor is changed
+            actor.add_change_listener(self._on_static_actor_changed)
+            self._add_pending_dirty_rect(self.static_layer.add(actor))
+            return
+        # Track the changed areas for the dirty rects rendering
+        actor.add_change_listener(self._on_actor_changed)
+        self._changed_actors.add(actor)
+        self._draw_order[actor.uuid] = self._next_draw_order
+        self._next_draw_order += 1
 
     def remove_actor(self, actor: Actor) -> None:
         """
@@ -71,6 +136,18 @@ class ActorScene(Scene):
         del self._actors[actor.uuid]
         self._collision_detector.remove_actor(actor)
 
+        if actor in self.static_layer:
+            actor.remove_change_listener(self._on_static_actor_changed)
+            self._add_pending_dirty_rect(self.static_layer.remove(actor))
+            return
+        actor.remove_change_listener(self._on_actor_changed)
+        self._changed_actors.discard(actor)
+        self._draw_index.remove(actor)
+        self._draw_order.pop(actor.uuid, None)
+        drawn_rect = self._drawn_rects.pop(actor.uuid, None)
+        if drawn_rect:
+            self._add_pending_dirty_rect(drawn_rect)
+
     def remove_actors(self) -> None:
         """
         Remove all actors from the scene and the associated collision detector
@@ -116,6 +193,127 @@ class ActorScene(Scene):
             return sprite_deleg.actor
         return None
 
+    def collide_groups(self, group_a: str, group_b: str) -> List[Tuple[Actor, Actor]]:
+        """
+        Detect all collisions between the actors of two collision groups.
+
+        Args:
+            group_a (str): first collision group name
+            group_b (str): second collision group name
+
+        Returns:
+            List[Tuple[Actor, Actor]]: pairs of colliding actors (actor from `group_a`, actor from `group_b`)
+        """
+        return [
+            (cast(SpriteDelegate, sprite_a).actor, cast(SpriteDelegate, sprite_b).actor) for sprite_a, sprite_b in self._collision_detector.collide_groups(group_a, group_b)
+        ]
+
+    def sweep_group(self, actor: Actor, displacement: Vector, group_name: str = "") -> Optional[SweepHit]:
+        """
+        Detect the first collision of a moving actor with the actors in requested collision group.
+
+        Should be used for fast actors, which might jump over other actors between two updates.
+
+        Args:
+            actor (Actor): moving actor
+            displacement (Vector): movement vector of the actor in pixels
+            group_name (str, optional): Collision group name. Defaults to "".
+
+        Returns:
+            Optional[SweepHit]: the first impact, the target is the hit actor
+        """
+        hit = self._collision_detector.sweep_group(actor.sprite_delegate, displacement, group_name)
+        if hit:
+            return hit._replace(target=cast(SpriteDelegate, hit.target).actor)
+        return None
+
+    def query_radius(self, point: Vector, radius: float, group_name: Optional[str] = None, exclude: Optional[Actor] = None) -> List[Tuple[Actor, float]]:
+        """
+        Find actors within a radius from a point.
+
+        Args:
+            point (Vector): query point
+            radius (float): query radius in pixels
+            group_name (Optional[str], optional): Collision group name. All the groups are searched if None. Defaults to None.
+            exclude (Optional[Actor], optional): actor to skip, for example the actor making the query. Defaults to None.
+
+        Returns:
+            List[Tuple[Actor, float]]: (actor, distance) pairs sorted by the distance
+        """
+        sprite = exclude.sprite_delegate if exclude else None
+        return [(cast(SpriteDelegate, s).actor, distance) for s, distance in self._collision_detector.query_radius(point, radius, group_name, sprite)]
+
+    def nearest(
+        self, point: Vector, k: int = 1, group_name: Optional[str] = None, max_distance: float = math.inf, exclude: Optional[Actor] = None
+    ) -> List[Tuple[Actor, float]]:
+        """
+        Find k nearest actors to a point. For example, the nearest enemy within 300 pixels:
+        ```
+        enemies = self.nearest(self.ship.pos, group_name="enemies", max_distance=300, exclude=self.ship)
+        ```
+
+        Args:
+            point (Vector): query point
+            k (int, optional): number of actors to find. Defaults to 1.
+            group_name (Optional[str], optional): Collision group name. All the groups are searched if None. Defaults to None.
+            max_distance (float, optional): ignore actors farther than the distance. Defaults to math.inf.
+            exclude (Optional[Actor], optional): actor to skip, for example the actor making the query. Defaults to None.
+
+        Returns:
+            List[Tuple[Actor, float]]: up to k (actor, distance) pairs sorted by the distance
+        """
+        sprite = exclude.sprite_delegate if exclude else None
+        return [(cast(SpriteDelegate, s).actor, distance) for s, distance in self._collision_detector.nearest(point, k, group_name, max_distance, sprite)]
+
+    def _on_actor_changed(self, actor: Actor) -> None:
+        self._changed_actors.add(actor)
+
+    def _on_static_actor_changed(self, actor: Actor) -> None:
+        self._add_pending_dirty_rect(self.static_layer.update(actor))
+
+    def _add_pending_dirty_rect(self, rect: pygame.Rect) -> None:
+        # The whole scene is redrawn anyway if the dirty rects are disabled, and nothing is drawn in the headless mode
+        if self.dirty_rects_enabled:
+            self._pending_dirty_rects.append(rect)
+
+    @staticmethod
+    def _screen_rect(actor: Actor) -> pygame.Rect:
+        # Inflated a bit to cover the rounding of the float positions
+        return pygame.Rect(actor.rect).inflate(2, 2)
+
+    def add_dirty_rect(self, rect: pygame.Rect) -> None:
+        """
+        Report a changed screen area for the dirty rects rendering mode.
+
+        Should be used if the scene draws anything except its actors. The area will be erased and redrawn on the next draw.
+
+        Args:
+            rect (pygame.Rect): changed screen area
+        """
+        self._add_pending_dirty_rect(pygame.Rect(rect))
+
+    def on_enter(self, previous_scene: Optional[Scene]) -> None:
+        super().on_enter(previous_scene)
+        self._full_redraw = True
+
+    def needs_clear(self) -> bool:
+        """
+        Overriden dirty rects method
+
+        Returns:
+            bool: True if the whole scene has to be redrawn
+        """
+        return self._full_redraw or not self.dirty_rects_enabled
+
+    def get_dirty_rects(self) -> Optional[List[pygame.Rect]]:
+        """
+        Overriden dirty rects method
+
+        Returns:
+            Optional[List[pygame.Rect]]: screen areas changed by the last draw
+        """
+        return self._dirty_rects
+
     def draw(self, surface: Screen) -> None:
         """
         Overriden rendering method
@@ -128,8 +326,99 @@ class ActorScene(Scene):
             screen (Screen): screen to draw the scene on
         """
 
-        for actor in self._actors.values():
+        with global_tracer.span("ActorScene.draw"):
+            changed_rects = self._sync_changed_actors()
+            if self._full_redraw or not self.dirty_rects_enabled:
+                self._draw_all(surface)
+            else:
+                self._draw_dirty(surface, changed_rects)
+            global_tracer.counter("ActorScene.culling", drawn=self.drawn_count, culled=self.culled_count)
+
+    def _sync_changed_actors(self) -> List[pygame.Rect]:
+        """Move the changed actors in the draw index
+
+        Returns:
+            List[pygame.Rect]: old and new areas of the changed actors
+        """
+        changed_rects: List[pygame.Rect] = []
+        for actor in self._changed_actors:
+            old_rect = self._drawn_rects.get(actor.uuid)
+            new_rect = self._screen_rect(actor)
+            if old_rect != new_rect:
+                if old_rect:
+                    changed_rects.append(old_rect)
+                self._drawn_rects[actor.uuid] = new_rect
+                self._draw_index.update(actor, new_rect)
+            # The image or angle might be changed without the rect change
+            changed_rects.append(new_rect)
+        self._changed_actors.clear()
+        return changed_rects
+
+    def _actors_in(self, rect: pygame.Rect) -> List[Actor]:
+        """Get actors overlapping the area in the drawing order"""
+        drawn_rects = self._drawn_rects
+        actors = [actor for actor in self._draw_index.query(rect) if rect.colliderect(drawn_rects[actor.uuid])]
+        draw_order = self._draw_order
+        actors.sort(key=lambda actor: draw_order[actor.uuid])
+        return actors
+
+    def _blit_actors(self, surface: Screen, actors: Iterable[Actor]) -> None:
+        """Draw actors, the plain image blits are batched into `Surface.blits` calls"""
+        screen_surface = surface.surface
+        batch: List[Tuple[pygame.Surface, Tuple[float, float]]] = []
+        for actor in actors:
+            if type(actor).draw is BaseActor.draw:
+                batch.append((actor.sprite, actor.topleft))
+                continue
+            # Keep the drawing order: the batched actors are under the custom drawn one
+            self._flush_blits(screen_surface, batch)
             actor.draw(surface)
+        self._flush_blits(screen_surface, batch)
+
+    def _flush_blits(self, screen_surface: pygame.Surface, batch: List[Tuple[pygame.Surface, Tuple[float, float]]]) -> None:
+        if not batch:
+            return
+        if self.sort_blits:
+            batch.sort(key=lambda blit: id(blit[0]))
+        screen_surface.blits(batch, doreturn=False)
+        batch.clear()
+
+    def _draw_all(self, surface: Screen) -> None:
+        screen_rect = surface.surface.get_rect()
+        self.static_layer.draw(surface.surface, screen_rect)
+        if self.culling:
+            actors = self._actors_in(screen_rect)
+        else:
+            actors = [actor for actor in self._actors.values() if actor not in self.static_layer]
+        self._blit_actors(surface, actors)
+        self.drawn_count = len(actors)
+        self.culled_count = len(self._draw_order) - len(actors)
+
+        self._pending_dirty_rects = []
+        self._dirty_rects = None
+        self._full_redraw = False
+
+    def _draw_dirty(self, surface: Screen, changed_rects: List[pygame.Rect]) -> None:
+        dirty_rects = self._pending_dirty_rects + changed_rects
+        self._pending_dirty_rects = []
+
+        # Erase the changed areas and redraw all the actors overlapping them, clipped by the area
+        screen_surface = surface.surface
+        screen_rect = screen_surface.get_rect()
+        dirty_rects = [rect.clip(screen_rect) for rect in dirty_rects if rect.colliderect(screen_rect)]
+        clip = screen_surface.get_clip()
+        drawn = set()
+        for rect in dirty_rects:
+            screen_surface.set_clip(rect)
+            screen_surface.fill(self.BACKGROUND_COLOR, rect)
+            self.static_layer.draw(screen_surface, rect)
+            actors = self._actors_in(rect)
+            self._blit_actors(surface, actors)
+            drawn.update(actors)
+        screen_surface.set_clip(clip)
+        self._dirty_rects = dirty_rects
+        self.drawn_count = len(drawn)
+        self.culled_count = len(self._draw_order) - len(drawn)
 
     def update(self, dt: float) -> None:
         """
@@ -143,5 +432,6 @@ class ActorScene(Scene):
             dt (float): time in milliseconds since the last update
         """
 
-        for actor in self._actors.values():
-            actor.update(dt)
+        with global_tracer.span("ActorScene.update"):
+            for actor in self._actors.values():
+                actor.update(dt)
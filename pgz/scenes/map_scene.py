@@ -1,10 +1,15 @@
-from typing import Optional
+from typing import List, Optional
 
+import numpy as np
 import pygame
 
 from ..actor import Actor
 from ..screen import Screen
-from ..utils.scroll_map import ScrollMap
+from ..utils.scroll_map import BaseScrollMap
+from ..utils.static_layer import StaticLayer
+from ..utils.sweep import SweepHit, Vector
+from ..utils.tile_grid import RayHit
+from ..utils.tracer import global_tracer
 from .actor_scene import ActorScene
 
 
@@ -22,7 +27,7 @@ class MapScene(ActorScene):
     which allows easily identify collision of an actor with a specific actor group
     """
 
-    def __init__(self, map: Optional[ScrollMap] = None):
+    def __init__(self, map: Optional[BaseScrollMap] = None):
         """
         Create a MapScene object
 
@@ -33,7 +38,7 @@ class MapScene(ActorScene):
         ```
 
         Args:
-            map (Optional[ScrollMap], optional): Loaded map object. Defaults to None.
+            map (Optional[BaseScrollMap], optional): Loaded map object, `ScrollMap` or `HeadlessScrollMap`. Defaults to None.
         """
         super().__init__()
         # The map object used by the scene
@@ -46,17 +51,22 @@ class MapScene(ActorScene):
         self.block_update = False
 
     @property
-    def map(self) -> ScrollMap:
+    def map(self) -> BaseScrollMap:
         """
         Get map object
 
         Returns:
-            ScrollMap: the map object used by the scene
+            BaseScrollMap: the map object used by the scene
         """
         if not self._map:
             raise Exception("Map was not configured")
         return self._map
 
+    @property
+    def static_layer(self) -> StaticLayer:
+        """Get layer of the pre-rendered static actors. The static actors are drawn by the map."""
+        return self.map.static_layer
+
     def set_map(self, map):
         """
         Set map object
@@ -71,14 +81,16 @@ class MapScene(ActorScene):
         Overriden events dispatch method
         Used for mouse cursor position transformation into map "world coordinates"
 
+        The mouse positions are in the window coordinates, the map view covers the window at any render scale.
+
         Args:
             event (pygame.event.Event): pygame Event object
         """
         if event.type in [pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP]:
             view_pos = event.pos
             scene_pos = self.map.transform(view_pos)
-            event.scene_pos = scene_pos  # type: ignore
-            event.pos = scene_pos  # type: ignore
+            event.scene_pos = scene_pos
+            event.pos = scene_pos
         super().dispatch_event(event)
 
     def update(self, dt: float) -> None:
@@ -91,11 +103,18 @@ class MapScene(ActorScene):
         Args:
             dt (float): time in milliseconds since the last update
         """
+        if self.block_draw:
+            # The changed areas are never drawn
+            self._pending_dirty_rects = []
         if self.block_update:
             return
 
         # DO NOT CALL ActorScene.update !
-        self.map.update(dt)
+        with global_tracer.span("MapScene.update"):
+            self.map.update(dt)
+            # The static actors are not the map sprites
+            for actor in self.static_layer:
+                actor.update(dt)
 
     def draw(self, screen: Screen) -> None:
         """
@@ -110,14 +129,48 @@ class MapScene(ActorScene):
         if self.block_draw:
             return
 
+        render_size = (screen.width, screen.height)
+        # The map view covers the window, the screen is smaller than the window if the render scale is not 1
+        size = self.resolution if self._application else render_size
+        if (self.map.get_size(), self.map.get_render_size()) != (size, render_size):
+            # The sizes are changed by the window resize or the render scale change
+            self.map.set_size(size, render_size)
+
         if self._central_actor:
             # center the map/screen on our Ship
             self.map.set_center(self._central_actor.pos)
 
         # DO NOT CALL ActorScene.draw !
-        self.map.draw(screen)
+        with global_tracer.span("MapScene.draw"):
+            self.map.draw(screen)
+        # The whole screen is redrawn anyway
+        self._pending_dirty_rects = []
+
+    def needs_clear(self) -> bool:
+        """
+        Overriden dirty rects method
+
+        The map covers the whole screen, so the screen clearing is skipped in the dirty rects rendering mode.
+        """
+        return not self.dirty_rects_enabled
+
+    def get_dirty_rects(self) -> Optional[List[pygame.Rect]]:
+        """
+        Overriden dirty rects method
+
+        The map view might scroll on every frame, so the whole screen is pushed to the display.
+        """
+        return None
+
+    def supports_render_scale(self) -> bool:
+        """
+        Overriden render scale method
+
+        The map is drawn zoomed out by the render scale, so the map view does not depend on the render scale.
+        """
+        return True
 
-    def add_actor(self, actor: Actor, central_actor: bool = False, group_name: str = "") -> None:
+    def add_actor(self, actor: Actor, central_actor: bool = False, group_name: str = "", static: bool = False) -> None:
         """
         Overriden add_actor method
         Implementation of the add_actor method for the MapScene.
@@ -128,14 +181,17 @@ class MapScene(ActorScene):
             actor (Actor): actor to add
             central_actor (bool, optional): Sets the actor to be central actor for the scene. The map view will be centered on the actor. Defaults to False.
             group_name (str, optional): Collision group name. Defaults to "".
+            static (bool, optional): the actor is rarely changed and can be pre-rendered into the map static layer. Defaults to False.
         """
-        super().add_actor(actor, group_name)
+        super().add_actor(actor, group_name, static)
 
         if central_actor:
             if self._central_actor:
                 self._central_actor.is_central_actor = False
             self._central_actor = actor
             self._central_actor.is_central_actor = True
+        if static:
+            return
         # add our ship to the group
         self.map.add_sprite(actor.sprite_delegate)
 
@@ -147,10 +203,12 @@ class MapScene(ActorScene):
         Args:
             actor (Actor): actor to be removed
         """
+        static = actor in self.static_layer
         super().remove_actor(actor)
         if actor == self._central_actor:
             self._central_actor = None
-        self.map.remove_sprite(actor.sprite_delegate)
+        if not static:
+            self.map.remove_sprite(actor.sprite_delegate)
 
     def handle_event(self, event: pygame.event.Event) -> None:
         """
@@ -164,7 +222,7 @@ class MapScene(ActorScene):
 
         # this will be handled if the window is resized
         if event.type == pygame.VIDEORESIZE:
-            self.map.set_size((event.w, event.h))
+            self.map.set_size(self.resolution, self.render_size)
             return
 
         if event.type == pygame.KEYDOWN:
@@ -184,3 +242,74 @@ class MapScene(ActorScene):
             bool: True if the collision with map tiles is detected
         """
         return self.map.collide_map(actor.sprite_delegate)
+
+    def sweep_map(self, actor: Actor, displacement: Vector) -> Optional[SweepHit]:
+        """
+        Detect the first collision of a moving actor with the map collision layers
+
+        Should be used for fast actors, which might jump over thin obstacles between two updates.
+
+        Args:
+            actor (Actor): moving actor
+            displacement (Vector): movement vector of the actor in pixels
+
+        Returns:
+            Optional[SweepHit]: the first impact, the target is the hit tile (x, y) or the collision shape
+        """
+        return self.map.sweep_map(actor.sprite_delegate, displacement)
+
+    def raycast(self, start: Vector, end: Vector) -> Optional[RayHit]:
+        """
+        Find the first collision tile of the map crossed by a segment
+
+        Args:
+            start (Vector): ray start in the map coordinates
+            end (Vector): ray end in the map coordinates
+
+        Returns:
+            Optional[RayHit]: the first hit, None if the segment crosses no collision tiles
+        """
+        return self.map.raycast(start, end)
+
+    def line_of_sight(self, start: Vector, end: Vector) -> bool:
+        """
+        Check that nothing on the map blocks a segment. For example:
+        ```
+        if self.line_of_sight(self.ship.pos, enemy.pos):
+            self.fire(enemy)
+        ```
+
+        Args:
+            start (Vector): segment start in the map coordinates
+            end (Vector): segment end in the map coordinates
+
+        Returns:
+            bool: True if the end is visible from the start
+        """
+        return self.map.line_of_sight(start, end)
+
+    def raycast_many(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """
+        Batched `raycast`
+
+        Args:
+            starts (np.ndarray): ray starts in the map coordinates, array-like of shape (N, 2)
+            ends (np.ndarray): ray ends in the map coordinates, array-like of shape (N, 2)
+
+        Returns:
+            np.ndarray: fraction of the ray length before the first collision tile per ray, `inf` for the rays crossing no collision tiles
+        """
+        return self.map.raycast_many(starts, ends)
+
+    def line_of_sight_many(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """
+        Batched `line_of_sight`
+
+        Args:
+            starts (np.ndarray): segment starts in the map coordinates, array-like of shape (N, 2)
+            ends (np.ndarray): segment ends in the map coordinates, array-like of shape (N, 2)
+
+        Returns:
+            np.ndarray: boolean array, True if the end is visible from the start
+        """
+        return self.map.line_of_sight_many(starts, ends)
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 import pygame
 import pygame_menu
@@ -51,6 +51,13 @@ class MenuScene(Scene):
         self.menu = menu
         if not self.menu:
             self.menu = pygame_menu.Menu(300, 400, "Welcome", theme=pygame_menu.themes.THEME_BLUE)
+        # The menu is redrawn only after the events changing it in the dirty rects rendering mode
+        self._menu_changed = True
+        # The menu was redrawn by the last draw
+        self._menu_drawn = False
+        # Areas outside of the menu to erase on the next draw, and the areas erased by the last draw
+        self._dirty_rects: List[pygame.Rect] = []
+        self._erased_rects: List[pygame.Rect] = []
 
     @property
     def menu(self) -> pygame_menu.Menu:
@@ -76,9 +83,60 @@ class MenuScene(Scene):
             screen (Screen): screen to draw the scene on
         """
 
+        self._erased_rects, self._dirty_rects = self._dirty_rects, []
+        self._menu_drawn = self._menu_changed or not self.dirty_rects_enabled
+        if not self._menu_drawn:
+            # The screen outside of the menu is cleared to black
+            for rect in self._erased_rects:
+                screen.surface.fill((0, 0, 0), rect)
+            return
+        self._menu_changed = False
+
         # TODO: may be need to remove disable_loop
         self.menu.mainloop(screen.surface, disable_loop=True)
 
+    def needs_clear(self) -> bool:
+        """
+        Overriden dirty rects method
+
+        The menu is redrawn only if it might be changed by an event.
+        """
+        return self._menu_changed or not self.dirty_rects_enabled
+
+    def get_dirty_rects(self) -> Optional[List[pygame.Rect]]:
+        """
+        Overriden dirty rects method
+
+        Only the erased areas are changed by the draw if the menu was not redrawn.
+        """
+        if self._menu_drawn:
+            return [self.menu.get_rect()]
+        return list(self._erased_rects)
+
+    def add_dirty_rect(self, rect: pygame.Rect) -> None:
+        """
+        Overriden dirty rects method
+
+        Args:
+            rect (pygame.Rect): screen area to redraw
+        """
+        rect = pygame.Rect(rect)
+        if rect.colliderect(self.menu.get_rect()):
+            # The menu can not be redrawn partially
+            self._menu_changed = True
+        else:
+            self._dirty_rects.append(rect)
+
+    def on_enter(self, previous_scene: Optional[Scene]) -> None:
+        """
+        Overriden initialization method
+
+        Args:
+            previous_scene (Optional[Scene]): previous scene was running
+        """
+        super().on_enter(previous_scene)
+        self._menu_changed = True
+
     def on_exit(self, next_scene: Optional[Scene]) -> None:
         """
         Overriden deinitialization method
@@ -98,4 +156,10 @@ class MenuScene(Scene):
         Args:
             event (pygame.event.Event): event to handle
         """
-        self.menu.update([event])
+        current = self.menu.get_current()
+        selected = current.get_selected_widget()
+        updated = self.menu.update([event])
+        # Mouse motion changes the menu only if it selects another widget
+        current_after = self.menu.get_current()
+        if updated or current_after is not current or current_after.get_selected_widget() is not selected:
+            self._menu_changed = True
@@ -0,0 +1,150 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+import pygame
+from pgzero.loaders import ImageLoader, ResourceLoader
+from pytmx import TiledMap
+from pytmx.util_pygame import handle_transformation, smart_convert
+
+from .. import loaders
+
+# Resource loaders by the asset kind
+LOADERS = {
+    "images": loaders.images,
+    "sounds": loaders.sounds,
+    "maps": loaders.maps,
+    "headless_maps": loaders.headless_maps,
+}
+
+
+class _PendingTile(NamedTuple):
+    """Tile image of a map loaded on a worker thread, waiting for the pixel format conversion"""
+
+    surface: pygame.Surface
+    colorkey: Optional[pygame.Color]
+    pixelalpha: bool
+
+
+def _raw_image_loader(filename: str, colorkey: Optional[str], **kwargs: Any) -> Callable[..., _PendingTile]:
+    # Same as `pytmx.util_pygame.pygame_image_loader`, but the conversion is left for the main thread
+    color = pygame.Color(f"#{colorkey}") if colorkey else None
+    pixelalpha = kwargs.get("pixelalpha", True)
+    image = pygame.image.load(filename)
+
+    def load_image(rect: Optional[Tuple[int, int, int, int]] = None, flags: Any = None) -> _PendingTile:
+        tile = image.subsurface(rect) if rect else image.copy()
+        if flags:
+            tile = handle_transformation(tile, flags)
+        return _PendingTile(tile, color, pixelalpha)
+
+    return load_image
+
+
+class _RawImageLoader(ImageLoader):
+    def _load(self, path: str) -> pygame.Surface:
+        return pygame.image.load(path)
+
+
+class _RawMapLoader(loaders.MapLoader):
+    def _load(self, path: str) -> TiledMap:
+        return TiledMap(path, image_loader=_raw_image_loader)
+
+
+def _convert_image(surface: pygame.Surface) -> pygame.Surface:
+    return surface.convert_alpha()
+
+
+def _convert_map(tmx: TiledMap) -> TiledMap:
+    tmx.images = [smart_convert(*image) if isinstance(image, _PendingTile) else image for image in tmx.images]
+    return tmx
+
+
+# The display surface format conversion is not thread safe, so the images are loaded as is on the worker threads
+# and converted on the main thread: worker thread loader and main thread conversion by the asset kind
+DEFERRED_LOADERS: Dict[str, Tuple[ResourceLoader, Callable[[Any], Any]]] = {
+    "images": (_RawImageLoader(loaders.images.subpath), _convert_image),
+    "maps": (_RawMapLoader(loaders.maps.subpath), _convert_map),
+}
+
+
+class AssetPreloader(object):
+    """Loads resources on a thread pool.
+
+    Once all the assets are loaded, `finish` should be called on the main thread. It converts the loaded images
+    and stores the resources in the caches of the pgz resource loaders, so the later `pgz.images.ship`,
+    `pgz.maps.default`, etc. access does not touch the disk.
+
+    Example:
+    ```
+    preloader = AssetPreloader({"images": ["ship", "explosion1"], "maps": ["default"]})
+    ...
+    if preloader.done:
+        preloader.raise_errors()
+        preloader.finish()
+    ```
+    """
+
+    def __init__(self, assets: Mapping[str, Iterable[str]], max_workers: int = 4) -> None:
+        """Start loading the assets.
+
+        Args:
+            assets (Mapping[str, Iterable[str]]): asset names by the kind: "images", "sounds", "maps" or "headless_maps"
+            max_workers (int, optional): number of the loading threads. Defaults to 4.
+        """
+        for kind in assets:
+            if kind not in LOADERS:
+                raise ValueError(f"Unknown asset kind '{kind}'")
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._tasks: List[Tuple[str, str, Future]] = []
+        for kind, names in assets.items():
+            loader = DEFERRED_LOADERS[kind][0] if kind in DEFERRED_LOADERS else LOADERS[kind]
+            self._tasks.extend((kind, name, executor.submit(loader.load, name)) for name in sorted(set(names)))
+        # The running tasks are finished anyway, but no new tasks are accepted
+        executor.shutdown(wait=False)
+
+    @property
+    def total(self) -> int:
+        """Get number of the assets"""
+        return len(self._tasks)
+
+    @property
+    def loaded(self) -> int:
+        """Get number of the assets loaded so far"""
+        return sum(1 for _, _, future in self._tasks if future.done())
+
+    @property
+    def progress(self) -> float:
+        """Get loading progress in range [0, 1]"""
+        if not self._tasks:
+            return 1.0
+        return self.loaded / len(self._tasks)
+
+    @property
+    def done(self) -> bool:
+        """Check if all the assets are loaded"""
+        return all(future.done() for _, _, future in self._tasks)
+
+    def raise_errors(self) -> None:
+        """Raise the first loading error, if any"""
+        for _, _, future in self._tasks:
+            if future.done():
+                error = future.exception()
+                if error is not None:
+                    raise error
+
+    def finish(self) -> None:
+        """Convert the loaded images and store the assets in the caches of the pgz resource loaders.
+
+        Should be called on the main thread once `done` is True. The assets failed to load are skipped.
+        """
+        for kind, name, future in self._tasks:
+            if kind not in DEFERRED_LOADERS or not future.done() or future.exception() is not None:
+                continue
+            raw_loader, convert = DEFERRED_LOADERS[kind]
+            key = ResourceLoader.cache_key(name, (), {})
+            # The unconverted resource is not needed anymore
+            raw_loader.cache.pop(key, None)
+            loader = LOADERS[kind]
+            if key not in loader.cache:
+                loader.cache[key] = convert(future.result())
@@ -0,0 +1,354 @@
+"""
+Bounding volume hierarchy of the static collision shapes.
+
+The hierarchy is built once over rects, polygons, polylines and ellipses.
+Queries descend only into the nodes overlapping the query, and the exact shape test is done at the leaves.
+"""
+
+from typing import Any, List, Optional, Sequence, Tuple
+
+import pygame
+
+Point = Tuple[float, float]
+# (left, top, right, bottom)
+Bounds = Tuple[float, float, float, float]
+
+
+def _rect_bounds(rect: Any) -> Bounds:
+    left, top, width, height = rect
+    return (left, top, left + width, top + height)
+
+
+def _bounds_overlap(a: Bounds, b: Bounds) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _bounds_contain(b: Bounds, x: float, y: float) -> bool:
+    return b[0] <= x < b[2] and b[1] <= y < b[3]
+
+
+def _segment_hits_bounds(b: Bounds, p0: Point, p1: Point) -> bool:
+    """Liang-Barsky clipping of the segment by the bounds"""
+    t0, t1 = 0.0, 1.0
+    dx = p1[0] - p0[0]
+    dy = p1[1] - p0[1]
+    for p, q in ((-dx, p0[0] - b[0]), (dx, b[2] - p0[0]), (-dy, p0[1] - b[1]), (dy, b[3] - p0[1])):
+        if p == 0:
+            if q < 0:
+                return False
+        else:
+            t = q / p
+            if p < 0:
+                if t > t1:
+                    return False
+                t0 = max(t0, t)
+            else:
+                if t < t0:
+                    return False
+                t1 = min(t1, t)
+    return t0 <= t1
+
+
+def _orientation(a: Point, b: Point, c: Point) -> float:
+    return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+
+def _segments_intersect(a0: Point, a1: Point, b0: Point, b1: Point) -> bool:
+    d1 = _orientation(b0, b1, a0)
+    d2 = _orientation(b0, b1, a1)
+    d3 = _orientation(a0, a1, b0)
+    d4 = _orientation(a0, a1, b1)
+    if ((d1 > 0 and d2 < 0) or (d1 < 0 and d2 > 0)) and ((d3 > 0 and d4 < 0) or (d3 < 0 and d4 > 0)):
+        return True
+
+    def on_segment(p: Point, q: Point, r: Point) -> bool:
+        return min(p[0], q[0]) <= r[0] <= max(p[0], q[0]) and min(p[1], q[1]) <= r[1] <= max(p[1], q[1])
+
+    return (
+        (d1 == 0 and on_segment(b0, b1, a0))
+        or (d2 == 0 and on_segment(b0, b1, a1))
+        or (d3 == 0 and on_segment(a0, a1, b0))
+        or (d4 == 0 and on_segment(a0, a1, b1))
+    )
+
+
+class Shape(object):
+    """Base class of the static collision shapes"""
+
+    def __init__(self, bounds: Bounds, data: Any = None) -> None:
+        # Axis aligned bounding box (left, top, right, bottom)
+        self.bounds = bounds
+        # Arbitrary user data, for example the source `pytmx.TiledObject`
+        self.data = data
+
+    def contains_point(self, x: float, y: float) -> bool:
+        raise NotImplementedError
+
+    def intersects_rect(self, bounds: Bounds) -> bool:
+        raise NotImplementedError
+
+    def intersects_segment(self, p0: Point, p1: Point) -> bool:
+        raise NotImplementedError
+
+    def rasterize(self, surface: pygame.Surface, offset: Point) -> None:
+        """Draw the shape in opaque white, for the pixel perfect tests.
+
+        Args:
+            surface (pygame.Surface): surface to draw on
+            offset (Point): position of the surface top left corner in the shape coordinates
+        """
+        raise NotImplementedError
+
+    def collide_mask(self, mask: pygame.mask.Mask, offset: Tuple[int, int]) -> bool:
+        """Pixel perfect test of the shape against a mask.
+
+        Only the shape part under the mask is rasterized.
+
+        Args:
+            mask (pygame.mask.Mask): mask, for example of an actor image
+            offset (Tuple[int, int]): position of the mask top left corner in the shape coordinates
+
+        Returns:
+            bool: True if the shape overlaps a set bit of the mask
+        """
+        surface = pygame.Surface(mask.get_size(), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 0))
+        self.rasterize(surface, offset)
+        return mask.overlap(pygame.mask.from_surface(surface), (0, 0)) is not None
+
+
+class RectShape(Shape):
+    """Axis aligned rectangle"""
+
+    def __init__(self, rect: Any, data: Any = None) -> None:
+        super().__init__(_rect_bounds(rect), data)
+
+    def contains_point(self, x: float, y: float) -> bool:
+        return _bounds_contain(self.bounds, x, y)
+
+    def intersects_rect(self, bounds: Bounds) -> bool:
+        return _bounds_overlap(self.bounds, bounds)
+
+    def intersects_segment(self, p0: Point, p1: Point) -> bool:
+        return _segment_hits_bounds(self.bounds, p0, p1)
+
+    def rasterize(self, surface: pygame.Surface, offset: Point) -> None:
+        left, top, right, bottom = self.bounds
+        pygame.draw.rect(surface, (255, 255, 255, 255), pygame.Rect(left - offset[0], top - offset[1], right - left, bottom - top))
+
+
+class PolygonShape(Shape):
+    """Polygon or polyline. A polyline (`closed=False`) has no interior."""
+
+    def __init__(self, points: Sequence[Point], closed: bool = True, data: Any = None) -> None:
+        self.points: List[Point] = [(float(x), float(y)) for x, y in points]
+        self.closed = closed
+        xs = [p[0] for p in self.points]
+        ys = [p[1] for p in self.points]
+        super().__init__((min(xs), min(ys), max(xs), max(ys)), data)
+
+    def _edges(self) -> List[Tuple[Point, Point]]:
+        edges = list(zip(self.points[:-1], self.points[1:]))
+        if self.closed and len(self.points) > 2:
+            edges.append((self.points[-1], self.points[0]))
+        return edges
+
+    def contains_point(self, x: float, y: float) -> bool:
+        if not self.closed:
+            return False
+        inside = False
+        points = self.points
+        j = len(points) - 1
+        for i in range(len(points)):
+            xi, yi = points[i]
+            xj, yj = points[j]
+            if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+                inside = not inside
+            j = i
+        return inside
+
+    def intersects_rect(self, bounds: Bounds) -> bool:
+        if not _bounds_overlap(self.bounds, bounds):
+            return False
+        # A vertex inside of the rect
+        for x, y in self.points:
+            if _bounds_contain(bounds, x, y):
+                return True
+        # The rect inside of the polygon
+        if self.contains_point((bounds[0] + bounds[2]) / 2, (bounds[1] + bounds[3]) / 2):
+            return True
+        # An edge crossing the rect
+        for p0, p1 in self._edges():
+            if _segment_hits_bounds(bounds, p0, p1):
+                return True
+        return False
+
+    def intersects_segment(self, p0: Point, p1: Point) -> bool:
+        if self.contains_point(*p0):
+            return True
+        for e0, e1 in self._edges():
+            if _segments_intersect(p0, p1, e0, e1):
+                return True
+        return False
+
+    def rasterize(self, surface: pygame.Surface, offset: Point) -> None:
+        points = [(x - offset[0], y - offset[1]) for x, y in self.points]
+        if self.closed and len(points) > 2:
+            pygame.draw.polygon(surface, (255, 255, 255, 255), points)
+        elif len(points) > 1:
+            pygame.draw.lines(surface, (255, 255, 255, 255), False, points)
+
+
+class EllipseShape(Shape):
+    """Axis aligned ellipse inscribed in a rect"""
+
+    def __init__(self, rect: Any, data: Any = None) -> None:
+        super().__init__(_rect_bounds(rect), data)
+        left, top, right, bottom = self.bounds
+        self._cx = (left + right) / 2
+        self._cy = (top + bottom) / 2
+        self._rx = max((right - left) / 2, 1e-9)
+        self._ry = max((bottom - top) / 2, 1e-9)
+
+    def _normalize(self, x: float, y: float) -> Point:
+        """Transform a point into the space where the ellipse is the unit circle"""
+        return ((x - self._cx) / self._rx, (y - self._cy) / self._ry)
+
+    def contains_point(self, x: float, y: float) -> bool:
+        nx, ny = self._normalize(x, y)
+        return nx * nx + ny * ny <= 1.0
+
+    def intersects_rect(self, bounds: Bounds) -> bool:
+        # The closest point of the rect to the center. Scaling keeps the rect axis aligned, so the test is exact.
+        left, top = self._normalize(bounds[0], bounds[1])
+        right, bottom = self._normalize(bounds[2], bounds[3])
+        nx = min(max(0.0, left), right)
+        ny = min(max(0.0, top), bottom)
+        return nx * nx + ny * ny < 1.0
+
+    def intersects_segment(self, p0: Point, p1: Point) -> bool:
+        ax, ay = self._normalize(*p0)
+        bx, by = self._normalize(*p1)
+        dx, dy = bx - ax, by - ay
+        length2 = dx * dx + dy * dy
+        t = 0.0 if length2 == 0 else min(max(-(ax * dx + ay * dy) / length2, 0.0), 1.0)
+        nx, ny = ax + t * dx, ay + t * dy
+        return nx * nx + ny * ny <= 1.0
+
+    def rasterize(self, surface: pygame.Surface, offset: Point) -> None:
+        left, top, right, bottom = self.bounds
+        pygame.draw.ellipse(surface, (255, 255, 255, 255), pygame.Rect(left - offset[0], top - offset[1], right - left, bottom - top))
+
+
+class _Node(object):
+    __slots__ = ("bounds", "left", "right", "shapes")
+
+    def __init__(self, bounds: Bounds) -> None:
+        self.bounds = bounds
+        self.left: Optional[_Node] = None
+        self.right: Optional[_Node] = None
+        self.shapes: List[Shape] = []
+
+
+def _union(shapes: Sequence[Shape]) -> Bounds:
+    return (
+        min(s.bounds[0] for s in shapes),
+        min(s.bounds[1] for s in shapes),
+        max(s.bounds[2] for s in shapes),
+        max(s.bounds[3] for s in shapes),
+    )
+
+
+class BVH(object):
+    """Bounding volume hierarchy of static shapes with point, rect and segment queries.
+
+    Example:
+    ```
+    bvh = BVH([RectShape((0, 0, 64, 64)), EllipseShape((100, 100, 50, 30))])
+    if bvh.collide_rect(actor.rect):
+        ...
+    ```
+    """
+
+    def __init__(self, shapes: Sequence[Shape], leaf_size: int = 4) -> None:
+        """Build the hierarchy.
+
+        Args:
+            shapes (Sequence[Shape]): static shapes
+            leaf_size (int, optional): maximal number of shapes in a leaf. Defaults to 4.
+        """
+        self._leaf_size = leaf_size
+        self._shapes = list(shapes)
+        self._root = self._build(self._shapes) if self._shapes else None
+
+    def __len__(self) -> int:
+        return len(self._shapes)
+
+    @property
+    def shapes(self) -> List[Shape]:
+        return self._shapes
+
+    def _build(self, shapes: List[Shape]) -> _Node:
+        node = _Node(_union(shapes))
+        if len(shapes) <= self._leaf_size:
+            node.shapes = shapes
+            return node
+
+        # Split by the median of the shape centers along the longest axis
+        left, top, right, bottom = node.bounds
+        axis = 0 if right - left >= bottom - top else 1
+        shapes = sorted(shapes, key=lambda s: s.bounds[axis] + s.bounds[axis + 2])
+        middle = len(shapes) // 2
+        node.left = self._build(shapes[:middle])
+        node.right = self._build(shapes[middle:])
+        return node
+
+    def _query(self, node_test: Any, shape_test: Any, first: bool) -> List[Shape]:
+        result: List[Shape] = []
+        if self._root is None:
+            return result
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if not node_test(node.bounds):
+                continue
+            if node.left is None or node.right is None:
+                for shape in node.shapes:
+                    if shape_test(shape):
+                        result.append(shape)
+                        if first:
+                            return result
+            else:
+                stack.append(node.left)
+                stack.append(node.right)
+        return result
+
+    def query_point(self, x: float, y: float) -> List[Shape]:
+        """Get shapes containing the point"""
+        return self._query(lambda b: b[0] <= x <= b[2] and b[1] <= y <= b[3], lambda s: s.contains_point(x, y), False)
+
+    def query_rect(self, rect: Any) -> List[Shape]:
+        """Get shapes intersecting the rect
+
+        Args:
+            rect (Any): anything unpackable into (left, top, width, height)
+        """
+        bounds = _rect_bounds(rect)
+        return self._query(lambda b: _bounds_overlap(b, bounds), lambda s: s.intersects_rect(bounds), False)
+
+    def query_segment(self, p0: Point, p1: Point) -> List[Shape]:
+        """Get shapes intersecting the segment"""
+        return self._query(lambda b: _segment_hits_bounds(b, p0, p1), lambda s: s.intersects_segment(p0, p1), False)
+
+    def collide_point(self, x: float, y: float) -> bool:
+        """Check if any shape contains the point"""
+        return bool(self._query(lambda b: b[0] <= x <= b[2] and b[1] <= y <= b[3], lambda s: s.contains_point(x, y), True))
+
+    def collide_rect(self, rect: Any) -> bool:
+        """Check if any shape intersects the rect"""
+        bounds = _rect_bounds(rect)
+        return bool(self._query(lambda b: _bounds_overlap(b, bounds), lambda s: s.intersects_rect(bounds), True))
+
+    def collide_segment(self, p0: Point, p1: Point) -> bool:
+        """Check if any shape intersects the segment"""
+        return bool(self._query(lambda b: _segment_hits_bounds(b, p0, p1), lambda s: s.intersects_segment(p0, p1), True))
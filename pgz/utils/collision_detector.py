@@ -1,24 +1,102 @@
-from typing import Dict, List, Optional
+import math
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, cast
 
+import numpy as np
 import pygame
 
-from ..actor import Actor
+from ..actor import Actor, SpriteDelegate
+from .mask_cache import collide_mask
+from .spatial_hash import SpatialHash
+from .sweep import SweepHit, Vector, first_hit, swept_bounds
+
+
+class _GroupRects(object):
+    """Packed array of the sprite rects of a collision group, used for the batch collision queries"""
+
+    def __init__(self) -> None:
+        self._sprites: List[Any] = []
+        self._index: Dict[Any, int] = {}
+        # Rows of (left, top, right, bottom)
+        self._rects = np.zeros((16, 4), dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self._sprites)
+
+    def __contains__(self, sprite: Any) -> bool:
+        return sprite in self._index
+
+    @property
+    def sprites(self) -> List[Any]:
+        return self._sprites
+
+    @property
+    def rects(self) -> np.ndarray:
+        return self._rects[: len(self._sprites)]
+
+    def update(self, sprite: Any, rect: Any) -> None:
+        index = self._index.get(sprite)
+        if index is None:
+            index = len(self._sprites)
+            if index == len(self._rects):
+                self._rects = np.concatenate((self._rects, np.zeros_like(self._rects)))
+            self._sprites.append(sprite)
+            self._index[sprite] = index
+        self._rects[index] = (rect.left, rect.top, rect.right, rect.bottom)
+
+    def remove(self, sprite: Any) -> None:
+        index = self._index.pop(sprite, None)
+        if index is None:
+            return
+        # Move the last row into the gap
+        last = len(self._sprites) - 1
+        if index != last:
+            last_sprite = self._sprites[last]
+            self._sprites[index] = last_sprite
+            self._rects[index] = self._rects[last]
+            self._index[last_sprite] = index
+        self._sprites.pop()
 
 
 class CollisionDetector(object):
     """Class helper for easier collision detection
 
     The class manages multiple collision groups and can detect a collsion with each one of groups independently.
+
+    By default a collision query scans the whole collision group.
+    If `cell_size` is provided, every collision group is indexed with a `SpatialHash`, so a query checks only the actors nearby.
+    The index is updated incrementally when actors move.
+
+    If `use_masks` is set, a rect collision is confirmed with the pixel masks of the (rotated) actor images.
+
+    `collide_groups` finds all the colliding pairs of two groups at once with vectorized rect tests.
+    `query_radius` and `nearest` find the actors by the distance to their rect centers.
     """
 
-    def __init__(self) -> None:
-        """Create a collision detecor"""
+    # Maximal size of the pairwise test matrix computed at once
+    BATCH_SIZE = 1 << 20
+
+    def __init__(self, cell_size: Optional[int] = None, use_masks: bool = False) -> None:
+        """Create a collision detecor
+
+        Args:
+            cell_size (Optional[int], optional): cell size of the spatial index of collision groups. No index is used if None. Defaults to None.
+            use_masks (bool, optional): use pixel perfect collision detection after the rect collision. Defaults to False.
+        """
 
         # Collision groups
         self._groups: Dict[str, pygame.sprite.Group] = {}
         # List of all known actors
         self._actors = {}
 
+        self._cell_size = cell_size
+        self.use_masks = use_masks
+        # Spatial index per collision group
+        self._hashes: Dict[str, SpatialHash[SpriteDelegate]] = {}
+        # Packed rects per collision group
+        self._rects: Dict[str, _GroupRects] = {}
+        # Actors moved since the last query
+        self._dirty: Set[Actor] = set()
+
     def add_actor(self, actor: Actor, group_name: str = "") -> None:
         """Add an actor to the detector
 
@@ -29,6 +107,15 @@ class CollisionDetector(object):
         self._actors[actor.uuid] = actor
         self._add_sprite(actor.sprite_delegate, group_name)
 
+        if group_name not in self._rects:
+            self._rects[group_name] = _GroupRects()
+        self._rects[group_name].update(actor.sprite_delegate, actor.rect)
+        if self._cell_size:
+            if group_name not in self._hashes:
+                self._hashes[group_name] = SpatialHash(self._cell_size)
+            self._hashes[group_name].update(actor.sprite_delegate, actor.rect)
+        actor.add_change_listener(self._on_actor_changed)
+
     def remove_actor(self, actor: Actor) -> None:
         """Remore an actor from the detector and all collision groups
 
@@ -38,6 +125,13 @@ class CollisionDetector(object):
         del self._actors[actor.uuid]
         self._remove_sprite(actor.sprite_delegate)
 
+        actor.remove_change_listener(self._on_actor_changed)
+        self._dirty.discard(actor)
+        for group_rects in self._rects.values():
+            group_rects.remove(actor.sprite_delegate)
+        for spatial_hash in self._hashes.values():
+            spatial_hash.remove(actor.sprite_delegate)
+
     def get_actor(self, uuid: str) -> Actor:
         """Get actor by UUID
 
@@ -66,6 +160,24 @@ class CollisionDetector(object):
         for group in self._groups.values():
             group.remove(sprite)
 
+    def _on_actor_changed(self, actor: Actor) -> None:
+        self._dirty.add(actor)
+
+    def _flush_changes(self) -> None:
+        """Move the changed actors in the spatial indices and the packed rects"""
+        if not self._dirty:
+            return
+        for actor in self._dirty:
+            sprite = actor.sprite_delegate
+            rect = actor.rect
+            for group_rects in self._rects.values():
+                if sprite in group_rects:
+                    group_rects.update(sprite, rect)
+            for spatial_hash in self._hashes.values():
+                if sprite in spatial_hash:
+                    spatial_hash.update(sprite, rect)
+        self._dirty.clear()
+
     def collide_group(self, sprite: pygame.sprite.Sprite, group_name: str = "") -> Optional[pygame.sprite.Sprite]:
         """Detect a collision of an actor with a specified collsion group.
 
@@ -79,5 +191,234 @@ class CollisionDetector(object):
         if group_name not in self._groups:
             return None
 
-        collision = pygame.sprite.spritecollideany(sprite, self._groups[group_name])
+        if self._cell_size:
+            self._flush_changes()
+            rect = cast(SpriteDelegate, sprite).rect
+            for candidate in self._hashes[group_name].query(rect):
+                if rect.colliderect(candidate.rect) and (not self.use_masks or collide_mask(sprite, candidate)):
+                    return candidate
+            return None
+
+        collision = pygame.sprite.spritecollideany(sprite, self._groups[group_name], collide_mask if self.use_masks else None)
         return collision
+
+    def collide_groups(self, group_a: str, group_b: str) -> List[Tuple[pygame.sprite.Sprite, pygame.sprite.Sprite]]:
+        """Detect all collisions between two collision groups.
+
+        Both groups are sorted by the left edge, and every batch of the first group is tested only against
+        the sprites of the second group starting to the left of the batch right edge (sweep and prune).
+        The rect tests of a batch are vectorized with NumPy.
+
+        Args:
+            group_a (str): first collision group name
+            group_b (str): second collision group name. If it is the same as `group_a`, every pair is reported once.
+
+        Returns:
+            List[Tuple[pygame.sprite.Sprite, pygame.sprite.Sprite]]: pairs of colliding sprites (sprite from `group_a`, sprite from `group_b`)
+        """
+        if group_a not in self._rects or group_b not in self._rects:
+            return []
+        self._flush_changes()
+
+        rects_a = self._rects[group_a]
+        rects_b = self._rects[group_b]
+        a = rects_a.rects
+        b = rects_b.rects
+        if not len(a) or not len(b):
+            return []
+
+        order_a = np.argsort(a[:, 0], kind="stable")
+        order_b = np.argsort(b[:, 0], kind="stable")
+        a = a[order_a]
+        b = b[order_b]
+
+        pairs: List[Tuple[int, int]] = []
+        batch = max(self.BATCH_SIZE // len(b), 1)
+        for start in range(0, len(a), batch):
+            chunk = a[start : start + batch]
+            # Only the sprites starting before the right-most edge of the batch can collide with it
+            end = int(np.searchsorted(b[:, 0], chunk[:, 2].max(), side="left"))
+            if end == 0:
+                continue
+            candidates = b[:end]
+            hits = (
+                (chunk[:, None, 0] < candidates[None, :, 2])
+                & (candidates[None, :, 0] < chunk[:, None, 2])
+                & (chunk[:, None, 1] < candidates[None, :, 3])
+                & (candidates[None, :, 1] < chunk[:, None, 3])
+            )
+            ia, ib = np.nonzero(hits)
+            ia = order_a[ia + start]
+            ib = order_b[ib]
+            if group_a == group_b:
+                keep = ia < ib
+                ia, ib = ia[keep], ib[keep]
+            pairs.extend(zip(ia.tolist(), ib.tolist()))
+
+        sprites_a = rects_a.sprites
+        sprites_b = rects_b.sprites
+        result = [(sprites_a[i], sprites_b[j]) for i, j in pairs]
+        if self.use_masks:
+            result = [(sprite_a, sprite_b) for sprite_a, sprite_b in result if collide_mask(sprite_a, sprite_b)]
+        return result
+
+    def sweep_group(self, sprite: pygame.sprite.Sprite, displacement: Vector, group_name: str = "") -> Optional[SweepHit]:
+        """Find the first sprite of a collision group hit by a sprite moving along a displacement (swept AABB).
+
+        Unlike `collide_group`, fast sprites can not jump over other sprites between two updates.
+        The other sprites are considered static during the movement.
+
+        Args:
+            sprite (pygame.sprite.Sprite): moving sprite
+            displacement (Vector): movement vector of the sprite in pixels
+            group_name (str, optional): collision group name. Defaults to "".
+
+        Returns:
+            Optional[SweepHit]: the first impact with the hit sprite as the target, None if nothing is hit
+        """
+        if group_name not in self._rects:
+            return None
+        self._flush_changes()
+
+        rect = cast(SpriteDelegate, sprite).rect
+        if self._cell_size:
+            candidates = [candidate for candidate in self._hashes[group_name].query(swept_bounds(rect, displacement)) if candidate is not sprite]
+            bounds = np.array([(c.rect.left, c.rect.top, c.rect.right, c.rect.bottom) for c in candidates], dtype=np.float64).reshape(-1, 4)
+        else:
+            group_rects = self._rects[group_name]
+            candidates = group_rects.sprites
+            bounds = group_rects.rects
+            if sprite in group_rects:
+                keep = np.array([candidate is not sprite for candidate in candidates])
+                candidates = [candidate for candidate in candidates if candidate is not sprite]
+                bounds = bounds[keep]
+        return first_hit(rect, displacement, bounds, candidates)
+
+    def _group_names(self, group_name: Optional[str]) -> List[str]:
+        if group_name is None:
+            return list(self._rects)
+        if group_name in self._rects:
+            return [group_name]
+        return []
+
+    def _all_candidates(self, group_names: List[str]) -> Tuple[List[Any], np.ndarray]:
+        """Get all the sprites of the groups and their rect centers from the packed rects"""
+        if len(group_names) == 1:
+            group_rects = self._rects[group_names[0]]
+            rects = group_rects.rects
+            return group_rects.sprites, np.stack(((rects[:, 0] + rects[:, 2]) / 2, (rects[:, 1] + rects[:, 3]) / 2), axis=1)
+        sprites = list(dict.fromkeys(sprite for name in group_names for sprite in self._rects[name].sprites))
+        return sprites, self._centers(sprites)
+
+    @staticmethod
+    def _centers(sprites: Iterable[Any]) -> np.ndarray:
+        return np.array([sprite.rect.center for sprite in sprites], dtype=np.float64).reshape(-1, 2)
+
+    @staticmethod
+    def _sorted_by_distance(
+        sprites: List[Any], centers: np.ndarray, point: Tuple[float, float], max_distance: float, exclude: Any, k: Optional[int] = None
+    ) -> List[Tuple[Any, float]]:
+        if not sprites:
+            return []
+        distances = np.hypot(centers[:, 0] - point[0], centers[:, 1] - point[1])
+        indices = np.flatnonzero(distances <= max_distance)
+        if k is not None and len(indices) > k + 1:
+            # One extra candidate, because the excluded sprite might be among the nearest
+            nearest = np.argpartition(distances[indices], k)[: k + 1]
+            indices = indices[nearest]
+        indices = indices[np.argsort(distances[indices], kind="stable")]
+        result = [(sprites[i], float(distances[i])) for i in indices.tolist() if sprites[i] is not exclude]
+        return result if k is None else result[:k]
+
+    def query_radius(
+        self, point: Tuple[float, float], radius: float, group_name: Optional[str] = None, exclude: Optional[pygame.sprite.Sprite] = None
+    ) -> List[Tuple[pygame.sprite.Sprite, float]]:
+        """Find sprites which rect centers are within a radius from a point.
+
+        Args:
+            point (Tuple[float, float]): query point
+            radius (float): query radius in pixels
+            group_name (Optional[str], optional): collision group name. All the groups are searched if None. Defaults to None.
+            exclude (Optional[pygame.sprite.Sprite], optional): sprite to skip, for example the sprite making the query. Defaults to None.
+
+        Returns:
+            List[Tuple[pygame.sprite.Sprite, float]]: (sprite, distance) pairs sorted by the distance
+        """
+        group_names = self._group_names(group_name)
+        if not group_names:
+            return []
+        self._flush_changes()
+
+        if self._cell_size:
+            x, y = point
+            candidates: Set[Any] = set()
+            for name in group_names:
+                candidates |= self._hashes[name].query((x - radius, y - radius, 2 * radius, 2 * radius))
+            sprites = list(candidates)
+            centers = self._centers(sprites)
+        else:
+            sprites, centers = self._all_candidates(group_names)
+        return self._sorted_by_distance(sprites, centers, point, radius, exclude)
+
+    def nearest(
+        self,
+        point: Tuple[float, float],
+        k: int = 1,
+        group_name: Optional[str] = None,
+        max_distance: float = math.inf,
+        exclude: Optional[pygame.sprite.Sprite] = None,
+    ) -> List[Tuple[pygame.sprite.Sprite, float]]:
+        """Find k sprites with the nearest rect centers to a point.
+
+        With the spatial index the search expands ring by ring of the grid cells around the point,
+        and stops as soon as no unvisited cell can contain a closer sprite.
+
+        Args:
+            point (Tuple[float, float]): query point
+            k (int, optional): number of sprites to find. Defaults to 1.
+            group_name (Optional[str], optional): collision group name. All the groups are searched if None. Defaults to None.
+            max_distance (float, optional): ignore sprites farther than the distance. Defaults to math.inf.
+            exclude (Optional[pygame.sprite.Sprite], optional): sprite to skip, for example the sprite making the query. Defaults to None.
+
+        Returns:
+            List[Tuple[pygame.sprite.Sprite, float]]: up to k (sprite, distance) pairs sorted by the distance
+        """
+        group_names = self._group_names(group_name)
+        if not group_names or k <= 0:
+            return []
+        self._flush_changes()
+
+        if not self._cell_size:
+            sprites, centers = self._all_candidates(group_names)
+            return self._sorted_by_distance(sprites, centers, point, max_distance, exclude, k)
+
+        hashes = [self._hashes[name] for name in group_names]
+        total = len(set().union(*hashes)) if len(hashes) > 1 else len(hashes[0])
+        # Rings closer or farther than the occupied cells are empty
+        ring_ranges = [ring_range for ring_range in (spatial_hash.ring_range(point[0], point[1]) for spatial_hash in hashes) if ring_range]
+        if not ring_ranges:
+            return []
+        ring = min(first for first, _ in ring_ranges)
+        last_ring = max(last for _, last in ring_ranges)
+        seen: Set[Any] = set()
+        found: List[Tuple[Any, float]] = []
+        while len(seen) < total and ring <= last_ring:
+            for spatial_hash in hashes:
+                for sprite in spatial_hash.query_ring(point[0], point[1], ring):
+                    if sprite in seen:
+                        continue
+                    seen.add(sprite)
+                    if sprite is exclude:
+                        continue
+                    centerx, centery = sprite.rect.center
+                    distance = math.hypot(centerx - point[0], centery - point[1])
+                    if distance <= max_distance:
+                        found.append((sprite, distance))
+            found.sort(key=lambda item: item[1])
+            del found[k:]
+            # Sprites in the next rings are not closer than the ring border
+            border = ring * self._cell_size
+            if (len(found) == k and found[-1][1] <= border) or border > max_distance:
+                break
+            ring += 1
+        return found
@@ -1,18 +1,20 @@
-from typing import List
+from .frame_stats import FrameStats
 
 
-class FPSCalc:
+class FPSCalc(FrameStats):
+    """Moving average calculator.
+
+    Kept for the backward compatibility, use `FrameStats` for the new code.
+    """
+
     def __init__(self, size: int = 100) -> None:
-        self.vals: List[float] = []
-        self.size = size
+        super().__init__(size)
         self.counter: int = 0
 
     def push(self, value: float) -> None:
         self.counter += 1
-        self.vals.append(value)
-        if len(self.vals) > self.size:
-            self.vals.pop(0)
+        super().push(value)
 
     def aver(self) -> float:
         self.counter = 0
-        return sum(self.vals) / len(self.vals)
+        return self.mean()
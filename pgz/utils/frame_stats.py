@@ -0,0 +1,160 @@
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+class FrameStatsSummary(NamedTuple):
+    """Snapshot of the `FrameStats` samples. All the fields cover the samples in the ring buffer only."""
+
+    samples: int
+    min: float
+    mean: float
+    p50: float
+    p95: float
+    p99: float
+    max: float
+    hitches: int
+
+
+class FrameStats:
+    """Frame statistics over a fixed number of the latest samples.
+
+    The samples are stored in a ring buffer, so pushing a sample is O(1).
+    Usually the samples are frame/tick times in milliseconds, but any values can be collected.
+
+    Example:
+    ```
+    stats = FrameStats(size=300, hitch_threshold=33.3)
+    stats.push(dt * 1000)
+    ...
+    summary = stats.summary()
+    print(summary.p99, summary.hitches)
+    ```
+    """
+
+    def __init__(self, size: int = 100, hitch_threshold: Optional[float] = None) -> None:
+        """Create frame statistics object.
+
+        Args:
+            size (int, optional): number of the latest samples to keep. Defaults to 100.
+            hitch_threshold (Optional[float], optional): samples above the threshold are counted as hitches. Defaults to None.
+        """
+        self._values = np.zeros(size, dtype=np.float64)
+        self._index = 0
+        self._count = 0
+
+        # Total number of pushed samples
+        self.total = 0
+        # Total number of pushed samples above the hitch threshold, over the whole lifetime (not only the ring buffer)
+        self.hitches = 0
+        self.hitch_threshold = hitch_threshold
+
+    @property
+    def size(self) -> int:
+        """Get capacity of the ring buffer"""
+        return len(self._values)
+
+    @property
+    def count(self) -> int:
+        """Get number of samples in the ring buffer"""
+        return self._count
+
+    def push(self, value: float) -> None:
+        """Add a sample. The oldest sample is dropped if the buffer is full.
+
+        Args:
+            value (float): sample value
+        """
+        self._values[self._index] = value
+        self._index = (self._index + 1) % len(self._values)
+        if self._count < len(self._values):
+            self._count += 1
+
+        self.total += 1
+        if self.hitch_threshold is not None and value > self.hitch_threshold:
+            self.hitches += 1
+
+    def reset(self) -> None:
+        """Drop all the samples and counters"""
+        self._index = 0
+        self._count = 0
+        self.total = 0
+        self.hitches = 0
+
+    def values(self) -> np.ndarray:
+        """Get samples in the order they were pushed.
+
+        Returns:
+            np.ndarray: copy of the samples
+        """
+        if self._count < len(self._values):
+            return np.array(self._samples())
+        return np.roll(self._values, -self._index)
+
+    def _samples(self) -> np.ndarray:
+        # Order of the samples does not matter for the aggregates
+        return self._values[: self._count]
+
+    def mean(self) -> float:
+        """Get mean of the samples, 0 if there are no samples"""
+        if not self._count:
+            return 0.0
+        return float(self._samples().mean())
+
+    def min(self) -> float:
+        """Get minimal sample, 0 if there are no samples"""
+        if not self._count:
+            return 0.0
+        return float(self._samples().min())
+
+    def max(self) -> float:
+        """Get maximal sample, 0 if there are no samples"""
+        if not self._count:
+            return 0.0
+        return float(self._samples().max())
+
+    def percentile(self, q: float) -> float:
+        """Get percentile of the samples, 0 if there are no samples
+
+        Args:
+            q (float): percentile in range [0, 100]
+        """
+        if not self._count:
+            return 0.0
+        return float(np.percentile(self._samples(), q))
+
+    def histogram(self, bins: int = 10, range: Optional[Tuple[float, float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Get histogram of the samples.
+
+        Args:
+            bins (int, optional): number of bins. Defaults to 10.
+            range (Optional[Tuple[float, float]], optional): lower and upper range of the bins. Defaults to the samples range.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: counts per bin and bin edges, see `numpy.histogram`
+        """
+        return np.histogram(self._samples(), bins=bins, range=range)
+
+    def summary(self) -> FrameStatsSummary:
+        """Get snapshot of the statistics.
+
+        Returns:
+            FrameStatsSummary: statistics of the samples in the ring buffer
+        """
+        if not self._count:
+            return FrameStatsSummary(0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0)
+
+        samples = self._samples()
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        # Unlike the `hitches` attribute, the hitches of the ring buffer only
+        hitches = int((samples > self.hitch_threshold).sum()) if self.hitch_threshold is not None else 0
+        return FrameStatsSummary(
+            samples=self._count,
+            min=float(samples.min()),
+            mean=float(samples.mean()),
+            p50=float(p50),
+            p95=float(p95),
+            p99=float(p99),
+            max=float(samples.max()),
+            hitches=hitches,
+        )
@@ -0,0 +1,374 @@
+"""
+Persistent on-disk cache of the data derived from TMX maps.
+
+The cache entry is keyed by the SHA1 hash of the TMX file content, its external TSX tilesets and the collision layer names,
+so an edited map or tileset is rebuilt automatically.
+An entry keeps:
+- the map dimensions, the tile layers gids and the tilesets metadata
+- the sources of the tile images, so the tiles can be loaded without parsing the TMX file (see `pgz.StreamingScrollMap`)
+- the solid tiles grid and the merged collision rects
+- the collision shapes of the object layers
+
+The arrays are stored in the NumPy `.npy` format and are memory-mapped on load, the rest is stored as JSON.
+By default the entries are kept in the `__pgzcache__` directory next to the TMX file. A broken entry is rebuilt on the next store.
+
+The key is calculated from the file bytes, the TMX file is not parsed to check the cache. `pgz.HeadlessScrollMap` and `pgz.StreamingScrollMap`
+do not parse the TMX file at all once the map is cached. A regular `pgz.ScrollMap` renders the tiles of a `pytmx.TiledMap` loaded with the images,
+so only the collision data building is skipped.
+
+Examples:
+```
+cache = pgz.MapCache()
+map = pgz.ScrollMap(app.resolution, pgz.maps.default, ["Islands"], map_cache=cache)
+```
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from itertools import product
+from typing import Any, Dict, List, Optional, Tuple
+from xml.sax.saxutils import unescape
+
+import numpy as np
+import pygame
+import pytmx
+
+from .bvh import EllipseShape, PolygonShape, RectShape, Shape
+from .tile_grid import TileGrid
+
+JSON = Dict[str, Any]
+# (path, modification time, size) of the files the key was calculated from
+FileStamps = Tuple[Tuple[str, int, int], ...]
+
+# Bump the version once the cached data layout is changed
+CACHE_VERSION = 2
+
+# Source attribute of the external tilesets, the TMX file is not parsed to calculate the cache key
+_TILESET_SOURCE = re.compile(rb"<tileset\b[^>]*?\bsource=(?:\"([^\"]*)\"|'([^']*)')")
+
+
+def _shape_to_json(shape: Shape) -> JSON:
+    obj = shape.data
+    data = None
+    if obj is not None:
+        data = {"id": getattr(obj, "id", None), "name": getattr(obj, "name", None), "type": getattr(obj, "type", None), "properties": getattr(obj, "properties", {})}
+    if isinstance(shape, PolygonShape):
+        return {"type": "polygon", "points": shape.points, "closed": shape.closed, "data": data}
+    left, top, right, bottom = shape.bounds
+    return {"type": "ellipse" if isinstance(shape, EllipseShape) else "rect", "rect": [left, top, right - left, bottom - top], "data": data}
+
+
+def _shape_from_json(value: JSON) -> Shape:
+    if value["type"] == "polygon":
+        return PolygonShape([tuple(p) for p in value["points"]], closed=value["closed"], data=value["data"])
+    if value["type"] == "ellipse":
+        return EllipseShape(value["rect"], data=value["data"])
+    return RectShape(value["rect"], data=value["data"])
+
+
+def _tileset_to_json(tileset: Any) -> JSON:
+    return {
+        name: getattr(tileset, name, None)
+        for name in ("name", "firstgid", "source", "tilewidth", "tileheight", "tilecount", "columns", "spacing", "margin")
+    }
+
+
+def _tiles_to_json(tmx: pytmx.TiledMap) -> List[JSON]:
+    """Get the tile image sources by the pytmx gid, the same way `pytmx.TiledMap.reload_images` cuts the tileset images"""
+    tiles: List[JSON] = []
+    for ts in tmx.tilesets:
+        if ts.source is None:
+            continue
+        positions = product(
+            range(ts.margin, ts.height + ts.margin - ts.tileheight + 1, ts.tileheight + ts.spacing),
+            range(ts.margin, ts.width + ts.margin - ts.tilewidth + 1, ts.tilewidth + ts.spacing),
+        )
+        for real_gid, (y, x) in enumerate(positions, ts.firstgid):
+            for gid, flags in tmx.gidmap.get(real_gid, []):
+                tiles.append({"gid": gid, "source": ts.source, "trans": ts.trans, "rect": [x, y, ts.tilewidth, ts.tileheight], "flags": list(flags)})
+
+    # Tiles with their own images replace the tileset tiles
+    for real_gid, props in tmx.tile_properties.items():
+        source = props.get("source", None)
+        if source:
+            tiles.append({"gid": real_gid, "source": source, "trans": props.get("trans", None), "rect": None, "flags": None})
+    return tiles
+
+
+def _external_tilesets(path: str, content: bytes) -> List[str]:
+    """Get paths of the external TSX tilesets referenced by a TMX file content"""
+    directory = os.path.dirname(path)
+    sources = [(double or single).decode() for double, single in _TILESET_SOURCE.findall(content)]
+    return [os.path.join(directory, unescape(source, {"&quot;": '"', "&apos;": "'"})) for source in sources]
+
+
+def _file_stamps(paths: List[str]) -> FileStamps:
+    stamps = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stamps.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamps.append((path, -1, -1))
+    return tuple(stamps)
+
+
+class CachedMapData(object):
+    """Map data loaded from the cache"""
+
+    def __init__(self, meta: JSON, solid: np.ndarray, layers: np.ndarray) -> None:
+        self._meta = meta
+        self._layers = layers
+        self._grid = TileGrid.from_array(solid, meta["tilewidth"], meta["tileheight"])
+        self._merged_rects = [pygame.Rect(rect) for rect in meta["merged_rects"]]
+        self._shapes = [_shape_from_json(shape) for shape in meta["shapes"]]
+
+    @property
+    def width(self) -> int:
+        """Get map width in tiles"""
+        return int(self._meta["width"])
+
+    @property
+    def height(self) -> int:
+        """Get map height in tiles"""
+        return int(self._meta["height"])
+
+    @property
+    def tile_width(self) -> int:
+        return int(self._meta["tilewidth"])
+
+    @property
+    def tile_height(self) -> int:
+        return int(self._meta["tileheight"])
+
+    @property
+    def layer_names(self) -> List[str]:
+        """Get names of the tile layers"""
+        return list(self._meta["layer_names"])
+
+    @property
+    def tilesets(self) -> List[JSON]:
+        """Get tilesets metadata: name, firstgid, source, tile size, tile count,..."""
+        return list(self._meta["tilesets"])
+
+    @property
+    def grid(self) -> TileGrid:
+        """Get grid of the solid tiles of the collision layers"""
+        return self._grid
+
+    @property
+    def merged_rects(self) -> List[pygame.Rect]:
+        """Get collision rects merged from the solid tiles"""
+        return self._merged_rects
+
+    @property
+    def shapes(self) -> List[Shape]:
+        """Get collision shapes of the object layers.
+
+        The `data` of the shapes is a dict with "id", "name", "type" and "properties" of the source object.
+        """
+        return self._shapes
+
+    @property
+    def layers(self) -> np.ndarray:
+        """Get gids of all the tile layers.
+
+        Returns:
+            np.ndarray: read-only array of gids indexed as [layer, y, x]
+        """
+        return self._layers
+
+    @property
+    def layer_indices(self) -> List[int]:
+        """Get indices of the tile layers among all the map layers, same as the layer numbers used by pyscroll"""
+        return list(self._meta["layer_indices"])
+
+    @property
+    def visible_tile_layers(self) -> List[int]:
+        """Get indices of the visible tile layers among all the map layers"""
+        return list(self._meta["visible_tile_layers"])
+
+    @property
+    def tiles(self) -> List[JSON]:
+        """Get sources of the tile images.
+
+        Every tile is a dict with "gid" (pytmx gid), "source" (image path relative to the TMX file), "trans" (color key),
+        "rect" (tile area on the image, None for the whole image) and "flags" (flip flags, None if not flipped).
+        """
+        return list(self._meta["tiles"])
+
+    def layer_data(self, name: str) -> np.ndarray:
+        """Get gids of a tile layer.
+
+        Args:
+            name (str): tile layer name
+
+        Returns:
+            np.ndarray: read-only array of gids indexed as [y, x]
+        """
+        layer: np.ndarray = self._layers[self._meta["layer_names"].index(name)]
+        return layer
+
+
+class MapCache(object):
+    """On-disk cache of the map data derived from TMX files"""
+
+    def __init__(self, cache_dir: Optional[str] = None) -> None:
+        """Create a map cache.
+
+        Args:
+            cache_dir (Optional[str], optional): directory for the cache entries. The `__pgzcache__` directory next to the TMX file is used if None. Defaults to None.
+        """
+        self.cache_dir = cache_dir
+        # Content hashes of the maps and their tilesets by the TMX path, reused while the files are not modified
+        self._hashes: Dict[str, Tuple[FileStamps, str]] = {}
+
+    def _content_hash(self, path: str) -> str:
+        """Get SHA1 hash of the TMX file and its external tilesets. The files are re-read only after a modification."""
+        cached = self._hashes.get(path)
+        if cached is not None and _file_stamps([stamp[0] for stamp in cached[0]]) == cached[0]:
+            return cached[1]
+
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except OSError:
+            content = b""
+        tilesets = _external_tilesets(path, content)
+        stamps = _file_stamps([path] + tilesets)
+        sha1 = hashlib.sha1(os.path.basename(path).encode())
+        sha1.update(content)
+        for file_path in tilesets:
+            sha1.update(os.path.basename(file_path).encode())
+            try:
+                with open(file_path, "rb") as f:
+                    sha1.update(f.read())
+            except OSError:
+                # A missing tileset fails the map loading anyway
+                pass
+        digest = sha1.hexdigest()
+        self._hashes[path] = (stamps, digest)
+        return digest
+
+    def key(self, path: str, collision_layers: List[str] = [], collision_object_layers: List[str] = []) -> str:
+        """Calculate the cache key of a map.
+
+        Args:
+            path (str): TMX file path
+            collision_layers (List[str], optional): names of the collision tile layers. Defaults to [].
+            collision_object_layers (List[str], optional): names of the collision object layers. Defaults to [].
+
+        Returns:
+            str: the cache key
+        """
+        sha1 = hashlib.sha1(self._content_hash(path).encode())
+        sha1.update(json.dumps([CACHE_VERSION, list(collision_layers), list(collision_object_layers)]).encode())
+        return sha1.hexdigest()
+
+    def entry_path(self, path: str, key: str) -> str:
+        """Get directory of the cache entry"""
+        cache_dir = self.cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), "__pgzcache__")
+        stem = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(cache_dir, f"{stem}-{key}")
+
+    def load(self, path: str, collision_layers: List[str] = [], collision_object_layers: List[str] = []) -> Optional[CachedMapData]:
+        """Load the cached map data.
+
+        Args:
+            path (str): TMX file path
+            collision_layers (List[str], optional): names of the collision tile layers. Defaults to [].
+            collision_object_layers (List[str], optional): names of the collision object layers. Defaults to [].
+
+        Returns:
+            Optional[CachedMapData]: the cached data, None if the map is not cached yet or the entry is broken
+        """
+        return self._load_entry(self.entry_path(path, self.key(path, collision_layers, collision_object_layers)))
+
+    @staticmethod
+    def _load_entry(entry: str) -> Optional[CachedMapData]:
+        try:
+            with open(os.path.join(entry, "meta.json")) as f:
+                meta = json.load(f)
+            solid = np.load(os.path.join(entry, "solid.npy"), mmap_mode="r")
+            layers = np.load(os.path.join(entry, "layers.npy"), mmap_mode="r")
+            return CachedMapData(meta, solid, layers)
+        except (OSError, ValueError, KeyError, TypeError):
+            # Missing, partial or outdated entry
+            return None
+
+    def store(
+        self,
+        path: str,
+        tmx: pytmx.TiledMap,
+        grid: TileGrid,
+        merged_rects: List[pygame.Rect],
+        shapes: List[Shape],
+        collision_layers: List[str] = [],
+        collision_object_layers: List[str] = [],
+    ) -> None:
+        """Store the map data derived from a loaded map.
+
+        The entry is written into a temporary directory and renamed, so concurrent processes never see a partial entry.
+        A valid entry of the map is kept, a broken one is replaced.
+
+        Args:
+            path (str): TMX file path
+            tmx (pytmx.TiledMap): loaded map
+            grid (TileGrid): solid tiles of the collision layers
+            merged_rects (List[pygame.Rect]): collision rects merged from the solid tiles
+            shapes (List[Shape]): collision shapes of the object layers
+            collision_layers (List[str], optional): names of the collision tile layers. Defaults to [].
+            collision_object_layers (List[str], optional): names of the collision object layers. Defaults to [].
+        """
+        entry = self.entry_path(path, self.key(path, collision_layers, collision_object_layers))
+        if os.path.isdir(entry) and self._load_entry(entry) is not None:
+            return
+
+        layer_indices = [index for index, layer in enumerate(tmx.layers) if isinstance(layer, pytmx.TiledTileLayer)]
+        tile_layers = [tmx.layers[index] for index in layer_indices]
+        layers = np.zeros((len(tile_layers), tmx.height, tmx.width), dtype=np.uint32)
+        for i, layer in enumerate(tile_layers):
+            layers[i] = np.asarray(layer.data, dtype=np.uint32)
+        meta = {
+            "version": CACHE_VERSION,
+            "width": tmx.width,
+            "height": tmx.height,
+            "tilewidth": tmx.tilewidth,
+            "tileheight": tmx.tileheight,
+            "layer_names": [layer.name for layer in tile_layers],
+            "layer_indices": layer_indices,
+            "visible_tile_layers": list(tmx.visible_tile_layers),
+            "tilesets": [_tileset_to_json(tileset) for tileset in tmx.tilesets],
+            "merged_rects": [list(rect) for rect in merged_rects],
+            "shapes": [_shape_to_json(shape) for shape in shapes],
+            "tiles": _tiles_to_json(tmx),
+        }
+
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        tmp_entry = tempfile.mkdtemp(dir=os.path.dirname(entry))
+        try:
+            np.save(os.path.join(tmp_entry, "solid.npy"), np.asarray(grid.solid, dtype=bool))
+            np.save(os.path.join(tmp_entry, "layers.npy"), layers)
+            with open(os.path.join(tmp_entry, "meta.json"), "w") as f:
+                json.dump(meta, f, default=str)
+            self._replace_entry(tmp_entry, entry)
+        except OSError:
+            # Another process has stored the same entry
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+    @staticmethod
+    def _replace_entry(new_entry: str, entry: str) -> None:
+        """Rename the new entry directory into place. A broken entry is moved away first, a non-empty directory can not be renamed over."""
+        if os.path.isdir(entry):
+            trash = tempfile.mkdtemp(dir=os.path.dirname(entry))
+            try:
+                os.rename(entry, os.path.join(trash, "entry"))
+            except OSError:
+                # Another process has moved the entry already
+                pass
+            shutil.rmtree(trash, ignore_errors=True)
+        os.rename(new_entry, entry)
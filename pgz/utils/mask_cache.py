@@ -0,0 +1,126 @@
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+import pygame
+
+from .surface_cache import surface_cache
+
+MaskKey = Tuple[str, pygame.Surface, float]
+
+
+class MaskCache(object):
+    """LRU cache of the pixel masks of rotated actor images.
+
+    Masks are cached per (image name, image surface, quantized angle), so a freely rotating actor does not recompute its mask every frame.
+    By default the angles are quantized the same way as the drawn images of `surface_cache`, so the masks match the screen.
+    """
+
+    def __init__(self, angle_step: Optional[float] = None, max_size: int = 4096) -> None:
+        """Create a mask cache.
+
+        Args:
+            angle_step (Optional[float], optional): angle quantization step in degrees. The step of `surface_cache` is used if None. Defaults to None.
+            max_size (int, optional): maximal number of cached masks. Defaults to 4096.
+        """
+        self._angle_step = angle_step
+        self.max_size = max_size
+        self._masks: "OrderedDict[MaskKey, pygame.mask.Mask]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._masks)
+
+    @property
+    def angle_step(self) -> float:
+        """Get angle quantization step in degrees"""
+        return self._angle_step if self._angle_step is not None else surface_cache.angle_step
+
+    @angle_step.setter
+    def angle_step(self, value: Optional[float]) -> None:
+        self._angle_step = value
+        # The cached masks are quantized by the old step
+        self._masks.clear()
+
+    def clear(self) -> None:
+        self._masks.clear()
+
+    def quantize(self, angle: float) -> float:
+        """Round an angle to the quantization step"""
+        return (round(angle / self.angle_step) * self.angle_step) % 360
+
+    def get_mask(self, actor: Any) -> pygame.mask.Mask:
+        """Get mask of the actor image rotated by the actor angle.
+
+        Args:
+            actor (Actor): actor object
+
+        Returns:
+            pygame.mask.Mask: cached mask
+        """
+        angle = self.quantize(actor.angle)
+        # The same image name might be loaded again into a different surface.
+        # The key keeps the surface alive, so a new surface can not reuse the key while it is cached
+        key = (actor.image, actor._orig_surf, angle)
+        mask = self._masks.get(key)
+        if mask is not None:
+            self._masks.move_to_end(key)
+            return mask
+
+        surface = actor._orig_surf
+        if angle:
+            surface = pygame.transform.rotate(surface, angle)
+        mask = pygame.mask.from_surface(surface)
+        self._masks[key] = mask
+        if len(self._masks) > self.max_size:
+            self._masks.popitem(last=False)
+        return mask
+
+    def get_mask_and_offset(self, actor: Any) -> Tuple[pygame.mask.Mask, Tuple[int, int]]:
+        """Get actor mask and its top left position.
+
+        The mask is centered on the actor rect, because the size of the quantized rotation might be a bit different from the actor rect.
+
+        Returns:
+            Tuple[pygame.mask.Mask, Tuple[int, int]]: mask and its position in the world coordinates
+        """
+        mask = self.get_mask(actor)
+        width, height = mask.get_size()
+        centerx, centery = actor.rect.center
+        return mask, (int(centerx - width / 2), int(centery - height / 2))
+
+    def collide(self, actor_a: Any, actor_b: Any) -> bool:
+        """Pixel perfect collision test of two actors.
+
+        Args:
+            actor_a (Actor): first actor
+            actor_b (Actor): second actor
+
+        Returns:
+            bool: True if the masks overlap
+        """
+        mask_a, (ax, ay) = self.get_mask_and_offset(actor_a)
+        mask_b, (bx, by) = self.get_mask_and_offset(actor_b)
+        return mask_a.overlap(mask_b, (bx - ax, by - ay)) is not None
+
+
+# Mask cache shared by the collision detectors and maps
+mask_cache = MaskCache()
+
+
+def actor_of(sprite: Any) -> Any:
+    """Get actor object from `pgz.actor.SpriteDelegate` or the actor itself"""
+    return getattr(sprite, "actor", sprite)
+
+
+def collide_mask(sprite_a: Any, sprite_b: Any) -> bool:
+    """Rect broadphase followed by the cached mask test. Can be used as `collided` callback of `pygame.sprite` functions.
+
+    Args:
+        sprite_a (Any): actor or sprite delegate
+        sprite_b (Any): actor or sprite delegate
+
+    Returns:
+        bool: True if the actors collide
+    """
+    if not sprite_a.rect.colliderect(sprite_b.rect):
+        return False
+    return mask_cache.collide(actor_of(sprite_a), actor_of(sprite_b))
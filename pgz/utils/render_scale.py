@@ -0,0 +1,66 @@
+from typing import Optional
+
+from .frame_stats import FrameStats
+
+
+class AdaptiveRenderScale(object):
+    """Render scale controller keeping the frame work time within the budget.
+
+    The controller collects the frame times without the frame limiter delay. Once a window of the samples is collected,
+    the scale is lowered by a step if the mean frame time goes over the budget, and raised back by a step if the frame time
+    stays well below the budget. The scale is changed at most once per window, so the scale does not flicker between the levels.
+    """
+
+    def __init__(self, max_scale: float = 1.0, min_scale: float = 0.5, step: float = 0.125, window: int = 30, headroom: float = 0.7) -> None:
+        """Create a render scale controller.
+
+        Args:
+            max_scale (float, optional): highest scale, usually the configured render scale. Defaults to 1.0.
+            min_scale (float, optional): lowest scale. Defaults to 0.5.
+            step (float, optional): scale change per adjustment. Defaults to 0.125.
+            window (int, optional): number of the frames between the adjustments. Defaults to 30.
+            headroom (float, optional): the scale is raised if the mean frame time is below this part of the budget. Defaults to 0.7.
+        """
+        if not 0 < min_scale <= max_scale:
+            raise ValueError("min_scale should be positive and not bigger than max_scale")
+        self.max_scale = max_scale
+        self.min_scale = min_scale
+        self.step = step
+        self.headroom = headroom
+        self.scale = max_scale
+        self._stats = FrameStats(size=window)
+
+    def reset(self, scale: Optional[float] = None) -> None:
+        """Drop the collected samples, for example after the resolution change.
+
+        Args:
+            scale (Optional[float], optional): new current scale, clamped to the scale range. Defaults to None.
+        """
+        if scale is not None:
+            self.scale = min(max(scale, self.min_scale), self.max_scale)
+        self._stats = FrameStats(size=self._stats.size)
+
+    def push(self, frame_time: float, budget: float) -> float:
+        """Collect a frame time and adjust the scale.
+
+        Args:
+            frame_time (float): time of the frame processing in milliseconds, without the frame limiter delay
+            budget (float): frame time budget in milliseconds
+
+        Returns:
+            float: render scale for the next frames
+        """
+        stats = self._stats
+        stats.push(frame_time)
+        if stats.count < stats.size:
+            return self.scale
+
+        mean = stats.mean()
+        if mean > budget and self.scale > self.min_scale:
+            self.reset(self.scale - self.step)
+        elif mean < budget * self.headroom and self.scale < self.max_scale:
+            self.reset(self.scale + self.step)
+        else:
+            # Next window starts from scratch anyway
+            self.reset()
+        return self.scale
@@ -1,5 +1,8 @@
-from typing import Any, List, Tuple
+import xml.etree.ElementTree as ElementTree
+from typing import Any, Dict, List, Optional, Set, Tuple, Union, cast
+from weakref import WeakKeyDictionary
 
+import numpy as np
 import pygame
 import pyscroll
 import pyscroll.data
@@ -7,6 +10,16 @@ import pytmx
 from pgzero.screen import Screen
 from pyscroll.group import PyscrollGroup
 
+from ..actor import SpriteDelegate
+from .bvh import BVH, EllipseShape, Point, PolygonShape, RectShape, Shape
+from .map_cache import CachedMapData, MapCache
+from .mask_cache import actor_of, mask_cache
+from .spatial_hash import SpatialHash
+from .static_layer import StaticLayer
+from .sweep import SweepHit, Vector, first_hit
+from .tile_grid import RayHit, TileGrid
+from .zoom_cache import ZoomCache
+
 
 def extract_collision_objects_from_object_layers(tmx_data: pytmx.TiledMap) -> List[pygame.Rect]:
     collison_objects = list()
@@ -16,27 +29,466 @@ def extract_collision_objects_from_object_layers(tmx_data: pytmx.TiledMap) -> Li
     return collison_objects
 
 
-def extract_collision_objects_from_tile_layers(tmx_data: pytmx.TiledMap, collision_layer_names: List[str]) -> List[pygame.Rect]:
-    collison_objects = list()
+# Ellipse object ids by the loaded map, the maps are cached by the resource loaders
+_ellipse_ids: "WeakKeyDictionary[pytmx.TiledMap, Set[int]]" = WeakKeyDictionary()
+
+
+def _ellipse_object_ids(tmx_data: pytmx.TiledMap) -> Set[int]:
+    """pytmx does not keep the ellipse flag of objects, so it is read from the tmx file once per loaded map"""
+    ids = _ellipse_ids.get(tmx_data)
+    if ids is None:
+        ids = set()
+        if getattr(tmx_data, "filename", None):
+            root = ElementTree.parse(tmx_data.filename).getroot()
+            ids = {int(node.get("id", 0)) for node in root.iter("object") if node.find("ellipse") is not None}
+        _ellipse_ids[tmx_data] = ids
+    return ids
+
+
+def extract_collision_shapes_from_object_layers(tmx_data: pytmx.TiledMap, collision_layer_names: List[str]) -> List[Shape]:
+    """Build collision shapes from the objects of the object layers.
 
+    Rectangles, polygons, polylines and ellipses are supported. Rotated rectangles are converted into polygons.
+    """
+    if not collision_layer_names:
+        return []
+
+    shapes: List[Shape] = []
     for layer_name in collision_layer_names:
-        collision_layer = tmx_data.get_layer_by_name(layer_name)
-        for x in range(collision_layer.width):
-            for y in range(collision_layer.height):
-                image = tmx_data.get_tile_image(x, y, 1)
-                if image:
-                    collison_objects.append(
-                        pygame.Rect(
-                            x * tmx_data.tilewidth,
-                            y * tmx_data.tileheight,
-                            tmx_data.tilewidth,
-                            tmx_data.tileheight,
-                        )
-                    )
-    return collison_objects
+        for obj in tmx_data.get_layer_by_name(layer_name):
+            if hasattr(obj, "points"):
+                shapes.append(PolygonShape(obj.apply_transformations(), closed=obj.closed, data=obj))
+            elif obj.id in _ellipse_object_ids(tmx_data):
+                shapes.append(EllipseShape((obj.x, obj.y, obj.width, obj.height), data=obj))
+            elif obj.rotation:
+                shapes.append(PolygonShape(obj.apply_transformations(), data=obj))
+            else:
+                shapes.append(RectShape((obj.x, obj.y, obj.width, obj.height), data=obj))
+    return shapes
+
+
+def extract_collision_objects_from_tile_layers(tmx_data: pytmx.TiledMap, collision_layer_names: List[str]) -> List[pygame.Rect]:
+    """Build collision rects covering all the non-empty tiles of the tile layers.
+
+    Adjacent tiles are merged into bigger rects, so the number of rects is much smaller than the number of tiles.
+    """
+    return TileGrid.from_tmx(tmx_data, collision_layer_names).merged_rects()
+
+
+class CullingPyscrollGroup(PyscrollGroup):
+    """PyscrollGroup drawing only the sprites overlapping the map view.
+
+    The sprites are kept in a spatial index, so the culling cost does not depend on the number of the sprites outside of the view.
+    Positions of the actors are tracked with the actor change listeners. Other sprites can not report their movement,
+    so they are tested against the view one by one.
+
+    `drawn_count` and `culled_count` report the numbers of the last draw.
+
+    The visible chunks of the static layer are passed to the renderer together with the sprites, so the map tiles of the upper layers
+    still overlap the static actors.
+    """
+
+    def __init__(self, *args: Any, cell_size: int = 256, static_layer: Optional[StaticLayer] = None, **kwargs: Any) -> None:
+        # The fields are used by `add_internal`, which can be called from the base class constructor
+        # Spatial index of the tracked sprites, anything with the rect and image attributes
+        self._index: SpatialHash[Any] = SpatialHash(cell_size)
+        # Tracked sprites by the actor
+        self._tracked: Dict[Any, pygame.sprite.Sprite] = {}
+        self._changed: Set[Any] = set()
+        self._untracked: Set[Any] = set()
+        # Drawing order of the sprites with the same layer
+        self._order: Dict[pygame.sprite.Sprite, int] = {}
+        self._next_order = 0
+        self.drawn_count = 0
+        self.culled_count = 0
+        self.static_layer = static_layer
+        # The chunks are interlaced with the tiles same as the sprites of the default layer
+        self._static_layer_index = kwargs.get("default_layer", 0)
+        super().__init__(*args, **kwargs)
+
+    def add_internal(self, sprite: pygame.sprite.Sprite, layer: Optional[int] = None) -> None:
+        super().add_internal(sprite, layer)
+        self._order[sprite] = self._next_order
+        self._next_order += 1
+
+        actor = actor_of(sprite)
+        if hasattr(actor, "add_change_listener"):
+            self._tracked[actor] = sprite
+            actor.add_change_listener(self._on_actor_changed)
+            self._changed.add(actor)
+        else:
+            self._untracked.add(sprite)
+
+    def remove_internal(self, sprite: pygame.sprite.Sprite) -> None:
+        super().remove_internal(sprite)
+        self._order.pop(sprite, None)
+        self._untracked.discard(sprite)
+        self._index.remove(sprite)
+
+        actor = actor_of(sprite)
+        if self._tracked.pop(actor, None) is not None:
+            actor.remove_change_listener(self._on_actor_changed)
+            self._changed.discard(actor)
+
+    def _on_actor_changed(self, actor: Any) -> None:
+        self._changed.add(actor)
+
+    def set_map_layer(self, map_layer: pyscroll.BufferedRenderer) -> None:
+        """Switch the group to another renderer of the same map"""
+        self._map_layer = map_layer
+
+    def visible_sprites(self, view_rect: pygame.Rect) -> List[pygame.sprite.Sprite]:
+        """Get sprites overlapping the map area in the drawing order.
+
+        Args:
+            view_rect (pygame.Rect): map area in the map coordinates
+
+        Returns:
+            List[pygame.sprite.Sprite]: the overlapping sprites
+        """
+        for actor in self._changed:
+            self._index.update(self._tracked[actor], actor.rect)
+        self._changed.clear()
+
+        sprites = [sprite for sprite in self._index.query(view_rect) if sprite.rect.colliderect(view_rect)]
+        sprites.extend(sprite for sprite in self._untracked if sprite.rect.colliderect(view_rect))
+        layer_of = self.get_layer_of_sprite
+        order = self._order
+        sprites.sort(key=lambda sprite: (layer_of(sprite), order[sprite]))
+        return sprites
+
+    def draw(self, surface: pygame.Surface) -> List[pygame.Rect]:
+        """Draw the map and the visible sprites. Same as `PyscrollGroup.draw`, but with the indexed culling.
+
+        Args:
+            surface (pygame.Surface): surface to draw to
+        """
+        ox, oy = self._map_layer.get_center_offset()
+        draw_area = surface.get_rect()
+        view_rect = self._map_layer.view_rect
+        # Anything with the rect and image attributes
+        sprites: List[Any] = self.visible_sprites(view_rect)
+
+        new_surfaces: List[Tuple[Any, ...]] = []
+        if self.static_layer is not None:
+            for chunk, chunk_rect in self.static_layer.chunks(view_rect):
+                new_surfaces.append((chunk, chunk_rect.move(ox, oy), self._static_layer_index))
+        spritedict = self.spritedict
+        layer_of = self.get_layer_of_sprite
+        for sprite in sprites:
+            new_rect = sprite.rect.move(ox, oy)
+            blendmode = getattr(sprite, "blendmode", None)
+            if blendmode is None:
+                new_surfaces.append((sprite.image, new_rect, layer_of(sprite)))
+            else:
+                new_surfaces.append((sprite.image, new_rect, layer_of(sprite), blendmode))
+            spritedict[sprite] = new_rect
+
+        self.drawn_count = len(sprites)
+        self.culled_count = len(self.spritedict) - len(sprites)
+        self.lostsprites: List[pygame.Rect] = []
+        dirty: List[pygame.Rect] = self._map_layer.draw(surface, draw_area, new_surfaces)
+        return dirty
+
+
+class BaseScrollMap(object):
+    """Base class of the maps used by `pgz.MapScene`: the map data and the collision detection.
+
+    The collision layers and the collision object layers are loaded from the TMX map or from the map cache.
+    The subclasses manage the sprites added to the map and the view of the map: `ScrollMap` renders the map with a camera,
+    `HeadlessScrollMap` keeps no renderer at all.
+    """
+
+    def __init__(self, use_masks: bool = False) -> None:
+        """Create the map base. The subclasses load the collision data with `_load_collision_data`.
+
+        Args:
+            use_masks (bool, optional): confirm collisions with tiles and collision shapes using the pixel mask of the actor image. Defaults to False.
+        """
+        self._tmx: Optional[pytmx.TiledMap] = None
+        # Pixel perfect collision detection with the collision tiles
+        self.use_masks = use_masks
+        # Pre-rendered static actors
+        self.static_layer = StaticLayer()
+
+    def _load_collision_data(self, collision_layers: List[str], collision_object_layers: List[str], map_cache: Optional[MapCache]) -> Optional[CachedMapData]:
+        """Load the collision data from the map cache, or build it and store in the cache.
+
+        Returns:
+            Optional[CachedMapData]: the cached data if it was loaded
+        """
+        self._map_collision_obj: List[pygame.Rect] = []
+        # Hierarchy of all the static collision shapes: merged tiles and objects
+        self._collision_bvh = BVH([])
+        # Hierarchy of the object shapes only, the tiles are tested with the tile grid
+        self._shape_bvh = BVH([])
+
+        path = self._tmx_path()
+        cached = map_cache.load(path, collision_layers, collision_object_layers) if map_cache and path else None
+        if cached:
+            self._collision_grid = cached.grid
+            self._map_collision_obj = cached.merged_rects
+            self._collision_shapes: List[Shape] = cached.shapes
+            self._build_collision_bvh()
+            return cached
+
+        tmx = self.tmx
+        # Solid tiles of the collision layers
+        self._collision_grid = TileGrid(tmx.width, tmx.height, tmx.tilewidth, tmx.tileheight)
+        # Shapes of the collision object layers
+        self._collision_shapes = extract_collision_shapes_from_object_layers(tmx, collision_object_layers)
+        self.add_collision_layers(collision_layers)
+
+        if map_cache and path:
+            map_cache.store(
+                path, tmx, self._collision_grid, self._map_collision_obj, self._collision_shapes, collision_layers, collision_object_layers
+            )
+        return None
+
+    def _tmx_path(self) -> Optional[str]:
+        return getattr(self._tmx, "filename", None)
+
+    @property
+    def tmx(self) -> pytmx.TiledMap:
+        """Get the `pytmx.TiledMap` object. A map given by the TMX file path is parsed without images on the first access."""
+        if self._tmx is None:
+            self._tmx = pytmx.TiledMap(self._tmx_path())
+        return self._tmx
+
+    def add_collision_layers(self, collision_layers: List[str]) -> None:
+        """Load `pytmx.TiledMap` layer tiles for collision detection.
+
+        Some layer in the `pytmx.TiledMap` might be be used for collision detection.
+        For example: the layer includes "island tiles" might be used for collision detection with a "ship" actor.
+
+        Args:
+            collision_layers (List[str]): List of `pytmx.TiledMap` layer names will be used for tiles collision detection.
+        """
+        self._collision_grid.add_tmx_layers(self.tmx, collision_layers)
+        # setup level geometry with simple pygame rects merged from the solid tiles
+        self._map_collision_obj = self._collision_grid.merged_rects()
+        self._build_collision_bvh()
+
+    def add_collision_object_layers(self, collision_object_layers: List[str]) -> None:
+        """Load `pytmx.TiledMap` object layer shapes for collision detection.
+
+        Args:
+            collision_object_layers (List[str]): List of `pytmx.TiledMap` object layer names will be used for collision detection.
+        """
+        self._collision_shapes += extract_collision_shapes_from_object_layers(self.tmx, collision_object_layers)
+        self._build_collision_bvh()
+
+    def _build_collision_bvh(self) -> None:
+        tile_shapes: List[Shape] = [RectShape(rect) for rect in self._map_collision_obj]
+        self._collision_bvh = BVH(tile_shapes + self._collision_shapes)
+        self._shape_bvh = BVH(self._collision_shapes)
+        # Bounding boxes of the object shapes for the swept collision tests
+        self._collision_shape_bounds = np.array([shape.bounds for shape in self._collision_shapes], dtype=np.float64).reshape(-1, 4)
+
+    def query_point(self, point: Point) -> List[Shape]:
+        """Get static collision shapes (merged tiles and objects) containing a point.
+
+        Args:
+            point (Point): point in the map coordinates
+
+        Returns:
+            List[Shape]: collision shapes, shapes of the objects keep the source `pytmx.TiledObject` in `data`
+        """
+        return self._collision_bvh.query_point(*point)
+
+    def query_rect(self, rect: Any) -> List[Shape]:
+        """Get static collision shapes (merged tiles and objects) intersecting a rect.
+
+        Args:
+            rect (Any): rect in the map coordinates
+
+        Returns:
+            List[Shape]: collision shapes
+        """
+        return self._collision_bvh.query_rect(rect)
+
+    def query_segment(self, start: Point, end: Point) -> List[Shape]:
+        """Get static collision shapes (merged tiles and objects) intersecting a segment.
+
+        Args:
+            start (Point): segment start in the map coordinates
+            end (Point): segment end in the map coordinates
+
+        Returns:
+            List[Shape]: collision shapes
+        """
+        return self._collision_bvh.query_segment(start, end)
+
+    @property
+    def collision_grid(self) -> TileGrid:
+        """Get grid of the solid tiles loaded from the collision layers.
+
+        Returns:
+            TileGrid: the collision tiles grid
+        """
+        return self._collision_grid
+
+    def collide_map(self, sprite: pygame.sprite.Sprite) -> bool:
+        """Detect a collision with tiles on the map
+
+        Args:
+            sprite (pygame.sprite.Sprite): sprite/actor for detection
+
+        Returns:
+            bool: True is the collision with the colision layers was detected
+        """
+        rect: Optional[pygame.Rect] = cast(SpriteDelegate, sprite).rect
+        if not rect:
+            return False
+        # Only the tiles and the shapes under the sprite are checked
+        tiles = self._collision_grid.collide_rect(rect)
+        shapes = self._shape_bvh.query_rect(rect) if self._collision_shapes else []
+        if not tiles and not shapes:
+            return False
+        if not self.use_masks:
+            return True
+        mask, offset = mask_cache.get_mask_and_offset(actor_of(sprite))
+        if tiles and self._collision_grid.collide_mask(mask, offset):
+            return True
+        return any(shape.collide_mask(mask, offset) for shape in shapes)
+
+    def sweep_map(self, sprite: pygame.sprite.Sprite, displacement: Vector) -> Optional[SweepHit]:
+        """Find the first collision of a sprite moving along a displacement (swept AABB).
+
+        Unlike `collide_map`, fast sprites can not jump over thin obstacles.
+        The shapes of the collision object layers are approximated by their bounding boxes.
+
+        Args:
+            sprite (pygame.sprite.Sprite): sprite/actor for detection
+            displacement (Vector): movement vector of the sprite in pixels
+
+        Returns:
+            Optional[SweepHit]: the first impact, the target is the tile (x, y) or the collision shape. None if nothing is hit
+        """
+        rect: Optional[pygame.Rect] = cast(SpriteDelegate, sprite).rect
+        if not rect:
+            return None
+        hit = self._collision_grid.sweep_rect(rect, displacement)
+        if self._collision_shapes:
+            shape_hit = first_hit(rect, displacement, self._collision_shape_bounds, self._collision_shapes)
+            if shape_hit and (hit is None or shape_hit.time < hit.time):
+                hit = shape_hit
+        return hit
+
+    def raycast(self, start: Point, end: Point) -> Optional[RayHit]:
+        """Find the first collision tile crossed by a segment.
+
+        The collision tiles are traversed along the segment (DDA). The shapes of the collision object layers can be checked with `query_segment`.
+
+        Args:
+            start (Point): ray start in the map coordinates
+            end (Point): ray end in the map coordinates
+
+        Returns:
+            Optional[RayHit]: the first hit, None if the segment crosses no collision tiles
+        """
+        return self._collision_grid.raycast(start, end)
+
+    def line_of_sight(self, start: Point, end: Point) -> bool:
+        """Check that a segment crosses no collision tiles and no collision shapes.
+
+        Args:
+            start (Point): segment start in the map coordinates
+            end (Point): segment end in the map coordinates
+
+        Returns:
+            bool: True if the end is visible from the start
+        """
+        if not self._collision_grid.line_of_sight(start, end):
+            return False
+        return not (self._collision_shapes and self._shape_bvh.collide_segment(start, end))
+
+    def raycast_many(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Batched `raycast` against the collision tiles.
+
+        Args:
+            starts (np.ndarray): ray starts in the map coordinates, array-like of shape (N, 2)
+            ends (np.ndarray): ray ends in the map coordinates, array-like of shape (N, 2)
+
+        Returns:
+            np.ndarray: fraction of the ray length before the first collision tile per ray, `inf` for the rays crossing no collision tiles
+        """
+        return self._collision_grid.raycast_many(starts, ends)
+
+    def line_of_sight_many(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Batched `line_of_sight`.
+
+        Args:
+            starts (np.ndarray): segment starts in the map coordinates, array-like of shape (N, 2)
+            ends (np.ndarray): segment ends in the map coordinates, array-like of shape (N, 2)
+
+        Returns:
+            np.ndarray: boolean array, True if the end is visible from the start
+        """
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+        ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+        visible = self._collision_grid.line_of_sight_many(starts, ends)
+        if self._collision_shapes:
+            for i in np.flatnonzero(visible):
+                if self._shape_bvh.collide_segment(tuple(starts[i]), tuple(ends[i])):
+                    visible[i] = False
+        return visible
+
+    def view(self) -> Any:
+        """Get the visible area of the map in the map coordinates"""
+        raise NotImplementedError
+
+    def transform(self, pos: Tuple[int, int]) -> Tuple[int, int]:
+        """Transform a screen position into the map coordinates"""
+        raise NotImplementedError
+
+    def draw(self, screen: Screen) -> None:
+        raise NotImplementedError
 
+    def update(self, dt: float) -> None:
+        raise NotImplementedError
+
+    def add_sprite(self, sprite: pygame.sprite.Sprite) -> None:
+        raise NotImplementedError
+
+    def remove_sprite(self, sprite: pygame.sprite.Sprite) -> None:
+        raise NotImplementedError
+
+    def set_center(self, point: Tuple[float, float]) -> None:
+        raise NotImplementedError
+
+    def get_center(self) -> Tuple[int, int]:
+        raise NotImplementedError
+
+    def get_view_center(self) -> Tuple[int, int]:
+        """Get the camera position in the map coordinates"""
+        raise NotImplementedError
+
+    @property
+    def zoom(self) -> float:
+        """Get the displayed zoom"""
+        raise NotImplementedError
+
+    def change_zoom(self, change: float) -> None:
+        raise NotImplementedError
+
+    def zoom_to(self, zoom: float, duration: float = 0.0) -> None:
+        raise NotImplementedError
+
+    def get_size(self) -> Tuple[int, int]:
+        """Get size of the screen the map is displayed on"""
+        raise NotImplementedError
 
-class ScrollMap(object):
+    def get_render_size(self) -> Tuple[int, int]:
+        """Get size of the surface the map is drawn into"""
+        raise NotImplementedError
+
+    def set_size(self, size: Tuple[int, int], render_size: Optional[Tuple[int, int]] = None) -> None:
+        """Set size of the screen the map is displayed on and size of the surface the map is drawn into"""
+        raise NotImplementedError
+
+
+class ScrollMap(BaseScrollMap):
     """Scroll Map object.
 
     The implementation is based on [pyscroll](https://github.com/bitcraft/pyscroll)
@@ -49,50 +501,97 @@ class ScrollMap(object):
     - render the map and the sprites on top
     """
 
-    def __init__(self, screen_size: Tuple[int, int], tmx: pytmx.TiledMap, collision_layers: List[str] = []) -> None:
+    def __init__(
+        self,
+        screen_size: Tuple[int, int],
+        tmx: pytmx.TiledMap,
+        collision_layers: List[str] = [],
+        collision_object_layers: List[str] = [],
+        use_masks: bool = False,
+        map_cache: Optional[MapCache] = None,
+    ) -> None:
         """Create scroll map object.
 
         Args:
             screen_size (Tuple[int, int]): screen resolution will be used to the map rendering
             tmx (pytmx.TiledMap): loaded `pytmx.TiledMap` object
             collision_layers (List[str], optional): List of `pytmx.TiledMap` layer names will be used for tiles collision detection. Defaults to [].
+            collision_object_layers (List[str], optional): List of `pytmx.TiledMap` object layer names will be used for collision detection. Defaults to [].
+            use_masks (bool, optional): confirm collisions with tiles and collision shapes using the pixel mask of the actor image. Defaults to False.
+            map_cache (Optional[MapCache], optional): on-disk cache of the collision data. The data is rebuilt on every start if None. Defaults to None.
         """
+        super().__init__(use_masks)
         self._tmx = tmx
 
         # create new data source for pyscroll
-        map_data = pyscroll.data.TiledMapData(self._tmx)
+        self._create_renderer(pyscroll.data.TiledMapData(self._tmx), screen_size)
+
+        self._load_collision_data(collision_layers, collision_object_layers, map_cache)
+
+    def _create_renderer(self, map_data: pyscroll.data.PyscrollDataAdapter, screen_size: Tuple[int, int]) -> None:
+        self._map_data = map_data
+        # The view is defined by the screen size, the renderers draw it into a surface of the render size
+        self._screen_size = screen_size
+        self._render_size = screen_size
+        # Zoom levels with the renderers prepared in advance
+        self.zoom_levels: List[float] = [0.25 * i for i in range(1, 9)]
+        # Duration of the animated zoom change in seconds, the change is instant if 0
+        self.zoom_duration = 0.0
+        self.zoom_cache = ZoomCache(self._build_map_layer, size=screen_size)
+        # Displayed zoom during the zoom animation, otherwise the renderer zoom is displayed
+        self._zoom = 1.0
+        # (start zoom, target zoom, elapsed time) of the zoom animation
+        self._zoom_animation: Optional[Tuple[float, float, float]] = None
+        self._zoom_buffer: Optional[pygame.Surface] = None
 
         # create new renderer (camera)
-        self.map_layer = pyscroll.BufferedRenderer(map_data, screen_size, clamp_camera=False, tall_sprites=1)
-        self.map_layer.zoom = 1
-
+        self.map_layer = self.zoom_cache.get(1.0)
+        self.zoom_cache.current = 1.0
         # pyscroll supports layered rendering.  our map has 3 'under' layers
         # layers begin with 0, so the layers are 0, 1, and 2.
         # since we want the sprite to be on top of layer 1, we set the default
         # layer for sprites as 2
-        self._map_group = PyscrollGroup(map_layer=self.map_layer, default_layer=2)
-
-        self._map_collision_obj: List[pygame.Rect] = []
-
-        self.add_collision_layers(collision_layers)
-
-    def add_collision_layers(self, collision_layers: List[str]) -> None:
-        """Load `pytmx.TiledMap` layer tiles for collision detection.
-
-        Some layer in the `pytmx.TiledMap` might be be used for collision detection.
-        For example: the layer includes "island tiles" might be used for collision detection with a "ship" actor.
-
-        Args:
-            collision_layers (List[str]): List of `pytmx.TiledMap` layer names will be used for tiles collision detection.
-        """
-        # setup level geometry with simple pygame rects, loaded from pytmx
-        self._map_collision_obj += extract_collision_objects_from_tile_layers(self._tmx, collision_layers)
+        self._map_group = CullingPyscrollGroup(map_layer=self.map_layer, default_layer=2, static_layer=self.static_layer)
+
+    def _build_map_layer(self, zoom: float, center: Optional[Tuple[float, float]] = None, size: Optional[Tuple[int, int]] = None) -> pyscroll.BufferedRenderer:
+        map_layer = pyscroll.BufferedRenderer(self._map_data, size or self._render_size, clamp_camera=False, tall_sprites=1)
+        renderer_zoom = zoom * self.render_scale
+        if renderer_zoom != 1.0:
+            # Unlike the constructor argument, the setter updates the aspect ratio compensation of the zoom buffer
+            map_layer.zoom = renderer_zoom
+        if center is not None:
+            map_layer.center(center)
+        return map_layer
+
+    @property
+    def render_scale(self) -> float:
+        """Get ratio of the render size to the screen size"""
+        return self._render_size[0] / self._screen_size[0]
+
+    def _layer_zoom(self) -> float:
+        """Get zoom of the renderer in use, without the render scale"""
+        current = self.zoom_cache.current
+        if current is not None and self.map_layer.zoom == current * self.render_scale:
+            return current
+        # The renderer zoom might be changed directly with `map_layer.zoom`
+        return float(self.map_layer.zoom / self.render_scale)
 
     def view(self) -> Any:
-        return self._map_group.view
+        view = self._map_group.view
+        zoom = self.zoom
+        layer_zoom = self._layer_zoom()
+        if zoom == layer_zoom:
+            return view
+        # The renderer shows a bigger area during the zoom animation
+        ratio = layer_zoom / zoom
+        displayed = pygame.Rect(0, 0, round(view.width * ratio), round(view.height * ratio))
+        displayed.center = view.center
+        return displayed
 
     def transform(self, pos: Tuple[int, int]) -> Tuple[int, int]:
-        return (pos[0] + self._map_group.view.left, pos[1] + self._map_group.view.top)
+        view = self.view()
+        width, height = self._screen_size
+        return (view.left + pos[0] * view.width // width, view.top + pos[1] * view.height // height)
 
     def draw(self, screen: Screen) -> None:
         """Draw method similar to the `pgz.scene.Scene.draw` method.
@@ -103,7 +602,22 @@ class ScrollMap(object):
             dt (float): time in milliseconds since the last update
         """
 
-        self._map_group.draw(screen.surface)
+        surface = screen.surface
+        zoom = self.zoom
+        layer_zoom = self._layer_zoom()
+        if zoom == layer_zoom:
+            self._map_group.draw(surface)
+            return
+
+        # Zoom animation: the renderer of the smaller zoom is drawn off-screen and the displayed part is scaled up
+        size = surface.get_size()
+        if self._zoom_buffer is None or self._zoom_buffer.get_size() != size:
+            self._zoom_buffer = pygame.Surface(size).convert() if pygame.display.get_surface() else pygame.Surface(size)
+        self._map_group.draw(self._zoom_buffer)
+        ratio = layer_zoom / zoom
+        area = pygame.Rect(0, 0, round(size[0] * ratio), round(size[1] * ratio))
+        area.center = (size[0] // 2, size[1] // 2)
+        pygame.transform.scale(self._zoom_buffer.subsurface(area), size, surface)
 
     def update(self, dt: float) -> None:
         """Update method similar to the `pgz.scene.Scene.update` method.
@@ -114,6 +628,7 @@ class ScrollMap(object):
             dt (float): time in milliseconds since the last update
         """
         self._map_group.update(dt)
+        self._update_zoom(dt)
 
     def add_sprite(self, sprite: pygame.sprite.Sprite) -> None:
         """Add actor/sprite to the map
@@ -131,7 +646,7 @@ class ScrollMap(object):
         """
         sprite.remove(self._map_group)
 
-    def set_center(self, point: Tuple[int, int]) -> None:
+    def set_center(self, point: Tuple[float, float]) -> None:
         self._map_group.center(point)
 
     def get_center(self) -> Tuple[int, int]:
@@ -139,23 +654,228 @@ class ScrollMap(object):
             raise Exception("Map was not configured properly")
         return self.map_layer.map_rect.center  # type: ignore
 
+    @property
+    def zoom(self) -> float:
+        """Get the displayed zoom"""
+        if self._zoom_animation is None:
+            return self._layer_zoom()
+        return self._zoom
+
     def change_zoom(self, change: float) -> None:
-        value = self.map_layer.zoom + change
-        if value > 0:
-            self.map_layer.zoom = value
+        """Change the zoom by a step, animated if `zoom_duration` is set.
+
+        Args:
+            change (float): zoom change
+        """
+        target = self._zoom_animation[1] if self._zoom_animation else self.zoom
+        self.zoom_to(target + change, self.zoom_duration)
 
-    def set_size(self, size: Tuple[int, int]) -> None:
-        self.map_layer.set_size(size)
+    def zoom_to(self, zoom: float, duration: float = 0.0) -> None:
+        """Change the zoom.
 
-    def collide_map(self, sprite: pygame.sprite.Sprite) -> bool:
-        """Detect a collision with tiles on the map
+        The renderer of the new zoom is taken from the zoom cache, so the tiles are not redrawn if the level was prepared.
 
         Args:
-            sprite (pygame.sprite.Sprite): sprite/actor for detection
+            zoom (float): new zoom, should be positive
+            duration (float, optional): duration of the animation in seconds, the change is instant if 0. Defaults to 0.0.
+        """
+        if zoom <= 0:
+            return
+        if duration <= 0:
+            self._zoom_animation = None
+            self._switch_map_layer(zoom)
+            self._prepare_zoom_levels()
+            return
+
+        self._zoom = self.zoom
+        self._zoom_animation = (self._zoom, zoom, 0.0)
+        self.zoom_duration = duration
+        # The animation starts once the target renderer is ready
+        self.zoom_cache.prepare(zoom, self.get_view_center())
+
+    def _switch_map_layer(self, zoom: float) -> None:
+        if zoom == self._layer_zoom():
+            return
+        self._use_map_layer(zoom)
+
+    def _use_map_layer(self, zoom: float) -> None:
+        """Take the renderer of the zoom level and the current render size from the zoom cache"""
+        center = self.get_view_center()
+        map_layer = self.zoom_cache.get(zoom, center)
+        map_layer.center(center)
+        self.map_layer = map_layer
+        self.zoom_cache.current = zoom
+        self._map_group.set_map_layer(map_layer)
+
+    def _update_zoom(self, dt: float) -> None:
+        self.zoom_cache.poll()
+        if self._zoom_animation is not None:
+            start, target, elapsed = self._zoom_animation
+            if not self.zoom_cache.ready(target) and target != self._layer_zoom():
+                return
+            # The renderer of the smaller zoom shows the whole animated area
+            self._switch_map_layer(min(start, target))
+            elapsed += dt
+            if elapsed >= self.zoom_duration:
+                self.zoom_to(target)
+                return
+            self._zoom = start + (target - start) * elapsed / self.zoom_duration
+            self._zoom_animation = (start, target, elapsed)
+            return
+
+        self._sync_zoom_cache()
+        # Build the next levels evicted from the cache or not built yet
+        self._prepare_zoom_levels()
+
+    def _sync_zoom_cache(self) -> None:
+        current = self.zoom_cache.current
+        layer_zoom = self._layer_zoom()
+        if current is not None and layer_zoom != current:
+            # The zoom was changed directly on the renderer, so the renderer is cached for the new level
+            self.zoom_cache.remove(current)
+            self.zoom_cache.current = layer_zoom
+            self.zoom_cache.add(layer_zoom, self.map_layer)
+
+    def _prepare_zoom_levels(self) -> None:
+        """Queue building of the renderers of the zoom levels next to the current zoom, they are built by the next updates.
+
+        The cached renderers are not re-centered while the camera moves, they are re-centered once the zoom is switched to them.
+        """
+        center = self.get_view_center()
+        zoom = self.zoom
+        lower = [level for level in self.zoom_levels if level < zoom]
+        upper = [level for level in self.zoom_levels if level > zoom]
+        for level in lower[-1:] + upper[:1]:
+            if level not in self.zoom_cache:
+                self.zoom_cache.prepare(level, center)
 
-        Returns:
-            bool: True is the collision with the colision layers was detected
+    def get_view_center(self) -> Tuple[int, int]:
+        """Get the camera position in the map coordinates"""
+        return self.map_layer.view_rect.center  # type: ignore
+
+    def get_size(self) -> Tuple[int, int]:
+        """Get size of the screen the map is displayed on"""
+        return self._screen_size
+
+    def get_render_size(self) -> Tuple[int, int]:
+        """Get size of the surface the map is drawn into"""
+        return self._render_size
+
+    def set_size(self, size: Tuple[int, int], render_size: Optional[Tuple[int, int]] = None) -> None:
+        """Set size of the screen the map is displayed on and size of the surface the map is drawn into.
+
+        The screen size defines the visible area of the map and the `transform` coordinates. A smaller render size
+        (like the application render screen) draws the same area with the renderers zoomed out by the render scale.
+        The renderers of the old render size are kept in the zoom cache, so changing the render size back swaps the renderers.
+
+        Args:
+            size (Tuple[int, int]): screen size
+            render_size (Optional[Tuple[int, int]], optional): render size, the same as the screen size if None. Defaults to None.
         """
-        if not sprite.rect:
-            return False
-        return bool(sprite.rect.collidelist(self._map_collision_obj) > -1)
+        render_size = render_size or size
+        if size == self._screen_size and render_size == self._render_size:
+            return
+        self._sync_zoom_cache()
+        zoom = self._layer_zoom()
+        if size != self._screen_size:
+            # The cached renderers are zoomed for the render scale of the old screen size
+            self.zoom_cache.clear()
+        self._screen_size = size
+        self._render_size = render_size
+        self.zoom_cache.size = render_size
+        self._use_map_layer(zoom)
+        if self._zoom_animation is not None:
+            # The animation waits for the target renderer of the new size
+            self.zoom_cache.prepare(self._zoom_animation[1], self.get_view_center())
+
+
+class HeadlessScrollMap(BaseScrollMap):
+    """Scroll map without rendering for authoritative game servers.
+
+    No renderer is created and no tile images are loaded: only the map dimensions, the collision layers and the collision object layers are kept.
+    The sprites management, updating and collision detection API is the same as the one of `ScrollMap`.
+
+    With a `MapCache` and a TMX file path the map file is not even parsed once the map is cached:
+    ```
+    map = pgz.HeadlessScrollMap("resources/maps/default.tmx", ["Islands"], map_cache=pgz.MapCache())
+    ```
+    """
+
+    def __init__(
+        self,
+        tmx: Union[str, pytmx.TiledMap],
+        collision_layers: List[str] = [],
+        collision_object_layers: List[str] = [],
+        use_masks: bool = False,
+        map_cache: Optional[MapCache] = None,
+    ) -> None:
+        """Create headless scroll map object.
+
+        Args:
+            tmx (Union[str, pytmx.TiledMap]): TMX file path or a loaded `pytmx.TiledMap` object, for example from `pgz.headless_maps`
+            collision_layers (List[str], optional): List of `pytmx.TiledMap` layer names will be used for tiles collision detection. Defaults to [].
+            collision_object_layers (List[str], optional): List of `pytmx.TiledMap` object layer names will be used for collision detection. Defaults to [].
+            use_masks (bool, optional): confirm collisions with tiles and collision shapes using the pixel mask of the actor image. Defaults to False.
+            map_cache (Optional[MapCache], optional): on-disk cache of the collision data. Defaults to None.
+        """
+        super().__init__(use_masks)
+        if isinstance(tmx, str):
+            self._path: Optional[str] = tmx
+        else:
+            self._path = getattr(tmx, "filename", None)
+            self._tmx = tmx
+        self._sprites_group: pygame.sprite.Group = pygame.sprite.Group()
+        self._load_collision_data(collision_layers, collision_object_layers, map_cache)
+
+    def _tmx_path(self) -> Optional[str]:
+        return self._path
+
+    # There is no camera: the view always covers the whole map and the zoom is fixed
+
+    def view(self) -> Any:
+        width = self._collision_grid.width * self._collision_grid.tile_width
+        height = self._collision_grid.height * self._collision_grid.tile_height
+        return pygame.Rect(0, 0, width, height)
+
+    def transform(self, pos: Tuple[int, int]) -> Tuple[int, int]:
+        return pos
+
+    def draw(self, screen: Screen) -> None:
+        pass
+
+    def update(self, dt: float) -> None:
+        self._sprites_group.update(dt)
+
+    def add_sprite(self, sprite: pygame.sprite.Sprite) -> None:
+        self._sprites_group.add(sprite)
+
+    def remove_sprite(self, sprite: pygame.sprite.Sprite) -> None:
+        sprite.remove(self._sprites_group)
+
+    def set_center(self, point: Tuple[float, float]) -> None:
+        pass
+
+    def get_center(self) -> Tuple[int, int]:
+        return self.view().center  # type: ignore
+
+    def get_view_center(self) -> Tuple[int, int]:
+        return self.view().center  # type: ignore
+
+    @property
+    def zoom(self) -> float:
+        return 1.0
+
+    def change_zoom(self, change: float) -> None:
+        pass
+
+    def zoom_to(self, zoom: float, duration: float = 0.0) -> None:
+        pass
+
+    def get_size(self) -> Tuple[int, int]:
+        return self.view().size  # type: ignore
+
+    def get_render_size(self) -> Tuple[int, int]:
+        return self.get_size()
+
+    def set_size(self, size: Tuple[int, int], render_size: Optional[Tuple[int, int]] = None) -> None:
+        pass
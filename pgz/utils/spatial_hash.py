@@ -0,0 +1,208 @@
+import math
+from typing import Any, Dict, Generic, Hashable, Iterator, List, Optional, Set, Tuple, TypeVar
+
+CellRange = Tuple[int, int, int, int]
+
+T = TypeVar("T", bound=Hashable)
+
+
+class SpatialHash(Generic[T]):
+    """Uniform grid spatial index of rectangular items.
+
+    Every item is registered in all the grid cells covered by its rect.
+    A query visits only the cells covered by the query rect, so the query cost depends on the local density of the items,
+    but not on the total number of the items.
+
+    The index does not track items movement by itself: `update` should be called once the item rect is changed.
+    The item type can be given for the type checking, for example `SpatialHash[Actor]()`.
+    """
+
+    def __init__(self, cell_size: int = 128) -> None:
+        """Create a spatial hash.
+
+        Args:
+            cell_size (int, optional): size of the grid cell in pixels. Defaults to 128.
+        """
+        if cell_size <= 0:
+            raise ValueError("cell_size should be positive")
+        self._cell_size = cell_size
+        # Items per grid cell
+        self._cells: Dict[Tuple[int, int], Set[T]] = {}
+        # Cells range per item
+        self._items: Dict[T, CellRange] = {}
+        # Range of the occupied cells, recomputed lazily once a cell is freed
+        self._extent: Optional[CellRange] = None
+        self._extent_dirty = False
+
+    @property
+    def cell_size(self) -> int:
+        return self._cell_size
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item: object) -> bool:
+        return item in self._items
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._items)
+
+    def _cell_range(self, rect: Any) -> CellRange:
+        cell_size = self._cell_size
+        left, top, width, height = rect
+        # Right and bottom edges are exclusive, same as for `pygame.Rect.colliderect`
+        x0 = int(left // cell_size)
+        y0 = int(top // cell_size)
+        return (
+            x0,
+            y0,
+            max(math.ceil((left + width) / cell_size) - 1, x0),
+            max(math.ceil((top + height) / cell_size) - 1, y0),
+        )
+
+    def update(self, item: T, rect: Any) -> None:
+        """Insert an item or update its position.
+
+        Args:
+            item (T): item to insert/update
+            rect (Any): the item rect, anything unpackable into (left, top, width, height)
+        """
+        cell_range = self._cell_range(rect)
+        old_range = self._items.get(item)
+        if old_range == cell_range:
+            return
+        if old_range is not None:
+            self._remove_from_cells(item, old_range)
+
+        self._items[item] = cell_range
+        cells = self._cells
+        x0, y0, x1, y1 = cell_range
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                cell = cells.get((x, y))
+                if cell is None:
+                    cells[(x, y)] = {item}
+                else:
+                    cell.add(item)
+        if not self._extent_dirty:
+            extent = self._extent
+            self._extent = cell_range if extent is None else (min(extent[0], x0), min(extent[1], y0), max(extent[2], x1), max(extent[3], y1))
+
+    def remove(self, item: T) -> None:
+        """Remove an item from the index.
+
+        Args:
+            item (T): item to remove
+        """
+        cell_range = self._items.pop(item, None)
+        if cell_range is not None:
+            self._remove_from_cells(item, cell_range)
+
+    def _remove_from_cells(self, item: T, cell_range: CellRange) -> None:
+        cells = self._cells
+        x0, y0, x1, y1 = cell_range
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                cell = cells.get((x, y))
+                if cell is not None:
+                    cell.discard(item)
+                    if not cell:
+                        del cells[(x, y)]
+                        self._extent_dirty = True
+
+    def query(self, rect: Any) -> Set[T]:
+        """Get candidate items in the grid cells covered by the rect.
+
+        The candidates should be checked for the exact intersection by the caller.
+
+        Args:
+            rect (Any): query rect, anything unpackable into (left, top, width, height)
+
+        Returns:
+            Set[T]: candidate items
+        """
+        result: Set[T] = set()
+        cells = self._cells
+        x0, y0, x1, y1 = self._cell_range(rect)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                cell = cells.get((x, y))
+                if cell:
+                    result.update(cell)
+        return result
+
+    def cell_of(self, x: float, y: float) -> Tuple[int, int]:
+        """Get the grid cell containing a point"""
+        return (int(x // self._cell_size), int(y // self._cell_size))
+
+    def extent(self) -> Optional[CellRange]:
+        """Get range (x0, y0, x1, y1) of the occupied grid cells, None if the index is empty"""
+        if self._extent_dirty:
+            self._extent = None
+            if self._cells:
+                xs = [cell[0] for cell in self._cells]
+                ys = [cell[1] for cell in self._cells]
+                self._extent = (min(xs), min(ys), max(xs), max(ys))
+            self._extent_dirty = False
+        return self._extent
+
+    def ring_range(self, x: float, y: float) -> Optional[Tuple[int, int]]:
+        """Get the first and the last rings around a point, which contain occupied cells.
+
+        Args:
+            x (float): point x
+            y (float): point y
+
+        Returns:
+            Optional[Tuple[int, int]]: first and last ring indices, None if the index is empty
+        """
+        extent = self.extent()
+        if extent is None:
+            return None
+        cx, cy = self.cell_of(x, y)
+        x0, y0, x1, y1 = extent
+        first = max(x0 - cx, cx - x1, y0 - cy, cy - y1, 0)
+        last = max(abs(cx - x0), abs(cx - x1), abs(cy - y0), abs(cy - y1))
+        return (first, last)
+
+    def query_ring(self, x: float, y: float, ring: int) -> Set[T]:
+        """Get candidate items in the grid cells at the Chebyshev distance `ring` from the cell of a point.
+
+        Used for the nearest neighbours search expanding ring by ring.
+        Every item, which rect center is closer to the point than `ring * cell_size`, is found in the rings 0..`ring`.
+
+        Args:
+            x (float): point x
+            y (float): point y
+            ring (int): ring index, 0 is the cell of the point itself
+
+        Returns:
+            Set[T]: candidate items
+        """
+        result: Set[T] = set()
+        extent = self.extent()
+        if extent is None:
+            return result
+        # Only the ring part overlapping the occupied cells is visited
+        ex0, ey0, ex1, ey1 = extent
+        cx, cy = self.cell_of(x, y)
+        cells: List[Tuple[int, int]] = []
+        for row in {cy - ring, cy + ring}:
+            if ey0 <= row <= ey1:
+                cells += [(column, row) for column in range(max(cx - ring, ex0), min(cx + ring, ex1) + 1)]
+        for column in {cx - ring, cx + ring}:
+            if ex0 <= column <= ex1:
+                cells += [(column, row) for row in range(max(cy - ring + 1, ey0), min(cy + ring - 1, ey1) + 1)]
+
+        for cell in cells:
+            items = self._cells.get(cell)
+            if items:
+                result.update(items)
+        return result
+
+    def clear(self) -> None:
+        """Remove all the items"""
+        self._cells.clear()
+        self._items.clear()
+        self._extent = None
+        self._extent_dirty = False
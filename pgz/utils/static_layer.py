@@ -0,0 +1,174 @@
+import math
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+import pygame
+
+ChunkKey = Tuple[int, int]
+
+
+class StaticLayer(object):
+    """Actors that never move, pre-rendered into chunk surfaces.
+
+    The layer plane is split into square chunks. A chunk surface is rendered once from the images of the actors overlapping it,
+    and is re-rendered only after one of these actors is added, removed or changed. So a frame costs a single blit per visible chunk,
+    no matter how many static actors are there.
+
+    The actors are pre-rendered from their images, a custom `draw` method of the actor is not used.
+    Overlapping semi-transparent edges are blended in advance, so they might differ slightly from the direct drawing.
+    """
+
+    def __init__(self, chunk_size: int = 256) -> None:
+        """Create a static layer.
+
+        Args:
+            chunk_size (int, optional): size of the chunk in pixels. Defaults to 256.
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size should be positive")
+        self._chunk_size = chunk_size
+        # Actors and their rects at the moment of the rendering
+        self._rects: Dict[Any, pygame.Rect] = {}
+        # Drawing order of the actors
+        self._order: Dict[Any, int] = {}
+        self._next_order = 0
+        # Actors overlapping the chunk
+        self._chunk_actors: Dict[ChunkKey, Set[Any]] = {}
+        # Rendered chunks
+        self._surfaces: Dict[ChunkKey, pygame.Surface] = {}
+        # Number of the chunk renderings, for the profiling
+        self.renders = 0
+
+    @property
+    def chunk_size(self) -> int:
+        return self._chunk_size
+
+    def __len__(self) -> int:
+        return len(self._rects)
+
+    def __contains__(self, actor: Any) -> bool:
+        return actor in self._rects
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._rects)
+
+    def chunk_rect(self, key: ChunkKey) -> pygame.Rect:
+        """Get area of a chunk"""
+        size = self._chunk_size
+        return pygame.Rect(key[0] * size, key[1] * size, size, size)
+
+    def _chunk_keys(self, rect: pygame.Rect) -> List[ChunkKey]:
+        size = self._chunk_size
+        x0, y0 = rect.left // size, rect.top // size
+        x1 = max(math.ceil(rect.right / size) - 1, x0)
+        y1 = max(math.ceil(rect.bottom / size) - 1, y0)
+        return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+    def _invalidate(self, rect: pygame.Rect) -> None:
+        for key in self._chunk_keys(rect):
+            self._surfaces.pop(key, None)
+
+    def add(self, actor: Any) -> pygame.Rect:
+        """Add an actor to the layer.
+
+        Args:
+            actor (Any): actor to add
+
+        Returns:
+            pygame.Rect: area of the layer changed by the addition
+        """
+        self._order[actor] = self._next_order
+        self._next_order += 1
+        return self.update(actor)
+
+    def update(self, actor: Any) -> pygame.Rect:
+        """Re-render the actor after its position, angle or image change.
+
+        Args:
+            actor (Any): changed actor
+
+        Returns:
+            pygame.Rect: area of the layer changed by the actor, covers both the old and the new actor rects
+        """
+        # Inflated a bit to cover the rounding of the float positions
+        new_rect = pygame.Rect(actor.rect).inflate(2, 2)
+        old_rect = self._rects.get(actor)
+        if old_rect is not None:
+            self._remove_from_chunks(actor, old_rect)
+        self._rects[actor] = new_rect
+        for key in self._chunk_keys(new_rect):
+            self._chunk_actors.setdefault(key, set()).add(actor)
+        self._invalidate(new_rect)
+        return new_rect.union(old_rect) if old_rect is not None else new_rect
+
+    def remove(self, actor: Any) -> pygame.Rect:
+        """Remove an actor from the layer.
+
+        Args:
+            actor (Any): actor to remove
+
+        Returns:
+            pygame.Rect: area of the layer changed by the removal
+        """
+        rect = self._rects.pop(actor)
+        self._order.pop(actor)
+        self._remove_from_chunks(actor, rect)
+        return rect
+
+    def _remove_from_chunks(self, actor: Any, rect: pygame.Rect) -> None:
+        for key in self._chunk_keys(rect):
+            actors = self._chunk_actors.get(key)
+            if actors is None:
+                continue
+            actors.discard(actor)
+            if not actors:
+                del self._chunk_actors[key]
+        self._invalidate(rect)
+
+    def _render(self, key: ChunkKey) -> pygame.Surface:
+        chunk_rect = self.chunk_rect(key)
+        surface = pygame.Surface(chunk_rect.size, pygame.SRCALPHA)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        surface.fill((0, 0, 0, 0))
+        order = self._order
+        actors = sorted(self._chunk_actors[key], key=lambda actor: order[actor])
+        left, top = chunk_rect.topleft
+        # The positions are truncated first, same as the direct blit to the screen does
+        surface.blits([(actor.sprite, (int(actor.left) - left, int(actor.top) - top)) for actor in actors], doreturn=False)
+        self.renders += 1
+        return surface
+
+    def chunks(self, rect: pygame.Rect) -> List[Tuple[pygame.Surface, pygame.Rect]]:
+        """Get rendered chunks overlapping an area. Missing chunk surfaces are rendered on the way.
+
+        Args:
+            rect (pygame.Rect): area of the layer
+
+        Returns:
+            List[Tuple[pygame.Surface, pygame.Rect]]: chunk surfaces and their areas
+        """
+        result = []
+        for key in self._chunk_keys(rect):
+            if key not in self._chunk_actors:
+                continue
+            surface = self._surfaces.get(key)
+            if surface is None:
+                surface = self._surfaces[key] = self._render(key)
+            result.append((surface, self.chunk_rect(key)))
+        return result
+
+    def draw(self, surface: pygame.Surface, rect: pygame.Rect, offset: Tuple[int, int] = (0, 0)) -> int:
+        """Draw chunks overlapping an area.
+
+        Args:
+            surface (pygame.Surface): surface to draw to
+            rect (pygame.Rect): area of the layer to draw
+            offset (Tuple[int, int], optional): position of the layer origin on the surface. Defaults to (0, 0).
+
+        Returns:
+            int: number of the drawn chunks
+        """
+        ox, oy = offset
+        chunks = self.chunks(rect)
+        surface.blits([(chunk, chunk_rect.move(ox, oy)) for chunk, chunk_rect in chunks], doreturn=False)
+        return len(chunks)
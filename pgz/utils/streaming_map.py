@@ -0,0 +1,526 @@
+"""
+Streaming of very large tiled maps.
+
+The map is split into square chunks of tiles. Only the chunks near the camera are kept in memory: the chunks around the view are
+loaded on a background thread before they are scrolled in, and the distant chunks are evicted once the memory budget is exceeded.
+The tile images are kept in memory while the loaded chunks use them.
+
+The tile layers and the tile image sources are read from the `pgz.MapCache` entry of the map (memory-mapped), so the TMX file
+is parsed only once, when the cache entry is built. Tileset images are loaded on the first use of their tiles.
+
+Examples:
+```
+map = pgz.StreamingScrollMap(app.resolution, "resources/maps/world.tmx", ["Islands"], map_cache=pgz.MapCache())
+scene = pgz.MapScene(map)
+```
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, cast
+
+import numpy as np
+import pygame
+import pyscroll.data
+import pytmx
+import pytmx.util_pygame
+
+from .bvh import Point
+from .map_cache import CachedMapData, MapCache
+from .scroll_map import BaseScrollMap, ScrollMap
+
+ChunkKey = Tuple[int, int]
+
+
+class ChunkStore(object):
+    """LRU of chunks loaded on a background thread under a memory budget.
+
+    The chunks are loaded by the `load` callback in the worker thread and are added to the LRU in `get` and `poll`.
+    The `finish` callback is called with the loaded chunks in the thread calling `get` and `poll`, usually the main thread,
+    so it can do the work which is not thread safe, for example the pixel format conversion of the images.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[ChunkKey], Any],
+        size_of: Callable[[Any], int],
+        max_bytes: int,
+        max_workers: int = 1,
+        release: Optional[Callable[[Any], None]] = None,
+        finish: Optional[Callable[[Any], None]] = None,
+    ) -> None:
+        """Create a chunk store.
+
+        Args:
+            load (Callable[[ChunkKey], Any]): chunk loading callback
+            size_of (Callable[[Any], int]): chunk size in bytes
+            max_bytes (int): memory budget of the loaded chunks
+            max_workers (int, optional): number of the loading threads. Defaults to 1.
+            release (Optional[Callable[[Any], None]], optional): callback called with the chunks dropped from the store. Defaults to None.
+            finish (Optional[Callable[[Any], None]], optional): callback called with the loaded chunks before they are added to the store. Defaults to None.
+        """
+        self._load = load
+        self._size_of = size_of
+        self._release = release
+        self._finish = finish
+        self.max_bytes = max_bytes
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._chunks: "OrderedDict[ChunkKey, Any]" = OrderedDict()
+        self._sizes: Dict[ChunkKey, int] = {}
+        self._pending: Dict[ChunkKey, Future] = {}
+        # Chunks which should not be evicted
+        self._wanted: Set[ChunkKey] = set()
+        self._bytes = 0
+        self.loads = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def __contains__(self, key: ChunkKey) -> bool:
+        return key in self._chunks
+
+    @property
+    def bytes(self) -> int:
+        """Get memory used by the loaded chunks"""
+        return self._bytes
+
+    def get(self, key: ChunkKey, wait: bool = True) -> Optional[Any]:
+        """Get a chunk.
+
+        Args:
+            key (ChunkKey): chunk key
+            wait (bool, optional): load the missing chunk synchronously. Otherwise it is scheduled for the background loading. Defaults to True.
+
+        Returns:
+            Optional[Any]: the chunk, None if it is not loaded and `wait` is False
+        """
+        with self._lock:
+            chunk = self._chunks.get(key)
+            if chunk is not None:
+                self._chunks.move_to_end(key)
+                return chunk
+
+            future = self._pending.get(key)
+            if future is None and not wait:
+                self._pending[key] = self._executor.submit(self._load, key)
+                return None
+            if future is not None and not wait and not future.done():
+                return None
+
+        # Loaded outside of the lock, so the other threads are not blocked meanwhile
+        chunk = self._load(key) if future is None else future.result()
+        with self._lock:
+            if future is not None and self._pending.get(key) is future:
+                del self._pending[key]
+            chunk = self._insert(key, chunk)
+            self._evict()
+            return chunk
+
+    def prefetch(self, keys: Iterable[ChunkKey]) -> None:
+        """Schedule the background loading of the chunks.
+
+        Args:
+            keys (Iterable[ChunkKey]): keys of the needed chunks
+        """
+        with self._lock:
+            for key in keys:
+                if key not in self._chunks and key not in self._pending:
+                    self._pending[key] = self._executor.submit(self._load, key)
+
+    def request(self, keys: Iterable[ChunkKey]) -> None:
+        """Schedule the background loading of the chunks and protect them from the eviction until the next request.
+
+        Args:
+            keys (Iterable[ChunkKey]): keys of the needed chunks
+        """
+        with self._lock:
+            self._wanted = set(keys)
+            self.prefetch(self._wanted)
+
+    def poll(self) -> List[ChunkKey]:
+        """Collect the chunks loaded in the background and evict the chunks over the budget.
+
+        Returns:
+            List[ChunkKey]: keys of the collected chunks
+        """
+        with self._lock:
+            loaded = [key for key, future in self._pending.items() if future.done()]
+            for key in loaded:
+                self._insert(key, self._pending.pop(key).result())
+            self._evict()
+            return loaded
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._release is not None:
+                for chunk in self._chunks.values():
+                    self._release(chunk)
+            self._chunks.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def _insert(self, key: ChunkKey, chunk: Any) -> Any:
+        existing = self._chunks.get(key)
+        if existing is not None:
+            # The chunk was loaded by several threads, the first loaded copy is kept
+            if existing is not chunk and self._release is not None:
+                self._release(chunk)
+            self._chunks.move_to_end(key)
+            return existing
+
+        if self._finish is not None:
+            self._finish(chunk)
+        size = self._size_of(chunk)
+        self._chunks[key] = chunk
+        self._sizes[key] = size
+        self._bytes += size
+        self.loads += 1
+        return chunk
+
+    def _evict(self) -> None:
+        if self._bytes <= self.max_bytes:
+            return
+        for key in list(self._chunks):
+            if self._bytes <= self.max_bytes:
+                break
+            if key in self._wanted:
+                continue
+            chunk = self._chunks.pop(key)
+            self._bytes -= self._sizes.pop(key)
+            self.evictions += 1
+            if self._release is not None:
+                self._release(chunk)
+
+
+class MapChunk(object):
+    """Tile layers of a map chunk"""
+
+    def __init__(self, origin: Tuple[int, int], gids: np.ndarray, images: Dict[int, pygame.Surface]) -> None:
+        # Position of the chunk top-left tile
+        self.origin = origin
+        # Gids indexed as [layer, y, x]
+        self.gids = gids
+        # Tile images by the gid
+        self.images = images
+
+
+class StreamingMapData(pyscroll.data.PyscrollDataAdapter):
+    """pyscroll data source reading the map chunks from the map cache.
+
+    The renderers report their tile views with `prepare_tiles`, so the chunks around the views are loaded in advance.
+    Only the chunks around the camera view reported with `stream_view` are protected from the eviction, the renderers prepared
+    for the other zoom levels do not take the protection over.
+    A chunk needed for drawing, but not loaded yet, is loaded synchronously. Animated tiles are not supported.
+    """
+
+    def __init__(
+        self,
+        data: CachedMapData,
+        tmx_path: str,
+        chunk_size: int = 32,
+        max_bytes: int = 64 * 1024 * 1024,
+        prefetch: int = 1,
+    ) -> None:
+        """Create a streaming data source.
+
+        Args:
+            data (CachedMapData): map data loaded from the map cache
+            tmx_path (str): TMX file path, the tileset images are resolved relative to it
+            chunk_size (int, optional): chunk size in tiles. Defaults to 32.
+            max_bytes (int, optional): memory budget of the tile layers of the loaded chunks. Defaults to 64MB.
+            prefetch (int, optional): number of the chunks around the view loaded in advance. Defaults to 1.
+        """
+        super().__init__()
+        self._data = data
+        self._layers = data.layers
+        self._directory = os.path.dirname(os.path.abspath(tmx_path))
+        self.chunk_size = chunk_size
+        self.prefetch = prefetch
+        # Map layer number -> index in the layers array
+        self._layer_rows = {layer: row for row, layer in enumerate(data.layer_indices)}
+        self._tiles = {tile["gid"]: tile for tile in data.tiles}
+        # Tileset images and tile images shared by the chunks, the loading threads access them under the lock.
+        # A tile image is kept while the loaded chunks use it, and a tileset image is kept while its tile images are kept
+        self._lock = threading.Lock()
+        self._sources: Dict[str, pygame.Surface] = {}
+        self._source_refs: Dict[str, int] = {}
+        self._tile_images: Dict[int, pygame.Surface] = {}
+        self._image_refs: Dict[int, int] = {}
+        # Tile images converted to the display format. The loading threads cut the images only, the conversion is not thread safe
+        self._converted: Set[int] = set()
+        self._extra_keys: Set[ChunkKey] = set()
+        self.chunks = ChunkStore(self._load_chunk, self._chunk_size_of, max_bytes, release=self._release_chunk, finish=self._finish_chunk)
+        self.reload_animations()
+
+    @property
+    def tile_size(self) -> Tuple[int, int]:
+        return self._data.tile_width, self._data.tile_height
+
+    @property
+    def map_size(self) -> Tuple[int, int]:
+        return self._data.width, self._data.height
+
+    @property
+    def visible_tile_layers(self) -> List[int]:
+        return self._data.visible_tile_layers
+
+    def reload_data(self) -> None:
+        self.chunks.clear()
+
+    def get_animations(self) -> Iterator[Any]:
+        return iter(())
+
+    def convert_surfaces(self, parent: pygame.Surface, alpha: bool = False) -> None:
+        # The tile images are converted once their chunks are collected from the loading threads
+        pass
+
+    def _source_image(self, source: str) -> pygame.Surface:
+        with self._lock:
+            image = self._sources.get(source)
+            if image is None:
+                image = self._sources[source] = pygame.image.load(os.path.join(self._directory, source))
+            return image
+
+    def _tile_image(self, gid: int) -> Optional[pygame.Surface]:
+        # Called by the renderers in the main thread
+        with self._lock:
+            image = self._tile_images.get(gid)
+            if gid in self._converted:
+                return image
+        tile = self._tiles.get(gid)
+        if tile is None:
+            return None
+        return self._convert_tile_image(tile, image or self._make_tile_image(tile))
+
+    def _make_tile_image(self, tile: Dict[str, Any]) -> pygame.Surface:
+        # Same as `pytmx.util_pygame.pygame_image_loader`, but the conversion is left for the main thread
+        source = self._source_image(tile["source"])
+        image = source.subsurface(tile["rect"]) if tile["rect"] else source.copy()
+        if tile["flags"]:
+            image = pytmx.util_pygame.handle_transformation(image, pytmx.TileFlags(*tile["flags"]))
+        return image
+
+    @staticmethod
+    def _convert_tile_image(tile: Dict[str, Any], image: pygame.Surface) -> pygame.Surface:
+        if pygame.display.get_surface() is None:
+            return image
+        colorkey = pygame.Color("#{0}".format(tile["trans"])) if tile["trans"] else None
+        converted: pygame.Surface = pytmx.util_pygame.smart_convert(image, colorkey, True)
+        return converted
+
+    def _finish_chunk(self, chunk: MapChunk) -> None:
+        """Convert the tile images of a chunk loaded by a loading thread"""
+        with self._lock:
+            raw = {gid: image for gid, image in chunk.images.items() if gid not in self._converted}
+        # Converted outside of the lock, the loading threads might wait for it meanwhile
+        converted = {gid: self._convert_tile_image(self._tiles[gid], image) for gid, image in raw.items()}
+        with self._lock:
+            for gid, image in converted.items():
+                if gid not in self._converted:
+                    self._tile_images[gid] = image
+                    self._converted.add(gid)
+            # The images converted for the other chunks replace the unconverted ones taken by the loading thread
+            for gid in chunk.images:
+                chunk.images[gid] = self._tile_images[gid]
+
+    def _acquire_tile_image(self, gid: int) -> Optional[pygame.Surface]:
+        """Get a tile image for a chunk, the image is kept until all the chunks using it are released"""
+        with self._lock:
+            image = self._tile_images.get(gid)
+            if image is not None:
+                self._image_refs[gid] += 1
+                return image
+        tile = self._tiles.get(gid)
+        if tile is None:
+            return None
+        image = self._make_tile_image(tile)
+        with self._lock:
+            if gid in self._tile_images:
+                # Loaded by another thread meanwhile
+                image = self._tile_images[gid]
+                self._image_refs[gid] += 1
+            else:
+                self._tile_images[gid] = image
+                self._image_refs[gid] = 1
+                source = tile["source"]
+                self._source_refs[source] = self._source_refs.get(source, 0) + 1
+            return image
+
+    def _release_chunk(self, chunk: MapChunk) -> None:
+        with self._lock:
+            for gid in chunk.images:
+                self._image_refs[gid] -= 1
+                if self._image_refs[gid]:
+                    continue
+                del self._image_refs[gid]
+                del self._tile_images[gid]
+                self._converted.discard(gid)
+                source = self._tiles[gid]["source"]
+                self._source_refs[source] -= 1
+                if not self._source_refs[source]:
+                    del self._source_refs[source]
+                    self._sources.pop(source, None)
+
+    def _load_chunk(self, key: ChunkKey) -> MapChunk:
+        size = self.chunk_size
+        x0, y0 = key[0] * size, key[1] * size
+        # Copy, so the chunk is read from the disk now and not on the drawing
+        gids = np.array(self._layers[:, y0 : y0 + size, x0 : x0 + size])
+        images = {int(gid): self._acquire_tile_image(int(gid)) for gid in np.unique(gids) if gid}
+        return MapChunk((x0, y0), gids, {gid: image for gid, image in images.items() if image is not None})
+
+    @staticmethod
+    def _chunk_size_of(chunk: MapChunk) -> int:
+        # Tile images are shared by the chunks and are not counted
+        return int(chunk.gids.nbytes)
+
+    def _chunk_keys(self, left: int, top: int, right: int, bottom: int) -> List[ChunkKey]:
+        """Get keys of the chunks covering the tiles range, the right and bottom tiles are included"""
+        size = self.chunk_size
+        width, height = self.map_size
+        x0, y0 = max(left, 0) // size, max(top, 0) // size
+        x1, y1 = min(right, width - 1) // size, min(bottom, height - 1) // size
+        return [(x, y) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1)]
+
+    def stream_around(self, points: Iterable[Point], radius: int) -> None:
+        """Keep the chunks around the points loaded, in addition to the chunks around the view.
+
+        Args:
+            points (Iterable[Point]): points in the map coordinates, for example positions of the players
+            radius (int): radius in pixels
+        """
+        tile_width, tile_height = self.tile_size
+        keys: Set[ChunkKey] = set()
+        for x, y in points:
+            keys.update(self._chunk_keys(int(x - radius) // tile_width, int(y - radius) // tile_height, int(x + radius) // tile_width, int(y + radius) // tile_height))
+        self._extra_keys = keys
+
+    def _keys_around(self, tiles: pygame.Rect) -> List[ChunkKey]:
+        margin = self.prefetch * self.chunk_size
+        return self._chunk_keys(tiles.left - margin, tiles.top - margin, tiles.right + margin, tiles.bottom + margin)
+
+    def prepare_tiles(self, tiles: pygame.Rect) -> None:
+        # Called by every renderer of the map, including the ones prepared in the background, so the chunks are only loaded
+        self.chunks.prefetch(self._keys_around(tiles))
+        self.chunks.poll()
+
+    def stream_view(self, view: pygame.Rect) -> None:
+        """Request the chunks around the camera view and collect the loaded chunks.
+
+        Args:
+            view (pygame.Rect): visible area in the map coordinates
+        """
+        tile_width, tile_height = self.tile_size
+        left, top = view.left // tile_width, view.top // tile_height
+        tiles = pygame.Rect(left, top, view.right // tile_width - left + 1, view.bottom // tile_height - top + 1)
+        self.chunks.request(self._extra_keys.union(self._keys_around(tiles)))
+        self.chunks.poll()
+
+    def _chunk(self, key: ChunkKey) -> MapChunk:
+        # The synchronous `get` always returns the chunk
+        return cast(MapChunk, self.chunks.get(key))
+
+    def _get_tile_image(self, x: int, y: int, layer: int) -> Optional[pygame.Surface]:
+        width, height = self.map_size
+        if not (0 <= x < width and 0 <= y < height):
+            return None
+        size = self.chunk_size
+        chunk = self._chunk((x // size, y // size))
+        gid = int(chunk.gids[self._layer_rows[layer], y - chunk.origin[1], x - chunk.origin[0]])
+        return chunk.images.get(gid) if gid else None
+
+    def _get_tile_image_by_id(self, id: int) -> Optional[pygame.Surface]:
+        return self._tile_image(id)
+
+    def get_tile_images_by_rect(self, rect: Any) -> Iterator[Tuple[int, int, int, pygame.Surface]]:
+        left, top, width, height = rect
+        # Same as `pyscroll.rect_to_bb`: the right and bottom tiles are included
+        right, bottom = left + width - 1, top + height - 1
+        for layer in self.visible_tile_layers:
+            row = self._layer_rows[layer]
+            for key in self._chunk_keys(left, top, right, bottom):
+                chunk = self._chunk(key)
+                x0, y0 = chunk.origin
+                gids = chunk.gids[row, max(top - y0, 0) : bottom - y0 + 1, max(left - x0, 0) : right - x0 + 1]
+                offset_x, offset_y = x0 + max(left - x0, 0), y0 + max(top - y0, 0)
+                images = chunk.images
+                for y, x in zip(*np.nonzero(gids)):
+                    image = images.get(int(gids[y, x]))
+                    if image is not None:
+                        yield int(x) + offset_x, int(y) + offset_y, layer, image
+
+
+class StreamingScrollMap(ScrollMap):
+    """Scroll map streaming the tile chunks around the camera.
+
+    Same as `ScrollMap`, but the tiles are read from the map cache by chunks (see `StreamingMapData`), so the memory usage
+    and the load time do not depend on the map size. The collision grid is memory-mapped from the map cache as well.
+    """
+
+    def __init__(
+        self,
+        screen_size: Tuple[int, int],
+        path: str,
+        collision_layers: List[str] = [],
+        collision_object_layers: List[str] = [],
+        use_masks: bool = False,
+        map_cache: Optional[MapCache] = None,
+        chunk_size: int = 32,
+        max_bytes: int = 64 * 1024 * 1024,
+        prefetch: int = 1,
+    ) -> None:
+        """Create streaming scroll map object.
+
+        The first start parses the TMX file (without the images) and builds the map cache entry, the next starts use the entry only.
+
+        Args:
+            screen_size (Tuple[int, int]): screen resolution will be used to the map rendering
+            path (str): TMX file path
+            collision_layers (List[str], optional): List of the layer names will be used for tiles collision detection. Defaults to [].
+            collision_object_layers (List[str], optional): List of the object layer names will be used for collision detection. Defaults to [].
+            use_masks (bool, optional): confirm collisions with tiles using the pixel mask of the actor image. Defaults to False.
+            map_cache (Optional[MapCache], optional): on-disk map cache. The cache next to the TMX file is used if None. Defaults to None.
+            chunk_size (int, optional): chunk size in tiles. Defaults to 32.
+            max_bytes (int, optional): memory budget of the tile layers of the loaded chunks. Defaults to 64MB.
+            prefetch (int, optional): number of the chunks around the view loaded in advance. Defaults to 1.
+        """
+        # The renderer is created from the map cache entry instead of a loaded `pytmx.TiledMap`
+        BaseScrollMap.__init__(self, use_masks)
+        self._path = path
+
+        map_cache = map_cache or MapCache()
+        data = self._load_collision_data(collision_layers, collision_object_layers, map_cache) or map_cache.load(path, collision_layers, collision_object_layers)
+        if data is None:
+            raise Exception(f"Map cache entry of '{path}' can not be loaded")
+        # The parsed map is not needed anymore
+        self._tmx = None
+
+        self.map_data = StreamingMapData(data, path, chunk_size, max_bytes, prefetch)
+        self._create_renderer(self.map_data, screen_size)
+
+    def _tmx_path(self) -> Optional[str]:
+        return self._path
+
+    def update(self, dt: float) -> None:
+        """Update method similar to the `pgz.scene.Scene.update` method.
+
+        All the actors attached to the map will be updated, the chunks around the view are requested.
+
+        Args:
+            dt (float): time in milliseconds since the last update
+        """
+        super().update(dt)
+        self.map_data.stream_view(self.view())
+
+    def stream_around(self, points: Iterable[Point], radius: int = 1024) -> None:
+        """Keep the chunks around the points loaded, for example around all the players on a hosting client.
+
+        Args:
+            points (Iterable[Point]): points in the map coordinates
+            radius (int, optional): radius in pixels. Defaults to 1024.
+        """
+        self.map_data.stream_around(points, radius)
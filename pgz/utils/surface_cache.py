@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from typing import Hashable, Tuple
+
+import pygame
+
+SurfaceKey = Tuple[Hashable, float, float]
+
+
+class SurfaceCache(object):
+    """LRU cache of the rotated and scaled images with a memory budget.
+
+    Surfaces are cached per (image name, quantized angle, scale), so actors sharing an image and an angle share the transformed surface,
+    and an actor rotating back and forth does not call `pygame.transform.rotate` every time.
+    """
+
+    def __init__(self, angle_step: float = 1.0, max_bytes: int = 64 * 1024 * 1024) -> None:
+        """Create a surface cache.
+
+        Args:
+            angle_step (float, optional): angle quantization step in degrees. Defaults to 1.0.
+            max_bytes (int, optional): memory budget of the cached surfaces pixels in bytes. Defaults to 64MB.
+        """
+        self.angle_step = angle_step
+        self.max_bytes = max_bytes
+        self._surfaces: "OrderedDict[SurfaceKey, pygame.Surface]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._surfaces)
+
+    @property
+    def bytes(self) -> int:
+        """Get memory used by the cached surfaces pixels"""
+        return self._bytes
+
+    def clear(self) -> None:
+        self._surfaces.clear()
+        self._bytes = 0
+
+    def quantize(self, angle: float) -> float:
+        """Round an angle to the quantization step"""
+        return (round(angle / self.angle_step) * self.angle_step) % 360
+
+    @staticmethod
+    def _size_in_bytes(surface: pygame.Surface) -> int:
+        width, height = surface.get_size()
+        return width * height * surface.get_bytesize()
+
+    def transform(self, image: Hashable, surface: pygame.Surface, angle: float, scale: float = 1.0) -> pygame.Surface:
+        """Get the image rotated by the quantized angle and scaled.
+
+        Args:
+            image (Hashable): image name, used as a part of the cache key
+            surface (pygame.Surface): original image surface
+            angle (float): rotation angle in degrees
+            scale (float, optional): scale factor. Defaults to 1.0.
+
+        Returns:
+            pygame.Surface: cached transformed surface. Should not be modified.
+        """
+        angle = self.quantize(angle)
+        if angle == 0 and scale == 1.0:
+            return surface
+
+        key = (image, angle, scale)
+        cached = self._surfaces.get(key)
+        if cached is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        if scale == 1.0:
+            transformed = pygame.transform.rotate(surface, angle)
+        else:
+            transformed = pygame.transform.rotozoom(surface, angle, scale)
+
+        size = self._size_in_bytes(transformed)
+        if size > self.max_bytes:
+            return transformed
+        self._surfaces[key] = transformed
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._surfaces.popitem(last=False)
+            self._bytes -= self._size_in_bytes(evicted)
+        return transformed
+
+
+# Surface cache shared by all the actors
+surface_cache = SurfaceCache()
@@ -0,0 +1,121 @@
+"""
+Swept AABB (continuous) collision detection.
+
+A moving rect is swept along its displacement and tested against static rects.
+The result is the first time of impact in the [0, 1) range of the displacement,
+so fast moving actors can not jump over thin obstacles between two updates.
+"""
+
+from typing import Any, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+Vector = Tuple[float, float]
+
+
+class SweepHit(NamedTuple):
+    """First impact found by a sweep query"""
+
+    # Fraction of the displacement before the impact, 0.0 if the rect overlaps the target at the start
+    time: float
+    # Normal of the hit surface, (0, 0) if the rect overlaps the target at the start
+    normal: Tuple[int, int]
+    # Hit object: sprite, tile (x, y) or collision shape
+    target: Any
+
+    def position(self, start: Vector, displacement: Vector) -> Vector:
+        """Get the position at the moment of the impact.
+
+        Args:
+            start (Vector): start position
+            displacement (Vector): displacement used for the sweep
+
+        Returns:
+            Vector: position at the impact
+        """
+        return (start[0] + displacement[0] * self.time, start[1] + displacement[1] * self.time)
+
+
+def swept_bounds(rect: Any, displacement: Vector) -> Tuple[float, float, float, float]:
+    """Get the rect covering the whole movement.
+
+    Args:
+        rect (Any): moving rect, anything unpackable into (left, top, width, height)
+        displacement (Vector): movement vector
+
+    Returns:
+        Tuple[float, float, float, float]: (left, top, width, height) of the covering rect
+    """
+    left, top, width, height = rect
+    dx, dy = displacement
+    return (left + min(dx, 0), top + min(dy, 0), width + abs(dx), height + abs(dy))
+
+
+def sweep_rects(rect: Any, displacement: Vector, bounds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized swept AABB test of a moving rect against many static rects.
+
+    Args:
+        rect (Any): moving rect, anything unpackable into (left, top, width, height)
+        displacement (Vector): movement vector
+        bounds (np.ndarray): static rects, array of shape (N, 4) with rows (left, top, right, bottom)
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: time of impact per static rect (`inf` if there is no impact)
+        and hit axis per static rect (0 - x, 1 - y, -1 - overlapping at the start)
+    """
+    left, top, width, height = rect
+    moving = (left, top, left + width, top + height)
+
+    entry = []
+    exit = []
+    for axis, d in enumerate(displacement):
+        low, high = moving[axis], moving[axis + 2]
+        other_low, other_high = bounds[:, axis], bounds[:, axis + 2]
+        if d == 0:
+            # No movement along the axis: the projections either always overlap or never
+            overlap = (low < other_high) & (other_low < high)
+            entry.append(np.where(overlap, -np.inf, np.inf))
+            exit.append(np.where(overlap, np.inf, -np.inf))
+        elif d > 0:
+            entry.append((other_low - high) / d)
+            exit.append((other_high - low) / d)
+        else:
+            entry.append((other_high - low) / d)
+            exit.append((other_low - high) / d)
+
+    entry_time = np.maximum(entry[0], entry[1])
+    exit_time = np.minimum(exit[0], exit[1])
+    hit = (entry_time < exit_time) & (entry_time < 1.0) & (exit_time > 0.0)
+
+    times = np.where(hit, np.maximum(entry_time, 0.0), np.inf)
+    axes = np.where(entry_time < 0.0, -1, np.where(entry[0] >= entry[1], 0, 1))
+    return times, axes
+
+
+def first_hit(rect: Any, displacement: Vector, bounds: np.ndarray, targets: Any) -> Optional[SweepHit]:
+    """Find the first impact of a moving rect with static rects.
+
+    Args:
+        rect (Any): moving rect, anything unpackable into (left, top, width, height)
+        displacement (Vector): movement vector
+        bounds (np.ndarray): static rects, array of shape (N, 4) with rows (left, top, right, bottom)
+        targets (Any): objects associated with the static rects, indexable by the row number
+
+    Returns:
+        Optional[SweepHit]: the first impact, None if nothing is hit
+    """
+    if not len(bounds):
+        return None
+    times, axes = sweep_rects(rect, displacement, bounds)
+    index = int(np.argmin(times))
+    time = float(times[index])
+    if time == np.inf:
+        return None
+
+    axis = int(axes[index])
+    normal = (0, 0)
+    if axis == 0:
+        normal = (-1 if displacement[0] > 0 else 1, 0)
+    elif axis == 1:
+        normal = (0, -1 if displacement[1] > 0 else 1)
+    return SweepHit(time, normal, targets[index])
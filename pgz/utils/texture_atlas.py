@@ -0,0 +1,222 @@
+"""
+Texture atlas of the game images.
+
+All the images of the resource root are packed into a few big surfaces (pages) converted to the display pixel format.
+Once the atlas is installed, `pgz.images` (and so `pgz.Actor`) resolves image names to subsurfaces of the pages,
+so no image files are read and converted one by one.
+
+Examples:
+```
+app = pgz.Application(...)
+# Build the atlas from the "images" directory, or load it if the saved atlas is up to date
+atlas = pgz.TextureAtlas.build_or_load("atlas")
+atlas.install()
+```
+"""
+
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import pgzero.loaders
+import pygame
+
+from .. import loaders
+
+# Image file extensions supported by the pgzero images loader
+IMAGE_EXTENSIONS = ("png", "gif", "jpg", "jpeg", "bmp")
+
+# (page index, rect of the image on the page)
+Region = Tuple[int, pygame.Rect]
+
+
+def _images_root() -> str:
+    root: str = pgzero.loaders.root
+    return os.path.join(root, loaders.images.subpath)
+
+
+def _find_images(root: str) -> Dict[str, str]:
+    """Get image name -> image path for all the images under the directory"""
+    result: Dict[str, str] = {}
+    for directory, _, files in os.walk(root):
+        for file_name in sorted(files):
+            stem, ext = os.path.splitext(file_name)
+            if ext[1:].lower() not in IMAGE_EXTENSIONS:
+                continue
+            name = os.path.relpath(os.path.join(directory, stem), root).replace(os.sep, "/")
+            result.setdefault(name, os.path.join(directory, file_name))
+    return result
+
+
+def _convert(surface: pygame.Surface) -> pygame.Surface:
+    # The conversion requires a video mode
+    if pygame.display.get_surface() is None:
+        return surface
+    return surface.convert_alpha()
+
+
+class TextureAtlas(object):
+    """Images packed into a few big surfaces.
+
+    The images are packed by the shelf algorithm: the images are sorted by the height and placed row by row.
+    """
+
+    def __init__(self, pages: List[pygame.Surface], regions: Dict[str, Region]) -> None:
+        """Create atlas from the packed pages. Use `build`, `load` or `build_or_load` for the atlas creation.
+
+        Args:
+            pages (List[pygame.Surface]): atlas pages
+            regions (Dict[str, Region]): page index and rect of every image
+        """
+        self._pages = pages
+        self._regions = regions
+        self._surfaces = {name: pages[page].subsurface(rect) for name, (page, rect) in regions.items()}
+
+    def __len__(self) -> int:
+        return len(self._regions)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._regions
+
+    @property
+    def pages(self) -> List[pygame.Surface]:
+        return self._pages
+
+    @property
+    def names(self) -> List[str]:
+        """Get names of the packed images"""
+        return list(self._regions)
+
+    def region(self, name: str) -> Region:
+        """Get page index and rect of an image"""
+        return self._regions[name]
+
+    def get(self, name: str) -> pygame.Surface:
+        """Get image as a subsurface of the atlas page.
+
+        Args:
+            name (str): image name, same as for `pgz.images`
+
+        Returns:
+            pygame.Surface: subsurface of the atlas page
+        """
+        return self._surfaces[name]
+
+    def install(self, loader: Optional[pgzero.loaders.ResourceLoader] = None) -> None:
+        """Make the images loader return the atlas subsurfaces.
+
+        Args:
+            loader (Optional[pgzero.loaders.ResourceLoader], optional): images loader. `pgz.images` is used if None. Defaults to None.
+        """
+        loader = loader or loaders.images
+        for name, surface in self._surfaces.items():
+            loader.cache[loader.cache_key(name, (), {})] = surface
+
+    @classmethod
+    def build(cls, root: Optional[str] = None, page_size: Tuple[int, int] = (2048, 2048), padding: int = 1) -> "TextureAtlas":
+        """Pack all the images of a directory.
+
+        Args:
+            root (Optional[str], optional): images directory. The "images" directory of the resource root is used if None. Defaults to None.
+            page_size (Tuple[int, int], optional): atlas page size. Images bigger than the page get their own pages. Defaults to (2048, 2048).
+            padding (int, optional): gap between the images in pixels, protects from the bleeding on the rotation and scaling. Defaults to 1.
+
+        Returns:
+            TextureAtlas: atlas object
+        """
+        images = {name: pygame.image.load(path) for name, path in _find_images(root or _images_root()).items()}
+        # Tallest first, so the shelves are filled densely
+        order = sorted(images, key=lambda name: (-images[name].get_height(), -images[name].get_width(), name))
+
+        page_width, page_height = page_size
+        page_sizes: List[Tuple[int, int]] = []
+        regions: Dict[str, Region] = {}
+        # Shelf cursor of the current page: x, y and height of the current shelf
+        x = y = shelf_height = 0
+        current_page = -1
+        for name in order:
+            width, height = images[name].get_size()
+            if width + padding > page_width or height + padding > page_height:
+                # The image gets its own page
+                page_sizes.append((width, height))
+                regions[name] = (len(page_sizes) - 1, pygame.Rect(0, 0, width, height))
+                continue
+
+            if current_page < 0 or x + width > page_width:
+                # Start a new shelf
+                x, y, shelf_height = 0, y + shelf_height, 0
+            if current_page < 0 or y + height > page_height:
+                # Start a new page
+                page_sizes.append(page_size)
+                current_page = len(page_sizes) - 1
+                x = y = shelf_height = 0
+
+            regions[name] = (current_page, pygame.Rect(x, y, width, height))
+            x += width + padding
+            shelf_height = max(shelf_height, height + padding)
+
+        pages = [_convert(pygame.Surface(size, pygame.SRCALPHA)) for size in page_sizes]
+        for page in pages:
+            page.fill((0, 0, 0, 0))
+        for name, (page_index, rect) in regions.items():
+            pages[page_index].blit(images[name], rect)
+        return cls(pages, regions)
+
+    def save(self, path: str) -> None:
+        """Save the atlas as PNG pages and a JSON manifest.
+
+        Args:
+            path (str): path of the manifest without the extension. The pages are saved next to it as `<path>_<index>.png`.
+        """
+        page_files = []
+        for index, page in enumerate(self._pages):
+            page_file = f"{path}_{index}.png"
+            pygame.image.save(page, page_file)
+            page_files.append(os.path.basename(page_file))
+        manifest = {
+            "pages": page_files,
+            "regions": {name: [page, rect.x, rect.y, rect.w, rect.h] for name, (page, rect) in self._regions.items()},
+        }
+        with open(f"{path}.json", "w") as f:
+            json.dump(manifest, f)
+
+    @classmethod
+    def load(cls, path: str) -> "TextureAtlas":
+        """Load the atlas saved with `save`.
+
+        Args:
+            path (str): path of the manifest without the extension
+
+        Returns:
+            TextureAtlas: atlas object
+        """
+        with open(f"{path}.json") as f:
+            manifest = json.load(f)
+        directory = os.path.dirname(path)
+        pages = [_convert(pygame.image.load(os.path.join(directory, page_file))) for page_file in manifest["pages"]]
+        regions = {name: (value[0], pygame.Rect(value[1:])) for name, value in manifest["regions"].items()}
+        return cls(pages, regions)
+
+    @classmethod
+    def build_or_load(cls, path: str, root: Optional[str] = None, page_size: Tuple[int, int] = (2048, 2048), padding: int = 1) -> "TextureAtlas":
+        """Load the saved atlas if it is newer than all the images, otherwise build and save it.
+
+        Args:
+            path (str): path of the manifest without the extension
+            root (Optional[str], optional): images directory. The "images" directory of the resource root is used if None. Defaults to None.
+            page_size (Tuple[int, int], optional): atlas page size. Defaults to (2048, 2048).
+            padding (int, optional): gap between the images in pixels. Defaults to 1.
+
+        Returns:
+            TextureAtlas: atlas object
+        """
+        image_paths = _find_images(root or _images_root()).values()
+        manifest = f"{path}.json"
+        if os.path.exists(manifest):
+            manifest_time = os.path.getmtime(manifest)
+            if all(os.path.getmtime(image_path) <= manifest_time for image_path in image_paths):
+                return cls.load(path)
+
+        atlas = cls.build(root, page_size, padding)
+        atlas.save(path)
+        return atlas
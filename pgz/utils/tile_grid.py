@@ -0,0 +1,368 @@
+import math
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pygame
+import pytmx
+
+from .sweep import SweepHit, Vector, first_hit, swept_bounds
+
+TileRange = Tuple[int, int, int, int]
+
+
+class RayHit(NamedTuple):
+    """First solid tile hit by a ray"""
+
+    # Fraction of the ray length before the hit, 0.0 if the ray starts in a solid tile
+    time: float
+    # Hit point in pixels
+    point: Tuple[float, float]
+    # Hit tile (x, y)
+    tile: Tuple[int, int]
+    # Normal of the hit tile side, (0, 0) if the ray starts in a solid tile
+    normal: Tuple[int, int]
+
+
+class TileGrid(object):
+    """Compact boolean grid of the solid (collidable) map tiles.
+
+    The grid stores one byte per tile. A collision query checks only the tiles covered by the queried rect,
+    so the query cost depends on the rect size, but not on the map size.
+    """
+
+    def __init__(self, width: int, height: int, tile_width: int, tile_height: int) -> None:
+        """Create an empty tile grid.
+
+        Args:
+            width (int): map width in tiles
+            height (int): map height in tiles
+            tile_width (int): tile width in pixels
+            tile_height (int): tile height in pixels
+        """
+        self._tile_width = tile_width
+        self._tile_height = tile_height
+        # Indexed as [y, x]
+        self._solid = np.zeros((height, width), dtype=bool)
+        # Mask of a single solid tile, used for pixel perfect collisions
+        self._tile_mask: Optional[pygame.mask.Mask] = None
+
+    @classmethod
+    def from_tmx(cls, tmx: pytmx.TiledMap, layer_names: List[str] = []) -> "TileGrid":
+        """Create a tile grid from the tile layers of `pytmx.TiledMap`.
+
+        Args:
+            tmx (pytmx.TiledMap): loaded tmx map
+            layer_names (List[str], optional): names of tile layers with the solid tiles. Defaults to [].
+
+        Returns:
+            TileGrid: tile grid object
+        """
+        grid = cls(tmx.width, tmx.height, tmx.tilewidth, tmx.tileheight)
+        grid.add_tmx_layers(tmx, layer_names)
+        return grid
+
+    @classmethod
+    def from_array(cls, solid: np.ndarray, tile_width: int, tile_height: int) -> "TileGrid":
+        """Create a tile grid from a boolean array. The array is used without copying, so it might be memory-mapped.
+
+        Args:
+            solid (np.ndarray): boolean array of the solid tiles indexed as [y, x]
+            tile_width (int): tile width in pixels
+            tile_height (int): tile height in pixels
+
+        Returns:
+            TileGrid: tile grid object
+        """
+        grid = cls(0, 0, tile_width, tile_height)
+        grid._solid = solid
+        return grid
+
+    def add_tmx_layers(self, tmx: pytmx.TiledMap, layer_names: List[str]) -> None:
+        """Mark all the non-empty tiles of the tile layers as solid.
+
+        Args:
+            tmx (pytmx.TiledMap): loaded tmx map
+            layer_names (List[str]): names of tile layers with the solid tiles
+        """
+        for layer_name in layer_names:
+            layer = tmx.get_layer_by_name(layer_name)
+            self.add_solid(np.asarray(layer.data) != 0)
+
+    def add_solid(self, solid: np.ndarray) -> None:
+        """Mark tiles as solid.
+
+        Args:
+            solid (np.ndarray): boolean array of the grid shape (height, width)
+        """
+        if not self._solid.flags.writeable:
+            # Copy on write of the memory-mapped grid
+            self._solid = np.array(self._solid)
+        self._solid |= solid
+
+    @property
+    def solid(self) -> np.ndarray:
+        """Get boolean array of the solid tiles indexed as [y, x]"""
+        return self._solid
+
+    @property
+    def width(self) -> int:
+        """Get grid width in tiles"""
+        return int(self._solid.shape[1])
+
+    @property
+    def height(self) -> int:
+        """Get grid height in tiles"""
+        return int(self._solid.shape[0])
+
+    @property
+    def tile_width(self) -> int:
+        return self._tile_width
+
+    @property
+    def tile_height(self) -> int:
+        return self._tile_height
+
+    def is_solid(self, x: int, y: int) -> bool:
+        """Check if a tile is solid. Tiles outside of the grid are not solid.
+
+        Args:
+            x (int): tile column
+            y (int): tile row
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return bool(self._solid[y, x])
+        return False
+
+    def tile_range(self, rect: Any) -> Optional[TileRange]:
+        """Get range of the tiles covered by a rect.
+
+        Args:
+            rect (Any): rect in pixels, anything unpackable into (left, top, width, height)
+
+        Returns:
+            Optional[TileRange]: (x0, y0, x1, y1) exclusive tile range clipped by the grid, None if the rect is outside of the grid
+        """
+        left, top, width, height = rect
+        if width <= 0 or height <= 0:
+            return None
+        # Right and bottom edges are exclusive, same as for `pygame.Rect.colliderect`
+        x0 = max(int(left // self._tile_width), 0)
+        y0 = max(int(top // self._tile_height), 0)
+        x1 = min(math.ceil((left + width) / self._tile_width), self.width)
+        y1 = min(math.ceil((top + height) / self._tile_height), self.height)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        return x0, y0, x1, y1
+
+    def collide_rect(self, rect: Any) -> bool:
+        """Check if a rect overlaps any solid tile.
+
+        Args:
+            rect (Any): rect in pixels, anything unpackable into (left, top, width, height)
+
+        Returns:
+            bool: True if the collision was detected
+        """
+        tile_range = self.tile_range(rect)
+        if tile_range is None:
+            return False
+        x0, y0, x1, y1 = tile_range
+        return bool(self._solid[y0:y1, x0:x1].any())
+
+    def collide_mask(self, mask: pygame.mask.Mask, offset: Tuple[int, int]) -> bool:
+        """Check if a pixel mask overlaps any solid tile.
+
+        Args:
+            mask (pygame.mask.Mask): mask to check
+            offset (Tuple[int, int]): top left position of the mask in pixels
+
+        Returns:
+            bool: True if the collision was detected
+        """
+        left, top = offset
+        width, height = mask.get_size()
+        tile_range = self.tile_range((left, top, width, height))
+        if tile_range is None:
+            return False
+        x0, y0, x1, y1 = tile_range
+
+        if self._tile_mask is None:
+            self._tile_mask = pygame.mask.Mask((self._tile_width, self._tile_height), fill=True)
+        ys, xs = np.nonzero(self._solid[y0:y1, x0:x1])
+        for y, x in zip(ys, xs):
+            tile_offset = ((x0 + int(x)) * self._tile_width - left, (y0 + int(y)) * self._tile_height - top)
+            if mask.overlap(self._tile_mask, tile_offset) is not None:
+                return True
+        return False
+
+    def sweep_rect(self, rect: Any, displacement: Vector) -> Optional[SweepHit]:
+        """Find the first solid tile hit by a rect moving along a displacement.
+
+        Only the tiles covered by the whole movement are checked.
+
+        Args:
+            rect (Any): moving rect in pixels, anything unpackable into (left, top, width, height)
+            displacement (Vector): movement vector in pixels
+
+        Returns:
+            Optional[SweepHit]: the first impact with the hit tile (x, y) as the target, None if no tile is hit
+        """
+        tile_range = self.tile_range(swept_bounds(rect, displacement))
+        if tile_range is None:
+            return None
+        x0, y0, x1, y1 = tile_range
+        ys, xs = np.nonzero(self._solid[y0:y1, x0:x1])
+        if not len(xs):
+            return None
+        xs += x0
+        ys += y0
+        bounds = np.stack(
+            (xs * self._tile_width, ys * self._tile_height, (xs + 1) * self._tile_width, (ys + 1) * self._tile_height),
+            axis=1,
+        ).astype(np.float64)
+        return first_hit(rect, displacement, bounds, list(zip(xs.tolist(), ys.tolist())))
+
+    def raycast(self, start: Vector, end: Vector) -> Optional[RayHit]:
+        """Find the first solid tile crossed by a segment.
+
+        The tiles are traversed one by one along the segment (DDA), so the cost depends on the segment length in tiles only.
+
+        Args:
+            start (Vector): ray start in pixels
+            end (Vector): ray end in pixels
+
+        Returns:
+            Optional[RayHit]: the first hit, None if the segment crosses no solid tiles
+        """
+        # Work in the tile units
+        x, y = start[0] / self._tile_width, start[1] / self._tile_height
+        dx, dy = end[0] / self._tile_width - x, end[1] / self._tile_height - y
+        cell_x, cell_y = math.floor(x), math.floor(y)
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        delta_x = abs(1 / dx) if dx else math.inf
+        delta_y = abs(1 / dy) if dy else math.inf
+        # Ray times of the next vertical and horizontal tile borders
+        next_x = ((cell_x + 1 - x) if dx > 0 else (x - cell_x)) * delta_x if dx else math.inf
+        next_y = ((cell_y + 1 - y) if dy > 0 else (y - cell_y)) * delta_y if dy else math.inf
+
+        width, height = self.width, self.height
+        solid = self._solid
+        time = 0.0
+        normal = (0, 0)
+        while time <= 1.0:
+            if 0 <= cell_x < width and 0 <= cell_y < height and solid[cell_y, cell_x]:
+                point = (start[0] + (end[0] - start[0]) * time, start[1] + (end[1] - start[1]) * time)
+                return RayHit(time, point, (cell_x, cell_y), normal)
+            if next_x < next_y:
+                time = next_x
+                next_x += delta_x
+                cell_x += step_x
+                normal = (-step_x, 0)
+            else:
+                time = next_y
+                next_y += delta_y
+                cell_y += step_y
+                normal = (0, -step_y)
+        return None
+
+    def line_of_sight(self, start: Vector, end: Vector) -> bool:
+        """Check that a segment crosses no solid tiles.
+
+        Args:
+            start (Vector): segment start in pixels
+            end (Vector): segment end in pixels
+
+        Returns:
+            bool: True if the end is visible from the start
+        """
+        return self.raycast(start, end) is None
+
+    def raycast_many(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Batched `raycast`. All the rays are traversed together with vectorized DDA steps.
+
+        Args:
+            starts (np.ndarray): ray starts in pixels, array-like of shape (N, 2)
+            ends (np.ndarray): ray ends in pixels, array-like of shape (N, 2)
+
+        Returns:
+            np.ndarray: fraction of the ray length before the first solid tile per ray, `inf` for the rays crossing no solid tiles
+        """
+        tile_size = np.array((self._tile_width, self._tile_height), dtype=np.float64)
+        origin = np.asarray(starts, dtype=np.float64).reshape(-1, 2) / tile_size
+        direction = np.asarray(ends, dtype=np.float64).reshape(-1, 2) / tile_size - origin
+
+        cell = np.floor(origin).astype(np.int64)
+        step = np.where(direction > 0, 1, -1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta = np.where(direction != 0, np.abs(1 / direction), np.inf)
+            border = np.where(direction > 0, cell + 1 - origin, origin - cell)
+            next_border = np.where(direction != 0, border * delta, np.inf)
+
+        times = np.full(len(origin), np.inf)
+        time = np.zeros(len(origin))
+        active = np.ones(len(origin), dtype=bool)
+        height, width = self._solid.shape
+        while active.any():
+            # Test the current tile of every active ray
+            inside = active & (cell[:, 0] >= 0) & (cell[:, 0] < width) & (cell[:, 1] >= 0) & (cell[:, 1] < height)
+            hit = np.zeros_like(active)
+            hit[inside] = self._solid[cell[inside, 1], cell[inside, 0]]
+            times[hit] = time[hit]
+            active &= ~hit
+
+            # Step every active ray into the next tile
+            axis = (next_border[:, 1] <= next_border[:, 0]).astype(np.int64)
+            rows = np.flatnonzero(active)
+            axis = axis[rows]
+            time[rows] = next_border[rows, axis]
+            next_border[rows, axis] += delta[rows, axis]
+            cell[rows, axis] += step[rows, axis]
+            active &= time <= 1.0
+        return times
+
+    def line_of_sight_many(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Batched `line_of_sight`.
+
+        Args:
+            starts (np.ndarray): segment starts in pixels, array-like of shape (N, 2)
+            ends (np.ndarray): segment ends in pixels, array-like of shape (N, 2)
+
+        Returns:
+            np.ndarray: boolean array, True if the end is visible from the start
+        """
+        visible: np.ndarray = np.isinf(self.raycast_many(starts, ends))
+        return visible
+
+    def merged_rects(self) -> List[pygame.Rect]:
+        """Cover the solid tiles with a small number of non-overlapping rects.
+
+        Greedy merging: every run of solid tiles in a row is extended down while the rows below have the same run.
+
+        Returns:
+            List[pygame.Rect]: rects in pixels
+        """
+        solid = self._solid
+        height, width = solid.shape
+        claimed = np.zeros_like(solid)
+        rects: List[pygame.Rect] = []
+        for y in range(height):
+            row = solid[y] & ~claimed[y]
+            if not row.any():
+                continue
+            # Starts and ends of the runs of the unclaimed solid tiles
+            edges = np.flatnonzero(np.diff(np.concatenate(([0], row.view(np.int8), [0]))))
+            for x0, x1 in zip(edges[::2], edges[1::2]):
+                y1 = y + 1
+                while y1 < height and solid[y1, x0:x1].all() and not claimed[y1, x0:x1].any():
+                    y1 += 1
+                claimed[y:y1, x0:x1] = True
+                rects.append(
+                    pygame.Rect(
+                        int(x0) * self._tile_width,
+                        y * self._tile_height,
+                        int(x1 - x0) * self._tile_width,
+                        (y1 - y) * self._tile_height,
+                    )
+                )
+        return rects
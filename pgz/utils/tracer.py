@@ -0,0 +1,176 @@
+"""
+Lightweight timeline tracing.
+
+Spans and counters are collected into an in-memory ring buffer and can be exported as
+[Chrome trace](https://docs.google.com/document/d/1CvAClvFfyA5R-PhYUmn5OOQtYMH4h6I0nSsKchNAySU) JSON,
+which can be opened with `chrome://tracing` or [Perfetto](https://ui.perfetto.dev).
+
+Examples:
+```
+pgz.global_tracer.enabled = True
+pgz.global_tracer.dump_at_exit("trace.json")
+
+with pgz.global_tracer.span("pathfinding"):
+    ...
+```
+
+The tracing can be also enabled with the `PGZ_TRACE` environment variable: `PGZ_TRACE=trace.json python game.py`
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+JSON = Dict[str, Any]
+
+
+class _NullSpan:
+    """Span used when the tracing is disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("_tracer", "_name", "_category", "_args", "_start")
+
+    def __init__(self, tracer: "Tracer", name: str, category: str, args: Optional[JSON]) -> None:
+        self._tracer = tracer
+        self._name = name
+        self._category = category
+        self._args = args
+        self._start = 0.0
+
+    def __enter__(self) -> "_Span":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        end = time.perf_counter()
+        event = {
+            "name": self._name,
+            "cat": self._category,
+            "ph": "X",
+            "ts": self._start * 1e6,
+            "dur": (end - self._start) * 1e6,
+            "pid": self._tracer._pid,
+            "tid": threading.get_ident(),
+        }
+        if self._args:
+            event["args"] = self._args
+        self._tracer._events.append(event)
+
+
+class Tracer:
+    """Collector of the timeline events.
+
+    The disabled tracer costs a single attribute check per span.
+    """
+
+    def __init__(self, size: int = 100000, enabled: bool = False) -> None:
+        """Create a tracer.
+
+        Args:
+            size (int, optional): maximal number of the latest events to keep. Defaults to 100000.
+            enabled (bool, optional): collect the events. Defaults to False.
+        """
+        self.enabled = enabled
+        self._events: Deque[JSON] = deque(maxlen=size)
+        self._pid = os.getpid()
+        self._dump_path: Optional[str] = None
+
+    def span(self, name: str, category: str = "pgz", args: Optional[JSON] = None) -> Any:
+        """Create a scoped span, which records the duration of the `with` block.
+
+        Args:
+            name (str): span name
+            category (str, optional): span category. Defaults to "pgz".
+            args (Optional[JSON], optional): additional data attached to the span. Defaults to None.
+
+        Returns:
+            context manager
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, category, args)
+
+    def counter(self, name: str, **values: float) -> None:
+        """Record counter values.
+
+        Args:
+            name (str): counter name
+            values (float): named values of the counter
+        """
+        if not self.enabled:
+            return
+        self._events.append({"name": name, "ph": "C", "ts": time.perf_counter() * 1e6, "pid": self._pid, "args": values})
+
+    def instant(self, name: str, category: str = "pgz", args: Optional[JSON] = None) -> None:
+        """Record an instant event.
+
+        Args:
+            name (str): event name
+            category (str, optional): event category. Defaults to "pgz".
+            args (Optional[JSON], optional): additional data attached to the event. Defaults to None.
+        """
+        if not self.enabled:
+            return
+        event = {"name": name, "cat": category, "ph": "i", "s": "t", "ts": time.perf_counter() * 1e6, "pid": self._pid, "tid": threading.get_ident()}
+        if args:
+            event["args"] = args
+        self._events.append(event)
+
+    def clear(self) -> None:
+        """Drop all the collected events"""
+        self._events.clear()
+
+    def events(self) -> List[JSON]:
+        """Get the collected events.
+
+        Returns:
+            List[JSON]: events in Chrome trace format
+        """
+        return list(self._events)
+
+    def dump(self, path: str) -> None:
+        """Write the collected events to a Chrome trace JSON file.
+
+        Args:
+            path (str): output file path
+        """
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, f)
+
+    def dump_at_exit(self, path: str) -> None:
+        """Write the collected events to a Chrome trace JSON file at the interpreter exit.
+
+        Args:
+            path (str): output file path
+        """
+        if self._dump_path is None:
+            atexit.register(self._dump_at_exit)
+        self._dump_path = path
+
+    def _dump_at_exit(self) -> None:
+        if self._dump_path:
+            self.dump(self._dump_path)
+
+
+global_tracer = Tracer()
+
+_trace_path = os.environ.get("PGZ_TRACE")
+if _trace_path:
+    global_tracer.enabled = True
+    global_tracer.dump_at_exit(_trace_path)
@@ -0,0 +1,128 @@
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+Point = Tuple[float, float]
+Size = Tuple[int, int]
+# Zoom level and screen size of a renderer
+RendererKey = Tuple[float, Optional[Size]]
+
+
+class ZoomCache(object):
+    """LRU of the map renderers prepared for the zoom levels.
+
+    A pyscroll renderer allocates its buffers and redraws all the visible tiles once the zoom is changed.
+    The cache keeps a renderer per zoom level, so a zoom change swaps the renderers instead. The renderers for the next levels
+    are queued with `prepare` and built (or re-centered at the current camera position) by `poll`, one renderer per call,
+    so the work is spread over the frames.
+
+    The renderers are cached per screen size as well. Once the size is changed, the renderers of the old size stay in the LRU,
+    so changing the size back (for example by the adaptive render scale) swaps the renderers too.
+
+    The renderers allocate and blit surfaces, so all the methods should be called from the main thread.
+    """
+
+    def __init__(self, create: Callable[[float, Optional[Point], Optional[Size]], Any], max_size: int = 4, size: Optional[Size] = None) -> None:
+        """Create a zoom cache.
+
+        Args:
+            create (Callable[[float, Optional[Point], Optional[Size]], Any]): callback creating a renderer for the zoom level centered at a point
+                for the screen size
+            max_size (int, optional): maximal number of the cached renderers. Defaults to 4.
+            size (Optional[Size], optional): screen size of the renderers. Defaults to None.
+        """
+        self._create = create
+        self.max_size = max_size
+        self._renderers: "OrderedDict[RendererKey, Any]" = OrderedDict()
+        # Camera positions of the renderers to build or re-center, in the order of the requests
+        self._pending: "OrderedDict[RendererKey, Optional[Point]]" = OrderedDict()
+        # Zoom level of the renderer in use, it is never evicted
+        self.current: Optional[float] = None
+        # Screen size of the renderers in use
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._renderers)
+
+    def __contains__(self, zoom: float) -> bool:
+        return (zoom, self.size) in self._renderers
+
+    def ready(self, zoom: float) -> bool:
+        """Check if the renderer for the zoom level can be taken without building it"""
+        key = (zoom, self.size)
+        return key in self._renderers and key not in self._pending
+
+    def get(self, zoom: float, center: Optional[Point] = None) -> Any:
+        """Get the renderer for the zoom level. A missing renderer is created synchronously.
+
+        Args:
+            zoom (float): zoom level
+            center (Optional[Point], optional): camera position for a new renderer. Defaults to None.
+
+        Returns:
+            Any: the renderer
+        """
+        key = (zoom, self.size)
+        # The caller centers the renderer anyway
+        self._pending.pop(key, None)
+        renderer = self._renderers.get(key)
+        if renderer is not None:
+            self._renderers.move_to_end(key)
+            self.hits += 1
+            return renderer
+
+        self.misses += 1
+        renderer = self._create(zoom, center, self.size)
+        self._insert(key, renderer)
+        return renderer
+
+    def prepare(self, zoom: float, center: Optional[Point] = None) -> None:
+        """Queue building of the renderer for the zoom level, or re-centering of the cached one.
+
+        Args:
+            zoom (float): zoom level
+            center (Optional[Point], optional): camera position. Defaults to None.
+        """
+        if zoom == self.current:
+            return
+        self._pending[(zoom, self.size)] = center
+
+    def add(self, zoom: float, renderer: Any) -> None:
+        """Add a renderer of the current size created outside of the cache"""
+        key = (zoom, self.size)
+        self._pending.pop(key, None)
+        self._insert(key, renderer)
+
+    def remove(self, zoom: float) -> None:
+        """Drop the renderer of the zoom level"""
+        self._renderers.pop((zoom, self.size), None)
+
+    def poll(self) -> None:
+        """Build or re-center the first queued renderer of the current screen size"""
+        while self._pending:
+            key, center = self._pending.popitem(last=False)
+            zoom, size = key
+            if size != self.size:
+                # Queued before the size change
+                continue
+            renderer = self._renderers.get(key)
+            if renderer is None:
+                self._insert(key, self._create(zoom, center, size))
+            elif center is not None:
+                renderer.center(center)
+            return
+
+    def clear(self) -> None:
+        """Drop all the renderers"""
+        self._pending.clear()
+        self._renderers.clear()
+
+    def _insert(self, key: RendererKey, renderer: Any) -> None:
+        self._renderers[key] = renderer
+        current = (self.current, self.size)
+        for cached in list(self._renderers):
+            if len(self._renderers) <= self.max_size:
+                break
+            if cached != current and cached != key:
+                del self._renderers[cached]